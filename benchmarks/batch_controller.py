@@ -0,0 +1,35 @@
+import argparse
+import time
+
+import numpy as np
+
+from src.entity.algorithms import AverageWait, LargestFirst, WeightedSum
+from src.entity.batch_algorithms import BatchController, LANES
+
+ALGORITHMS = {algorithm.__name__: algorithm for algorithm in (LargestFirst, AverageWait, WeightedSum)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure BatchController tick time for growing networks')
+    parser.add_argument('--algorithm', choices=list(ALGORITHMS), default='AverageWait')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--ticks', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        controller = BatchController(size, algorithm=ALGORITHMS[args.algorithm], timeout=10)
+        counts = rng.integers(0, 50, size=(size, len(LANES)))
+        ts_sums = counts * (time.time() - rng.uniform(0, 60, size=(size, len(LANES))))
+        states = rng.integers(0, 2, size=size).astype(np.int8)
+        indices = np.arange(size)
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            controller.update_many(indices, counts, ts_sums, states)
+            controller.recommend()
+        tick = (time.perf_counter() - start) / args.ticks
+        print(f'{size:>8} crossroads: {tick * 1e3:8.3f} ms/tick, {tick / size * 1e9:6.1f} ns/crossroad')
+
+
+if __name__ == "__main__":
+    main()
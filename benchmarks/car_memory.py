@@ -0,0 +1,55 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.entity.car import Car, CarStore, Direction
+
+
+def measure_cars(count: int, path_length: int) -> float:
+    tracemalloc.start()
+    cars = [Car(id=i, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+                create_timestamp=time.time(), path=[Direction.S] * path_length) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cars
+    return size / count
+
+
+def measure_store(count: int, path_length: int) -> float:
+    tracemalloc.start()
+    store = CarStore(capacity=count)
+    store.add_many(ids=np.arange(count), starting_crossroad_ids=np.ones(count),
+                   starting_queue_directions=np.zeros(count), create_timestamps=np.full(count, time.time()),
+                   path_codes=np.ones((count, path_length), dtype=np.uint8),
+                   path_lengths=np.full(count, path_length))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return size / count
+
+
+def measure_advance(count: int, path_length: int) -> float:
+    cars = [Car(id=i, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+                create_timestamp=0.0, path=[Direction.S] * path_length) for i in range(count)]
+    start = time.perf_counter()
+    for car in cars:
+        while car.remaining_hops:
+            car.advance()
+    return (time.perf_counter() - start) / (count * path_length)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory taken by cars in flight')
+    parser.add_argument('--cars', type=int, default=100000)
+    parser.add_argument('--path-length', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f'Car:      {measure_cars(args.cars, args.path_length):8.1f} bytes/car')
+    print(f'CarStore: {measure_store(args.cars, args.path_length):8.1f} bytes/car')
+    print(f'Car.advance: {measure_advance(args.cars, args.path_length) * 1e9:.1f} ns/hop')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import time
+
+from src.communication.codec import CODECS
+from src.entity.LightState import LightState
+from src.entity.car import Car, Direction
+
+
+def timed(function, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return (time.perf_counter() - start) / repeats * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Encode/decode cost and size of message bodies for each codec')
+    parser.add_argument('--repeats', type=int, default=2000)
+    parser.add_argument('--cars-per-lane', type=int, default=10)
+    args = parser.parse_args()
+
+    now = time.time()
+    car = Car(id=123456, starting_crossroad_id=5, starting_queue_direction=Direction.N,
+              create_timestamp=now, path=[Direction.S, Direction.E, Direction.W, Direction.N] * 3)
+    line_queues = {lane: [car] * args.cars_per_lane for lane in Direction.as_list()}
+
+    print(f'{"protocol":>22} {"codec":>7} {"encode ns":>10} {"decode ns":>10} {"bytes":>7}')
+    for name, codec in CODECS.items():
+        protocols = {
+            'move_car': (lambda: codec.encode_car(car), codec.decode_car),
+            'crossroads_info': (lambda: codec.encode_crossroads_info(line_queues, LightState.NS, False),
+                                codec.decode_crossroads_info),
+            'crossroads_info_sum': (lambda: codec.encode_crossroads_info(line_queues, LightState.NS, True),
+                                    codec.decode_crossroads_info),
+            'state_recommendation': (lambda: codec.encode_state(LightState.EW), codec.decode_state),
+            'lane_credit': (lambda: codec.encode_credits(2), codec.decode_credits),
+        }
+        for protocol, (encode, decode) in protocols.items():
+            body = encode()
+            encode_ns = timed(encode, args.repeats)
+            decode_ns = timed(lambda: decode(body), args.repeats)
+            print(f'{protocol:>22} {name:>7} {encode_ns:>10.0f} {decode_ns:>10.0f} {len(body):>7}')
+
+
+if __name__ == "__main__":
+    main()
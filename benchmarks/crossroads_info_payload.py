@@ -0,0 +1,49 @@
+import argparse
+import time
+
+from src.communication.crossroads_info_protocol import CrossroadsInfoMessage
+from src.entity.LightState import LightState
+from src.entity.algorithms import AverageWait
+from src.entity.car import Car, Direction
+
+
+def make_queues(cars_per_lane: int):
+    now = time.time()
+    return {lane: [Car(id=i, starting_crossroad_id=1, starting_queue_direction=lane,
+                       create_timestamp=now - i, path=[Direction.N] * 10)
+                   for i in range(cars_per_lane)]
+            for lane in Direction.as_list()}
+
+
+def measure(queues, summary: bool, repeats: int):
+    algorithm = AverageWait(timeout=10)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        msg = CrossroadsInfoMessage(to="crossroad1_aggr@localhost", line_queues=queues,
+                                    current_state=LightState.EW, summary=summary)
+    encode = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        lines, current_state = CrossroadsInfoMessage.decode(msg)
+        algorithm.recommend_state(lines=lines, current_state=current_state)
+    decode = (time.perf_counter() - start) / repeats
+    return len(msg.body.encode()), encode, decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full and summary CrossroadsInfoMessage')
+    parser.add_argument('--cars-per-lane', type=int, nargs='+', default=[0, 10, 100, 1000])
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f'{"cars/lane":>10} {"mode":>8} {"bytes":>10} {"encode us":>10} {"decode+decide us":>17}')
+    for cars_per_lane in args.cars_per_lane:
+        queues = make_queues(cars_per_lane)
+        for summary in (False, True):
+            size, encode, decode = measure(queues, summary, args.repeats)
+            print(f'{cars_per_lane:>10} {"summary" if summary else "full":>8} {size:>10} '
+                  f'{encode * 1e6:>10.1f} {decode * 1e6:>17.1f}')
+
+
+if __name__ == "__main__":
+    main()
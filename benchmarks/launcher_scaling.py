@@ -0,0 +1,38 @@
+import argparse
+import multiprocessing
+import sys
+
+from src.launcher import launch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure messages/sec of the sharded launcher by number of shards, '
+                                                 'scaling shows only while shards have a CPU core each')
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--width', type=int, default=40)
+    parser.add_argument('--height', type=int, default=40)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--arrival-rate', type=float, default=1000.0,
+                        help='cars per second on the whole map, high enough to saturate one shard')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{multiprocessing.cpu_count()} cpus, {args.width}x{args.height} grid, {args.arrival_rate} cars/s")
+    baseline = None
+    for shards in args.shards:
+        reports = launch(shards, args.width, args.height, args.duration, args.seed, arrival_rate=args.arrival_rate)
+        failed = [report for report in reports if 'error' in report]
+        if failed:
+            print(f"{shards} shards failed: {failed[0]['error']}", file=sys.stderr)
+            sys.exit(1)
+        throughput = sum(report['transport']['messages'] for report in reports) / args.duration
+        dispatched = sum(report['stats'].travel_time.count for report in reports)
+        cpu_load = max(report['cpu_time'] for report in reports) / args.duration
+        baseline = baseline or throughput
+        print(f"{shards} shards: {throughput:.0f} messages/s, {dispatched / args.duration:.1f} cars/s dispatched, "
+              f"speedup {throughput / baseline:.2f}, efficiency {throughput / baseline / shards:.2f}, "
+              f"busiest shard CPU {cpu_load:.0%}")
+
+
+if __name__ == "__main__":
+    main()
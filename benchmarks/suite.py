@@ -0,0 +1,246 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from src.communication.crossroads_info_protocol import CrossroadsInfoMessage
+from src.entity.LightState import LightState
+from src.entity.algorithms import AverageWait, LargestFirst, WeightedSum
+from src.entity.car import Car, Direction
+from src.entity.lane_queue import LaneQueue
+from src.entity.lane_summary import LaneSummary
+
+# name, function to time, operations done by one call of the function
+Case = Tuple[str, Callable[[], object], int]
+
+QUICK_GRID_SIZES = [3, 30]
+GRID_SIZES = [3, 30, 100, 300]
+# generating the map creates an agent per crossroad, larger grids would time SPADE agents construction only
+MAX_AGENTS_GRID_SIZE = 100
+QUEUE_SIZES = [1, 10, 100, 1000]
+
+
+def make_car(car_id: int = 1, create_timestamp: float = 0.0) -> Car:
+    return Car(id=car_id, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+               create_timestamp=create_timestamp, path=[Direction.S, Direction.E, Direction.W, Direction.N] * 3)
+
+
+def car_cases(quick: bool) -> Iterator[Case]:
+    car = make_car()
+    body = car.to_json()
+    yield 'car.to_json', car.to_json, 1
+    yield 'car.from_json', lambda: Car.from_json(body), 1
+
+
+def crossroads_info_cases(quick: bool) -> Iterator[Case]:
+    for size in QUEUE_SIZES[:3] if quick else QUEUE_SIZES:
+        line_queues = {lane: [make_car(i) for i in range(size)] for lane in Direction.as_list()}
+        for summary in (False, True):
+            name = f'crossroads_info_message[{"summary" if summary else "queues"},{size}]'
+            yield name, lambda line_queues=line_queues, summary=summary: CrossroadsInfoMessage(
+                to='aggregator@localhost', line_queues=line_queues, current_state=LightState.NS, summary=summary), 1
+
+
+def algorithm_cases(quick: bool) -> Iterator[Case]:
+    now = time.time()
+    for algorithm_class in (LargestFirst, AverageWait, WeightedSum):
+        name = algorithm_class.__name__
+        for size in QUEUE_SIZES[:3] if quick else QUEUE_SIZES:
+            lines = {lane: [make_car(i, now - i) for i in range(size)] for lane in Direction.as_list()}
+            lane_queues = {lane: LaneQueue(cars) for lane, cars in lines.items()}
+            summaries = {lane: LaneSummary.from_cars(cars, now) for lane, cars in lines.items()}
+            algorithm = algorithm_class(timeout=10)
+            # recommend_state summarizes the queues, _process_data gets the summaries only
+            yield f'{name}.recommend_state[{size}]', lambda algorithm=algorithm, lines=lines: \
+                algorithm.recommend_state(lines=lines, current_state=LightState.NS), 1
+            yield f'{name}.recommend_state[lane_queue,{size}]', lambda algorithm=algorithm, lines=lane_queues: \
+                algorithm.recommend_state(lines=lines, current_state=LightState.NS), 1
+            yield f'{name}._process_data[{size}]', lambda algorithm=algorithm, summaries=summaries: \
+                algorithm._process_data(lines=summaries, current_state=LightState.NS), 1
+
+
+def graph_cases(quick: bool) -> Iterator[Case]:
+    import numpy as np
+    # to_graph imports networkx, matplotlib and netgraph on first use, import them before anything is timed
+    import src.graphs.intersections_graph  # noqa: F401
+    from src.graphs.intersections_state import IntersectionsState
+    from src.graphs.map_generator import MapGenerator
+    from src.graphs.routing import OriginDestinationDemand, Router
+
+    def generate(size: int) -> MapGenerator:
+        map_generator = MapGenerator(crossroads_count=size * size, width=size, height=size)
+        map_generator.graph = IntersectionsState()
+        map_generator.generate()
+        return map_generator
+
+    def build_graph(size: int) -> MapGenerator:
+        map_generator = MapGenerator(crossroads_count=size * size, width=size, height=size)
+        map_generator.graph = IntersectionsState()
+        map_generator.build_graph()
+        return map_generator
+
+    def rebuild_graph(graph: IntersectionsState):
+        graph._graph = None
+        return graph.to_graph()
+
+    for size in QUICK_GRID_SIZES if quick else GRID_SIZES:
+        graph = build_graph(size).graph
+        nodes = graph.nodes.tolist()
+        values = {lane: 1 for lane in Direction.as_list()}
+        if size <= MAX_AGENTS_GRID_SIZE:
+            yield f'map_generator.generate[{size}x{size}]', lambda size=size: generate(size), 1
+        yield f'map_generator.build_graph[{size}x{size}]', lambda size=size: build_graph(size), 1
+        yield f'graph.get_node_neighbors[{size}x{size}]', \
+            lambda graph=graph, nodes=nodes: [graph.get_node_neighbors(node) for node in nodes], len(nodes)
+        yield f'graph.update_intersection[{size}x{size}]', \
+            lambda graph=graph, node=nodes[len(nodes) // 2]: graph.update_intersection(node, values), 1
+        yield f'graph.to_graph[build,{size}x{size}]', lambda graph=graph: rebuild_graph(graph), 1
+        # once built, to_graph only refreshes attributes of the nodes and edges
+        graph.to_graph()
+        yield f'graph.to_graph[refresh,{size}x{size}]', graph.to_graph, 1
+        router = Router(graph.neighbors)
+        origins, destinations = OriginDestinationDemand.uniform(router).sample(1000, np.random.default_rng(0))
+        # routes of 1000 cars, fresh router every call so search trees are not cached
+        yield f'router.route_batch[{size}x{size}]', lambda graph=graph, origins=origins, destinations=destinations: \
+            Router(graph.neighbors).route_batch(origins, destinations), len(origins)
+
+
+def arrival_cases(quick: bool) -> Iterator[Case]:
+    from src.commons.arrivals import ArrivalGenerator
+    from src.graphs.grid import grid_layout
+    from src.graphs.routing import OriginDestinationDemand, Router
+
+    for size in QUICK_GRID_SIZES if quick else GRID_SIZES[:3]:
+        router = Router(grid_layout(size, size)[1])
+        demand = OriginDestinationDemand.uniform(router)
+        # one second of 10000 cars per second, time per generated car
+        yield f'arrivals.cars_until[{size}x{size},10000/s]', lambda router=router, demand=demand: \
+            ArrivalGenerator(router, demand, rate=10000, seed=0, horizon=1.0).cars_until(1.0), 10000
+
+
+def end_to_end_cases(quick: bool) -> Iterator[Case]:
+    from src.simulation.headless import HeadlessSimulation
+
+    duration = 600 if quick else 3600
+    dispatched = HeadlessSimulation(seed=0).run(duration).summary()['dispatched_cars']
+    # time per dispatched car, so the throughput is 1 / result cars per second
+    yield f'headless.dispatched_car[3x3,{duration}s]', lambda: HeadlessSimulation(seed=0).run(duration), dispatched
+    if not quick:
+        # the whole default day of python -m src.simulation.headless --seed 1, timed once
+        yield 'headless.day[3x3,86400s]', lambda: HeadlessSimulation(seed=1).run(24 * 60 * 60), 1
+
+
+SUITE: List[Callable[[bool], Iterator[Case]]] = [
+    car_cases,
+    crossroads_info_cases,
+    algorithm_cases,
+    graph_cases,
+    arrival_cases,
+    end_to_end_cases,
+]
+
+
+def measure(function: Callable[[], object], operations: int, budget: float, repeats: int) -> float:
+    """
+    Best of repeats of seconds per operation, every repeat calls function enough times to take about budget seconds.
+    Function taking longer than budget is timed once.
+    """
+    start = time.perf_counter()
+    function()
+    single = time.perf_counter() - start
+    if single >= budget:
+        return single / operations
+    calls = max(1, int(budget / max(single, 1e-9)))
+    best = single
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best / operations
+
+
+def run(quick: bool, name_filter: str, budget: float, repeats: int) -> Dict[str, float]:
+    results = {}
+    for group in SUITE:
+        for name, function, operations in group(quick):
+            if name_filter not in name:
+                continue
+            results[name] = measure(function, operations, budget, repeats)
+            print(f'{name:>50}: {format_time(results[name])}/op')
+    return results
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:8.2f} {unit}'
+    return f'{seconds / 1e-9:8.1f} ns'
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float], threshold: float) -> List[str]:
+    """
+    Print change of every benchmark present in both results, returns names slower than baseline by over threshold
+    """
+    regressions = []
+    for name in sorted(baseline.keys() & current.keys()):
+        ratio = current[name] / baseline[name]
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        print(f'{name:>50}: {format_time(baseline[name])} -> {format_time(current[name])} '
+              f'{(ratio - 1) * 100:+7.1f}%{"  REGRESSION" if regressed else ""}')
+    for name in sorted(current.keys() - baseline.keys()):
+        print(f'{name:>50}: not in baseline')
+    return regressions
+
+
+def load_results(path: str) -> Dict[str, float]:
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of simulation hot paths with JSON baselines')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='run benchmarks, optionally save results as baseline')
+    run_parser.add_argument('--output', default=None, help='json file to save results to')
+    run_parser.add_argument('--quick', action='store_true', help='smaller sizes, skips 100x100 and 300x300 grids')
+    run_parser.add_argument('--filter', default='', help='run only benchmarks with this in name')
+    run_parser.add_argument('--budget', type=float, default=0.2, help='seconds spent in every repeat')
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--compare', default=None, help='baseline json to compare results with')
+    run_parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown, 0.1 is 10%%')
+    compare_parser = commands.add_parser('compare', help='compare two saved results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown, 0.1 is 10%%')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run(args.quick, args.filter, args.budget, args.repeats)
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump({
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'timestamp': time.time(),
+                    'quick': args.quick,
+                    'results': results,
+                }, file, indent=2)
+        if args.compare is None:
+            return
+        baseline = load_results(args.compare)
+    else:
+        baseline, results = load_results(args.baseline), load_results(args.current)
+
+    regressions = compare(baseline, results, args.threshold)
+    if regressions:
+        print(f'{len(regressions)} benchmarks slower by over {args.threshold * 100:.0f}%')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
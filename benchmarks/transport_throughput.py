@@ -0,0 +1,64 @@
+import argparse
+import time
+
+from spade.behaviour import CyclicBehaviour, OneShotBehaviour
+
+from src.agents.transport_agent import TransportAgent
+from src.communication.move_car_protocol import MoveCarMessage, MoveCarTemplate
+from src.communication.transport import TRANSPORTS, get_transport, set_transport
+from src.entity.car import Car, Direction
+
+
+class Receiver(TransportAgent):
+    class Count(CyclicBehaviour):
+        async def run(self):
+            if await self.receive(1):
+                self.agent.received += 1
+
+    async def setup(self):
+        self.received = 0
+        self.add_behaviour(self.Count(), MoveCarTemplate())
+
+
+class Sender(TransportAgent):
+    def __init__(self, jid: str, password: str, to: str, messages: int):
+        super().__init__(jid, password)
+        self.to = to
+        self.messages = messages
+
+    class SendAll(OneShotBehaviour):
+        async def run(self):
+            car = Car(id=1, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+                      create_timestamp=time.time(), path=[Direction.S] * 10)
+            for _ in range(self.agent.messages):
+                await self.send(MoveCarMessage(to=self.agent.to, car=car))
+
+    async def setup(self):
+        self.add_behaviour(self.SendAll())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure messages/sec of agents transport')
+    parser.add_argument('--transport', choices=list(TRANSPORTS), default='local')
+    parser.add_argument('--messages', type=int, default=10000)
+    args = parser.parse_args()
+    set_transport(TRANSPORTS[args.transport]())
+
+    receiver = Receiver("bench_receiver@localhost", "pwd")
+    receiver.start().result()
+    sender = Sender("bench_sender@localhost", "pwd", "bench_receiver@localhost", args.messages)
+    get_transport().stats.reset()
+    start = time.perf_counter()
+    sender.start().result()
+    while receiver.received < args.messages:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.transport}: {args.messages} messages in {elapsed:.3f}s, {args.messages / elapsed:.0f} msg/s")
+    print(get_transport().stats.report())
+    sender.stop().result()
+    receiver.stop().result()
+
+
+if __name__ == "__main__":
+    main()
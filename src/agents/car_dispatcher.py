@@ -1,37 +1,115 @@
-import asyncio
+import logging
+import os
 import time
-from typing import List
+from typing import Iterable, Optional
 
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
 
-from src.communication.move_car_protocol import MoveCarTemplate
-from src.entity.car import Car
+from src.agents.transport_agent import TransportAgent
+from src.commons.instrumentation import get_instrumentation
+from src.commons.streaming_stats import StatsExporter, TravelTimeStats
+from src.communication.move_car_protocol import decode_moved_cars, moved_cars_template
+from src.communication.transport import Transport
 
+logger = logging.getLogger(__name__)
 
-class CarDispatcher(Agent):
+
+class CarDispatcher(TransportAgent):
     """
     Agent collecting cars leaving map
-    Sets dispatch timestamp for received cars, and calculates statistics based on it
+    Sets dispatch timestamp for received cars, and calculates statistics based on it.
+    Cars are not kept, only streaming statistics, optionally exported every stats_period seconds to stats_path.
+    Every wakeup drains all messages waiting in the mailbox, so the dispatcher keeps up with any exit rate,
+    map can also have many dispatchers, e.g. one per edge, whose statistics are merged by merged_stats.
     """
 
+    def __init__(self, jid: str, password: str,
+                 stats_path: Optional[str] = None,
+                 stats_period: float = 10.0,
+                 transport: Optional[Transport] = None):
+        super().__init__(jid=jid, password=password, transport=transport)
+        self.stats = TravelTimeStats()
+        # when the first car left the map, to measure time to the first car from startup
+        self.first_dispatch_timestamp: Optional[float] = None
+        self.stats_path = stats_path
+        self.stats_period = stats_period
+
+    def checkpoint_state(self) -> dict:
+        return {'stats': self.stats, 'first_dispatch_timestamp': self.first_dispatch_timestamp}
+
+    def restore_state(self, state: dict, time_shift: float = 0.0):
+        self.stats = state['stats']
+        if state['first_dispatch_timestamp'] is not None:
+            self.first_dispatch_timestamp = state['first_dispatch_timestamp'] + time_shift
+
     class DispatchCar(CyclicBehaviour):
-        dispatched_cars: List[Car]
+
+        async def run(self):
+            msg = await self.receive(10)
+            if not msg:
+                return
+            with get_instrumentation().measure(self, msg):
+                await self.dispatch(msg)
+
+        async def dispatch(self, msg):
+            instrumentation = get_instrumentation()
+            dispatch_timestamp = time.time()
+            if self.agent.first_dispatch_timestamp is None:
+                self.agent.first_dispatch_timestamp = dispatch_timestamp
+            stats = self.agent.stats
+            dispatched = 0
+            # the rest of the mailbox is taken without waiting, all with the same dispatch timestamp
+            while msg:
+                for car in decode_moved_cars(msg):
+                    car.dispatch_timestamp = dispatch_timestamp
+                    stats.record(car, exit_crossroad=msg.sender)
+                    dispatched += 1
+                msg = await self.receive()
+                if msg:
+                    instrumentation.received(msg)
+            logger.info("%s: dispatched %d cars, in total %d", self.agent.jid, dispatched, stats.count)
+
+    class ExportStats(PeriodicBehaviour):
+        exporter: StatsExporter
 
         async def on_start(self):
-            self.dispatched_cars = []
+            self.exporter = StatsExporter(self.agent.stats_path)
 
         async def run(self):
-            msg = await self.receive(1)  # wait for a message for 10 seconds
-            if msg:
-                car = Car.from_json(msg.body)
-                car.dispatch_timestamp = time.time()
-                self.dispatched_cars.append(car)
-                print("Dispatched:", str(car), f"from {msg.sender}, in total", len(self.dispatched_cars))
-
-            await asyncio.sleep(1)
+            self.exporter.write(self.agent.stats.summary())
 
     async def setup(self):
-        print(f"{self.__class__.__name__} started")
+        logger.info("%s started", self.__class__.__name__)
         dispatch_car = self.DispatchCar()
-        self.add_behaviour(dispatch_car, MoveCarTemplate())
+        self.add_behaviour(dispatch_car, moved_cars_template())
+        if self.stats_path is not None:
+            self.add_behaviour(self.ExportStats(period=self.stats_period))
+
+
+def merged_stats(dispatchers: Iterable[CarDispatcher]) -> TravelTimeStats:
+    """
+    Statistics of all cars dispatched by given dispatchers
+    """
+    stats = TravelTimeStats()
+    for dispatcher in dispatchers:
+        stats.merge(dispatcher.stats)
+    return stats
+
+
+def first_dispatch_timestamp(dispatchers: Iterable[CarDispatcher]) -> Optional[float]:
+    """
+    When the first car left the map through any of given dispatchers, None before that
+    """
+    timestamps = [dispatcher.first_dispatch_timestamp for dispatcher in dispatchers
+                  if dispatcher.first_dispatch_timestamp is not None]
+    return min(timestamps, default=None)
+
+
+def dispatcher_stats_path(stats_path: Optional[str], dispatcher_name: str) -> Optional[str]:
+    """
+    Separate stats file of one of many dispatchers, name of the dispatcher is put before the extension
+    """
+    if stats_path is None:
+        return None
+    base, extension = os.path.splitext(stats_path)
+    return f"{base}.{dispatcher_name}{extension}"
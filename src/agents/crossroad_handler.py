@@ -1,38 +1,58 @@
 import asyncio
-import json
-from typing import Dict, Set, Optional, Tuple, Deque
-from collections import deque
+import logging
+import time
+from typing import Dict, List, Set, Optional, Tuple
+from collections import defaultdict
 
-from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour, OneShotBehaviour, PeriodicBehaviour, FSMBehaviour, State
 
-from src.communication.move_car_protocol import MoveCarMessage, MoveCarTemplate
+from src.agents.transport_agent import TransportAgent
+from src.commons.instrumentation import get_instrumentation
+from src.commons.trace import get_trace_log
+from src.communication.move_car_protocol import MoveCarMessage, MoveCarsBatchMessage, decode_moved_cars, \
+    moved_cars_template
+from src.communication.lane_credit_protocol import LaneCreditMessage, LaneCreditTemplate
 from src.communication.crossroads_info_protocol import CrossroadsInfoTemplate, CrossroadsInfoMessage
-from src.communication.state_recommendation_protocol import StateRecommendationTemplate
-from src.entity.LightState import LightState
+from src.communication.state_recommendation_protocol import StateRecommendationMessage, StateRecommendationTemplate
+from src.entity.LightState import LightState, STATE_SCHEMES, DEFAULT_NEXT_STATE
 from src.entity.car import Car, Direction
+from src.entity.discharge import DischargeModel
+from src.entity.lane_queue import LaneQueue
+from src.entity.status_reporting import StatusReporter, lane_levels
 from src.agents.traffic_info_aggregator import TrafficInfoAggregator
-from src.graphs.intersections_graph import simulation_graph
+from src.graphs.intersections_state import simulation_graph
 
+logger = logging.getLogger(__name__)
 
-class CrossroadHandler(Agent):
+
+class CrossroadHandler(TransportAgent):
     """
     Agent representing crossroad.
     Consists of for queues N, S, W, E storing cars and state of traffic lights.
+    Queues are LaneQueue, so summaries of the lanes are made without going over their cars.
 
     Traffic lights has two states:
     NS - pass cars from N,S queues
     EW - pass cars from E,W queues
 
-    Responses to WaitingHandler for CarCount request.
+    Reports lanes to TrafficInfoAggregator when status_reporter finds it due, at least every update_status_time.
     Reacts to TrafficInfoAggregator for light_change request.
-    Moves cars from opened queues to next crossroad based on Car.path field one at the time.
+    Moves cars from opened queues to next crossroad based on Car.path field, as many as discharge_model lets,
+    moves to a full lane of neighbour crossroad wait for its credit.
     Processes arriving cars by updating queues.
+    State of a stopped crossroad, with its own aggregator, is taken by checkpoint_state
+    and can be restored into a new one before it starts, lights start in the restored state.
     """
 
     def __init__(self, jid: str, password: str,
                  crossroad_id: int,
-                 update_status_time: Optional[float] = 2.0,
+                 update_status_time: Optional[float] = 10.0,
+                 info_summary: bool = False,
+                 status_reporter: Optional[StatusReporter] = None,
+                 discharge_model: Optional[DischargeModel] = None,
+                 move_period: float = 2.0,
+                 batch_moves: bool = True,
+                 aggregator_jid: Optional[str] = None,
                  n_crossroad_jid: Optional[str] = None,
                  s_crossroad_jid: Optional[str] = None,
                  e_crossroad_jid: Optional[str] = None,
@@ -47,48 +67,104 @@ class CrossroadHandler(Agent):
             Direction.E: e_crossroad_jid,
             Direction.W: w_crossroad_jid,
         }
-        self.line_queues: Dict[str, Deque[Car]] = {
-            Direction.N: deque(),
-            Direction.S: deque(),
-            Direction.E: deque(),
-            Direction.W: deque(),
+        self.line_queues: Dict[str, LaneQueue] = {
+            Direction.N: LaneQueue(),
+            Direction.S: LaneQueue(),
+            Direction.E: LaneQueue(),
+            Direction.W: LaneQueue(),
         }
         self.update_status_time = update_status_time
+        self.status_reporter = status_reporter or StatusReporter(heartbeat=update_status_time)
+        self.status_changed: Optional[asyncio.Event] = None
+        self.discharge_model = discharge_model or DischargeModel()
+        self.move_period = move_period
+        # credits for moves to neighbour crossroads, set up from the map in setup
+        self.credits: Dict[str, Optional[int]] = {}
+        self.info_summary = info_summary
+        self.batch_moves = batch_moves
         assert '@' in jid
-        self._aggregator_jid = f'{jid.split("@")[0]}_aggr@{jid.split("@")[1]}'
+        # shared aggregator is started by MapGenerator, otherwise crossroad creates its own one
+        self._own_aggregator = aggregator_jid is None
+        self._aggregator_jid = aggregator_jid or f'{jid.split("@")[0]}_aggr@{jid.split("@")[1]}'
+        self.aggregator: Optional[TrafficInfoAggregator] = None
+        self._aggregator_state: Optional[dict] = None
+
+    def checkpoint_state(self) -> dict:
+        return {
+            'line_queues': {direction: list(queue) for direction, queue in self.line_queues.items()},
+            'lights_state': self.get('lights_state') or self.lights_state,
+            'credits': dict(self.credits),
+            'aggregator': self.aggregator.checkpoint_state() if self.aggregator is not None else None,
+        }
+
+    def restore_state(self, state: dict, time_shift: float = 0.0):
+        for direction, cars in state['line_queues'].items():
+            for car in cars:
+                car.create_timestamp += time_shift
+            self.line_queues[direction] = LaneQueue(cars)
+        self.lights_state = state['lights_state']
+        self.state_scheme = STATE_SCHEMES[self.lights_state]
+        self.credits = dict(state['credits'])
+        self._aggregator_state = state['aggregator']
 
     class MoveCars(PeriodicBehaviour):
 
         def print_queue_state(self):
             line_queues = self.agent.get('line_queues')
-            print('=' * 20 + str(self.agent.jid) + '=' * 20)
+            logger.debug('%s %s %s', '=' * 20, self.agent.jid, '=' * 20)
             for direction in Direction.as_list():
-                print(direction, ':', line_queues[direction])
+                logger.debug('%s : %s', direction, line_queues[direction])
 
         async def run(self):
+            with get_instrumentation().measure(self):
+                await self.move_cars()
+
+        async def move_cars(self):
             """
-            Move one car from open queue, one at the time
+            Move cars from open queues as discharge model allows, cars going to the same neighbour are sent together
             """
             # self.print_queue_state()
             line_queues = self.agent.get('line_queues')
             connected_crossroads = self.agent.get('connected_crossroads')
             state_schema = self.agent.get('state_scheme')
+            credits = self.agent.credits
+            allowances = self.agent.discharge_model.allowances(state_schema, self.agent.move_period)
 
-            # letting one car from each queue at a time
+            departing_cars: Dict[str, List[Car]] = defaultdict(list)
+            freed_places: Dict[str, int] = defaultdict(int)
             for queue_direction, allowed_directions in state_schema.items():
                 # print(f'{self.agent.jid} trying to move cars from {queue} in {allowed_directions=}')
-                if line_queues[queue_direction]:
-                    first_car_in_queue = line_queues[queue_direction][0]
-                    if first_car_in_queue.direction in allowed_directions:
-                        car_to_move = line_queues[queue_direction].popleft()
-                        direction = car_to_move.path.pop(0)
-                        print(
-                            f'MOVECAR: {self.agent.jid}: sending car {car_to_move} to {connected_crossroads[direction]}')
-                        await self.send(MoveCarMessage(
-                            to=connected_crossroads[direction],
-                            car=car_to_move
-                        ))
+                line_queue = line_queues[queue_direction]
+                for _ in range(allowances[queue_direction]):
+                    if not line_queue or line_queue[0].direction not in allowed_directions:
+                        break
+                    direction = line_queue[0].direction
+                    if credits[direction] is not None:
+                        if credits[direction] <= 0:
+                            # downstream lane is full, the car waits for a credit
+                            break
+                        credits[direction] -= 1
+                    car_to_move = line_queue.popleft()
+                    car_to_move.advance()
+                    freed_places[queue_direction] += 1
+                    get_trace_log().car_hop(time.time(), self.agent.get('crossroad_id'), car_to_move.id, direction)
+                    departing_cars[connected_crossroads[direction]].append(car_to_move)
             self.agent.set('line_queues', line_queues)
+            if departing_cars:
+                self.agent.status_changed.set()
+
+            # one message per receiving neighbour
+            for destination_jid, cars in departing_cars.items():
+                logger.debug('MOVECAR: %s: sending cars %s to %s', self.agent.jid, cars, destination_jid)
+                if self.agent.get('batch_moves'):
+                    await self.send(MoveCarsBatchMessage(to=destination_jid, cars=cars))
+                else:
+                    for car in cars:
+                        await self.send(MoveCarMessage(to=destination_jid, car=car))
+            if self.agent.discharge_model.lane_capacity is not None:
+                for lane, count in freed_places.items():
+                    if credits[lane] is not None:
+                        await self.send(LaneCreditMessage(to=connected_crossroads[lane], count=count))
 
     class SimpleLightsState(State):
         def __init__(self, current_state, default_next_state, state_scheme, timeout=30):
@@ -99,18 +175,22 @@ class CrossroadHandler(Agent):
             super().__init__()
 
         async def on_start(self) -> None:
-            print(f'{self.agent.jid} changed state to {self.current_state}')
+            logger.debug('%s changed state to %s', self.agent.jid, self.current_state)
+            get_instrumentation().light_switch(self.agent.get('crossroad_id'))
+            get_trace_log().transition(time.time(), self.agent.get("crossroad_id"), self.current_state)
             simulation_graph.update_intersection_state(self.agent.get("crossroad_id"), self.current_state)
             self.agent.set('lights_state', self.current_state)
             self.agent.set('state_scheme', self.state_scheme)
 
         async def run(self):
             while msg := await self.receive(timeout=self.timeout):
-                recommended_state = json.loads(msg.body)['state']
+                get_instrumentation().received(msg)
+                recommended_state = StateRecommendationMessage.decode(msg)
+                get_trace_log().recommendation(time.time(), self.agent.get("crossroad_id"), recommended_state)
                 if recommended_state != self.current_state:
                     self.set_next_state(recommended_state)
-                    print(
-                        f'RECOMMENDATION: {self.agent.jid}: received info from {msg.sender}! Recommended state: {recommended_state}')
+                    logger.debug('RECOMMENDATION: %s: received info from %s! Recommended state: %s',
+                                 self.agent.jid, msg.sender, recommended_state)
                     break
             else:
                 self.set_next_state(self.default_next_state)
@@ -118,37 +198,92 @@ class CrossroadHandler(Agent):
     class ProcessArrivingCars(CyclicBehaviour):
         async def run(self):
             if msg := await self.receive(10):
-                car = Car.from_json(msg.body)
-                print(f'MOVECAR: {self.agent.jid}: received car {car} from {msg.sender}')
-                reversed_connected_crossroads = self.agent.get('reversed_connected_crossroads')
-                if msg.sender in reversed_connected_crossroads:
-                    direction = reversed_connected_crossroads[msg.sender]
-                else:
-                    direction = car.starting_queue_direction
-                selected_queue_line = self.agent.get('line_queues')
-                selected_queue_line[direction].append(car)
-                self.agent.set("line_queues", selected_queue_line)
+                with get_instrumentation().measure(self, msg):
+                    self.process(msg)
+
+        def process(self, msg):
+            cars = decode_moved_cars(msg)
+            logger.debug('MOVECAR: %s: received cars %s from %s', self.agent.jid, cars, msg.sender)
+            reversed_connected_crossroads = self.agent.get('reversed_connected_crossroads')
+            selected_queue_line = self.agent.get('line_queues')
+            sender = str(msg.sender.bare()) if msg.sender else None
+            if sender in reversed_connected_crossroads:
+                # whole batch comes from one neighbour, so it joins one lane
+                selected_queue_line[reversed_connected_crossroads[sender]].extend(cars)
+            else:
+                for car in cars:
+                    selected_queue_line[car.starting_queue_direction].append(car)
+            self.agent.set("line_queues", selected_queue_line)
+            self.agent.status_changed.set()
 
-                # update simulation graph
-                simulation_graph.update_intersection(
-                    node_id=self.agent.get('crossroad_id'),
-                    values={key: len(value) for key, value in selected_queue_line.items()}
-                )
+            # update simulation graph
+            simulation_graph.update_intersection(
+                node_id=self.agent.get('crossroad_id'),
+                values={key: len(value) for key, value in selected_queue_line.items()}
+            )
+
+    class ProcessCredits(CyclicBehaviour):
+        async def run(self):
+            if msg := await self.receive(10):
+                with get_instrumentation().measure(self, msg):
+                    self.agent.add_credits(msg.sender, LaneCreditMessage.decode(msg))
 
     class SendWaitingInfo(CyclicBehaviour):
+        """
+        Sends lanes to the aggregator when status_reporter finds report due,
+        waits for change of the lanes or the time report may become due without one
+        """
+
         async def run(self):
-            await asyncio.sleep(1)
-            await self.send(CrossroadsInfoMessage(to=self.agent.get('_aggregator_jid'),
-                                                  line_queues=self.agent.get('line_queues'),
-                                                  current_state=self.agent.get('lights_state')))
-            print(
-                f'CROSSROADS INFO: {self.agent.jid}: sending  to {self.agent.get("_aggregator_jid")}')
-            await asyncio.sleep(self.agent.get('update_status_time'))
+            reporter = self.agent.status_reporter
+            status_changed = self.agent.status_changed
+            status_changed.clear()
+            with get_instrumentation().measure(self):
+                counts, oldest_ages, now = await self.report(reporter)
+            try:
+                await asyncio.wait_for(status_changed.wait(),
+                                       timeout=max(0.0, reporter.next_check_ts(counts, oldest_ages, now) - time.time()))
+            except asyncio.TimeoutError:
+                pass
+            # change is reported once min_interval since the last report passes
+            await asyncio.sleep(max(0.0, reporter.change_ts(time.time()) - time.time()))
+
+        async def report(self, reporter: StatusReporter):
+            """
+            Send lanes if report is due, lane levels are returned for the next check
+            """
+            line_queues = self.agent.get('line_queues')
+            now = time.time()
+            counts, oldest_ages = lane_levels(line_queues, Direction.as_list(), now)
+            get_instrumentation().queue_lengths(self.agent.get('crossroad_id'), Direction.as_list(), counts)
+            if reporter.report_if_due(counts, oldest_ages, now):
+                get_trace_log().lane_snapshot(now, self.agent.get('crossroad_id'),
+                                              dict(zip(Direction.as_list(), counts)))
+                await self.send(CrossroadsInfoMessage(to=self.agent.get('_aggregator_jid'),
+                                                      line_queues=line_queues,
+                                                      current_state=self.agent.get('lights_state'),
+                                                      summary=self.agent.get('info_summary')))
+                logger.debug('CROSSROADS INFO: %s: sending to %s', self.agent.jid, self.agent.get("_aggregator_jid"))
+            return counts, oldest_ages, now
+
+    def add_credits(self, sender, count: int):
+        """
+        Credits returned by downstream neighbour sender for the lane facing it, up to the lane capacity.
+        Credits from an agent which is not a neighbour are ignored.
+        """
+        direction = self.get('reversed_connected_crossroads').get(str(sender.bare()) if sender else None)
+        if direction is None:
+            logger.warning('LANECREDIT: %s: credits from %s, which is not a neighbour, ignored', self.jid, sender)
+            return
+        self.credits[direction] = min(self.credits[direction] + count, self.discharge_model.lane_capacity)
 
     class CreateAggregator(OneShotBehaviour):
         async def run(self):
             aggr_agent = TrafficInfoAggregator(self.agent.get("_aggregator_jid"), "pwd")
-            await aggr_agent.start(auto_register=True)
+            if self.agent._aggregator_state is not None:
+                aggr_agent.restore_state(self.agent._aggregator_state)
+            self.agent.aggregator = aggr_agent
+            await aggr_agent.start(auto_register=self.agent.auto_register)
 
     async def setup(self):
         self.set("crossroad_id", self.crossroad_id)
@@ -158,19 +293,27 @@ class CrossroadHandler(Agent):
         self.set("connected_crossroads", self.connected_crossroads)
         self.set("reversed_connected_crossroads", dict((reversed(item) for item in self.connected_crossroads.items())))
         self.set("update_status_time", self.update_status_time)
+        self.set("info_summary", self.info_summary)
+        self.set("batch_moves", self.batch_moves)
         self.set("_aggregator_jid", self._aggregator_jid)
+        self.status_changed = asyncio.Event()
+        if not self.credits:
+            # restored credits are kept
+            self.credits = self.discharge_model.initial_credits(simulation_graph.get_node_neighbors(self.crossroad_id))
 
-        create_aggr = self.CreateAggregator()
-        self.add_behaviour(create_aggr)
-        # create_aggr.join()
+        if self._own_aggregator:
+            create_aggr = self.CreateAggregator()
+            self.add_behaviour(create_aggr)
+            # create_aggr.join()
 
-        print('Created Aggregator agent: ', self._aggregator_jid)
+            logger.info('Created Aggregator agent: %s', self._aggregator_jid)
 
-        move_cars = self.MoveCars(period=2)
+        move_cars = self.MoveCars(period=self.move_period)
         self.add_behaviour(move_cars)
+        self.add_behaviour(self.ProcessCredits(), LaneCreditTemplate())
 
         process_arriving_cars = self.ProcessArrivingCars()
-        self.add_behaviour(process_arriving_cars, MoveCarTemplate())
+        self.add_behaviour(process_arriving_cars, moved_cars_template())
 
         send_waiting_info = self.SendWaitingInfo()
         self.add_behaviour(send_waiting_info)
@@ -178,20 +321,14 @@ class CrossroadHandler(Agent):
         process_state_info = FSMBehaviour()
         ns_state = self.SimpleLightsState(
             current_state=LightState.NS,
-            default_next_state=LightState.EW,
-            state_scheme={
-                Direction.N: {Direction.S, Direction.E, Direction.W},
-                Direction.S: {Direction.N, Direction.E, Direction.W},
-            })
-        process_state_info.add_state(name=LightState.NS, state=ns_state)
+            default_next_state=DEFAULT_NEXT_STATE[LightState.NS],
+            state_scheme=STATE_SCHEMES[LightState.NS])
+        process_state_info.add_state(name=LightState.NS, state=ns_state, initial=self.lights_state == LightState.NS)
         ew_state = self.SimpleLightsState(
             current_state=LightState.EW,
-            default_next_state=LightState.NS,
-            state_scheme={
-                Direction.E: {Direction.W, Direction.N, Direction.S},
-                Direction.W: {Direction.E, Direction.N, Direction.S},
-            })
-        process_state_info.add_state(name=LightState.EW, state=ew_state, initial=True)
+            default_next_state=DEFAULT_NEXT_STATE[LightState.EW],
+            state_scheme=STATE_SCHEMES[LightState.EW])
+        process_state_info.add_state(name=LightState.EW, state=ew_state, initial=self.lights_state == LightState.EW)
         process_state_info.add_transition(source=LightState.NS, dest=LightState.EW)
         process_state_info.add_transition(source=LightState.EW, dest=LightState.NS)
         self.add_behaviour(process_state_info, StateRecommendationTemplate())
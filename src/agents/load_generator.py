@@ -1,33 +1,66 @@
 import asyncio
+import logging
 import random
 import time
-from typing import List
+from typing import List, Optional
 
-from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour
+from spade.behaviour import CyclicBehaviour, OneShotBehaviour
 from spade.message import Message
 import numpy as np
 
-from src.communication.move_car_protocol import MoveCarMessage
-from src.entity.car import Car, Direction
+from src.agents.transport_agent import TransportAgent
+from src.commons.arrivals import ArrivalGenerator, SinusoidalProfile
+from src.commons.trace import get_trace_log, read_injections
+from src.communication.move_car_protocol import MoveCarMessage, MoveCarsBatchMessage
+from src.entity.car import Car
+from src.graphs.intersections_state import simulation_graph
+from src.graphs.routing import OriginDestinationDemand, Router
 
+logger = logging.getLogger(__name__)
 
-class LoadGenerator(Agent):
+
+class LoadGenerator(TransportAgent):
     """
     Agent generating cars with defined intervals on input to crossroads.
     Cars are send with sine wave frequency and given max/min intervals.
-    Sends message to CrossroadHandler that car has arrived to one of its line
+    Sends message to CrossroadHandler that car has arrived to one of its line.
+    Cars enter the map on boundary crossroads of available_crossroads_ids and take the shortest route
+    to a destination drawn from origin-destination demand, uniform between boundary crossroads by default.
+    With seed the same sequence of cars is generated on every run.
     """
 
     available_crossroads_ids: List[int]
     min_interval: int
     max_interval: int
 
-    def __init__(self, jid: str, password: str, min_interval: int, max_interval: int, available_crossroads_ids: List[int]):
+    def __init__(self, jid: str, password: str, min_interval: int, max_interval: int, available_crossroads_ids: List[int],
+                 seed: Optional[int] = None, router: Optional[Router] = None,
+                 demand: Optional[OriginDestinationDemand] = None):
         super().__init__(jid, password)
         self.available_crossroads_ids = available_crossroads_ids
         self.min_interval = min_interval
         self.max_interval = max_interval
+        self.random = random.Random(seed)
+        self.router = router
+        self.demand = demand
+        # counters GenerateCar starts from, other than 0 when restored from checkpoint
+        self.generated_cars = 0
+        self.sample = 0
+        self.generate_car: Optional[LoadGenerator.GenerateCar] = None
+
+    def checkpoint_state(self) -> dict:
+        behaviour = self.generate_car
+        started = behaviour is not None and hasattr(behaviour, 'sample')
+        return {
+            'random': self.random.getstate(),
+            'generated_cars': behaviour.generated_cars if started else self.generated_cars,
+            'sample': behaviour.sample if started else self.sample,
+        }
+
+    def restore_state(self, state: dict, time_shift: float = 0.0):
+        self.random.setstate(state['random'])
+        self.generated_cars = state['generated_cars']
+        self.sample = state['sample']
 
     class GenerateCar(CyclicBehaviour):
         generated_cars: int
@@ -35,38 +68,144 @@ class LoadGenerator(Agent):
         frequency: np.ndarray
 
         def generate_car(self) -> Car:
-            path = [random.choice(Direction.as_list()) for _ in range(10)]
-            # path = [Direction.E, Direction.E]
+            router = self.agent.router
+            origin, destination = self.agent.demand.sample_one(self.agent.random)
             self.generated_cars += 1
             return Car(
                 id=self.generated_cars,
-                starting_crossroad_id=1,
-                starting_queue_direction=random.choice(Direction.as_list()),
+                starting_crossroad_id=origin,
+                starting_queue_direction=router.entry_side(origin),
                 create_timestamp=time.time(),
-                path=path
+                path=router.route(origin, destination)
             )
 
         async def on_start(self):
-            self.generated_cars = 0
-            self.sample = 0
+            self.generated_cars = self.agent.generated_cars
+            self.sample = self.agent.sample
             min_inter = self.get("min_interval")
             max_inter = self.get("max_interval")
             self.frequency = ((max_inter + min_inter)/2) + (((max_inter - min_inter)/2) * np.sin(2*np.linspace(0, 2*np.pi, 20)))
 
         async def run(self):
-            print('sent car')
-            available_crossroads_ids = self.get("available_crossroads_ids")
-            crossroad_id = random.choice(available_crossroads_ids)
-            await self.send(MoveCarMessage(to=f"crossroad{crossroad_id}@localhost", car=self.generate_car()))
+            logger.debug('sent car')
+            car = self.generate_car()
+            crossroad_id = car.starting_crossroad_id
+            get_trace_log().car_injected(car.create_timestamp, crossroad_id, car)
+            await self.send(MoveCarMessage(to=f"crossroad{crossroad_id}@localhost", car=car))
             await asyncio.sleep(self.frequency[self.sample])
             self.sample = (self.sample + 1) % len(self.frequency)
-            print(self.sample)
+            logger.debug('%s', self.sample)
  
     async def setup(self):
-        print(f"{self.__class__.__name__} started")
+        logger.info("%s started", self.__class__.__name__)
         self.set("min_interval", self.min_interval)
         self.set("max_interval", self.max_interval)
         self.set("available_crossroads_ids", self.available_crossroads_ids)
+        if self.router is None:
+            self.router = Router(simulation_graph.neighbors)
+        if self.demand is None:
+            self.demand = OriginDestinationDemand.uniform(self.router, self.available_crossroads_ids)
+
+        self.generate_car = self.GenerateCar()
+        self.add_behaviour(self.generate_car)
+
+
+class ArrivalLoadGenerator(TransportAgent):
+    """
+    Agent generating high rate load for stress tests: rate cars per second arrive on boundary crossroads
+    of available_crossroads_ids as non-homogeneous Poisson process with sinusoidal profile of given
+    amplitude and period. Every time_slice all cars due are sent, one MoveCarsBatchMessage per crossroad.
+    With seed the same cars arrive at the same offsets from the start on every run.
+    """
+
+    def __init__(self, jid: str, password: str, rate: float, available_crossroads_ids: List[int],
+                 seed: Optional[int] = None, amplitude: float = 0.5, period: float = 60.0, time_slice: float = 0.1,
+                 router: Optional[Router] = None, demand: Optional[OriginDestinationDemand] = None):
+        super().__init__(jid, password)
+        assert time_slice > 0
+        self.rate = rate
+        self.available_crossroads_ids = available_crossroads_ids
+        self.seed = seed
+        self.profile = SinusoidalProfile(amplitude=amplitude, period=period)
+        self.time_slice = time_slice
+        self.router = router
+        self.demand = demand
+        self.arrivals: Optional[ArrivalGenerator] = None
+        # seconds of arrival schedule already sent, and schedule state to continue from, when restored
+        self.start_offset = 0.0
+        self._arrivals_state: Optional[dict] = None
+        self.send_arrivals: Optional[ArrivalLoadGenerator.SendArrivals] = None
+
+    def checkpoint_state(self) -> dict:
+        behaviour = self.send_arrivals
+        return {
+            'arrivals': self.arrivals.checkpoint_state() if self.arrivals is not None else self._arrivals_state,
+            'slice_end': behaviour.slice_end if behaviour is not None and hasattr(behaviour, 'slice_end')
+            else self.start_offset,
+        }
+
+    def restore_state(self, state: dict, time_shift: float = 0.0):
+        self._arrivals_state = state['arrivals']
+        self.start_offset = state['slice_end']
+
+    class SendArrivals(CyclicBehaviour):
+        start_time: float
+        slice_end: float
+
+        async def on_start(self):
+            # schedule restored from checkpoint continues from start_offset
+            self.slice_end = self.agent.start_offset
+            self.start_time = time.time() - self.slice_end
+
+        async def run(self):
+            self.slice_end += self.agent.time_slice
+            # sleep to the end of the slice on the wall clock, so slow slices do not accumulate delay
+            await asyncio.sleep(max(0.0, self.start_time + self.slice_end - time.time()))
+            trace_log = get_trace_log()
+            for crossroad_id, cars in self.agent.arrivals.cars_until(self.slice_end, self.start_time).items():
+                for car in cars:
+                    trace_log.car_injected(car.create_timestamp, crossroad_id, car)
+                await self.send(MoveCarsBatchMessage(to=f"crossroad{crossroad_id}@localhost", cars=cars))
+
+    async def setup(self):
+        logger.info("%s started", self.__class__.__name__)
+        if self.router is None:
+            self.router = Router(simulation_graph.neighbors)
+        if self.demand is None:
+            self.demand = OriginDestinationDemand.uniform(self.router, self.available_crossroads_ids)
+        self.arrivals = ArrivalGenerator(self.router, self.demand, self.rate, seed=self.seed, profile=self.profile)
+        if self._arrivals_state is not None:
+            self.arrivals.restore_state(self._arrivals_state)
+        self.send_arrivals = self.SendArrivals()
+        self.add_behaviour(self.send_arrivals)
+
 
-        generate_car = self.GenerateCar()
-        self.add_behaviour(generate_car)
+class ReplayLoadGenerator(TransportAgent):
+    """
+    Agent sending cars recorded in a trace log to the same crossroads, keeping recorded intervals
+    divided by speed. Cars get new create timestamp when sent, agent stops after the last car.
+    """
+
+    def __init__(self, jid: str, password: str, trace_path: str, speed: float = 1.0):
+        super().__init__(jid, password)
+        assert speed > 0
+        self.trace_path = trace_path
+        self.speed = speed
+
+    class ReplayCars(OneShotBehaviour):
+
+        async def run(self):
+            previous_timestamp = None
+            for timestamp, crossroad_id, car in read_injections(self.agent.trace_path):
+                if previous_timestamp is not None:
+                    await asyncio.sleep((timestamp - previous_timestamp) / self.agent.speed)
+                previous_timestamp = timestamp
+                car.create_timestamp = time.time()
+                get_trace_log().car_injected(car.create_timestamp, crossroad_id, car)
+                await self.send(MoveCarMessage(to=f"crossroad{crossroad_id}@localhost", car=car))
+                logger.debug('replayed car %s', car.id)
+            await self.agent.stop()
+
+    async def setup(self):
+        logger.info("%s started", self.__class__.__name__)
+        self.add_behaviour(self.ReplayCars())
@@ -0,0 +1,79 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, Optional
+
+
+def start_agents(agents: Iterable, auto_register: bool = True, concurrency: int = 64) -> int:
+    """
+    Start agents concurrently, at most concurrency of them are starting at the same time.
+    SPADE runs starts in its event loop, so registration and connection of many agents overlap
+    instead of waiting for each other. Without auto_register agents log in to accounts provisioned beforehand.
+    Returns number of started agents, the first failed start raises its exception.
+    """
+    assert concurrency >= 1
+    pending = set()
+    started = 0
+    for agent in agents:
+        if len(pending) >= concurrency:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+        pending.add(agent.start(auto_register=auto_register))
+        started += 1
+    for future in pending:
+        future.result()
+    return started
+
+
+def process_started_at() -> Optional[float]:
+    """
+    Wall clock time the current process started at, so startup breakdown includes interpreter start and imports.
+    Read from /proc on Linux, None elsewhere.
+    """
+    try:
+        with open('/proc/self/stat') as file:
+            # command name in parentheses may contain spaces, start time is the 20th field after it
+            start_ticks = int(file.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as file:
+            uptime = float(file.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return time.time() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+
+
+class StartupTimer:
+    """
+    Wall clock durations of startup phases, each measured from the end of the previous one,
+    so the breakdown sums up to the time since started_at, e.g. process start
+    """
+
+    def __init__(self, started_at: Optional[float] = None, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.started_at = clock() if started_at is None else started_at
+        self.phases: Dict[str, float] = {}
+        self._last = self.started_at
+
+    def phase(self, name: str) -> float:
+        """
+        End phase of the given name now, returns its duration
+        """
+        now = self.clock()
+        self.phases[name] = now - self._last
+        self._last = now
+        return self.phases[name]
+
+    @property
+    def elapsed(self) -> float:
+        return self._last - self.started_at
+
+    def report(self, first_car_timestamp: Optional[float] = None) -> dict:
+        """
+        Phase durations and their total, with time to the first car reaching its exit since started_at if known
+        """
+        return {
+            **{name: round(duration, 3) for name, duration in self.phases.items()},
+            'total': round(self.elapsed, 3),
+            'time_to_first_car': None if first_car_timestamp is None else
+            round(first_car_timestamp - self.started_at, 3),
+        }
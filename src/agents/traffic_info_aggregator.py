@@ -1,31 +1,68 @@
 import asyncio
-import json
+import logging
+from typing import Callable, Dict, Optional
 
-from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour
 
-from src.communication.crossroads_info_protocol import CrossroadsInfoTemplate
+from src.agents.transport_agent import TransportAgent
+from src.commons.instrumentation import get_instrumentation
+from src.communication.transport import Transport
+from src.communication.codec import message_codec
+from src.communication.crossroads_info_protocol import CrossroadsInfoTemplate, CrossroadsInfoMessage
 from src.communication.state_recommendation_protocol import StateRecommendationMessage
-from src.entity.algorithms import LargestFirst, WeightedSum, AverageWait
+from src.entity.algorithms import Algorithm, LargestFirst, WeightedSum, AverageWait
 
+logger = logging.getLogger(__name__)
 
-class TrafficInfoAggregator(Agent):
+
+class TrafficInfoAggregator(TransportAgent):
     """
     Agent requesting number of awaiting cars from WaitingHandler.
-    Based on number of awaiting cars, chooses state of the traffic lights and sends change request to Crossroad
+    Based on number of awaiting cars, chooses state of the traffic lights and sends change request to Crossroad.
+    One aggregator can serve many crossroads, every sender gets its own algorithm instance,
+    so decisions (and starvation deadlines) of the crossroads stay independent.
+    Recommendation is sent right away, reply_delay > 0 delays it, e.g. to emulate slow controller.
     """
 
+    def __init__(self, jid: str, password: str,
+                 algorithm_factory: Callable[..., Algorithm] = AverageWait,
+                 algorithm_timeout: float = 10,
+                 reply_delay: float = 0.0,
+                 transport: Optional[Transport] = None):
+        super().__init__(jid=jid, password=password, transport=transport)
+        self.algorithm_factory = algorithm_factory
+        self.algorithm_timeout = algorithm_timeout
+        self.reply_delay = reply_delay
+        self.algorithms: Dict[str, Algorithm] = {}
+
+    def algorithm_for(self, crossroad_jid: str) -> Algorithm:
+        algorithm = self.algorithms.get(crossroad_jid)
+        if algorithm is None:
+            algorithm = self.algorithms[crossroad_jid] = self.algorithm_factory(timeout=self.algorithm_timeout)
+        return algorithm
+
+    def checkpoint_state(self) -> dict:
+        """
+        Starvation timers of algorithms of served crossroads
+        """
+        return {'algorithms': {crossroad_jid: algorithm.checkpoint_state()
+                               for crossroad_jid, algorithm in self.algorithms.items()}}
+
+    def restore_state(self, state: dict, time_shift: float = 0.0):
+        for crossroad_jid, algorithm_state in state['algorithms'].items():
+            self.algorithm_for(crossroad_jid).restore_state(algorithm_state)
+
     class AggregateLines(CyclicBehaviour):
         sent_messages: int
 
         async def on_start(self):
-            print("Starting behaviour . . .")
+            logger.info("Starting behaviour . . .")
             self.sent_messages = 0
 
         async def run(self):
             # await self.send(RequestCountCars("waiting_handler@localhost"))
             cars_count = await self.receive()
-            print("counted cars: ", cars_count)
+            logger.debug("counted cars: %s", cars_count)
             await asyncio.sleep(3)
 
             if self.sent_messages > 10:
@@ -34,7 +71,7 @@ class TrafficInfoAggregator(Agent):
 
     class Alive(CyclicBehaviour):
         async def run(self):
-            print(f"ALIVE : {self.agent.jid}")
+            logger.debug("ALIVE : %s", self.agent.jid)
             await asyncio.sleep(3)
 
     class ProcessCrossroadsInfo(CyclicBehaviour):
@@ -42,23 +79,30 @@ class TrafficInfoAggregator(Agent):
         async def run(self):
             msg = await self.receive(20)
             if msg:
-                msg_body = json.loads(msg.body)
-                line_queues, current_state = msg_body['line_queues'], msg_body['current_state']
-                print(f'CROSSROADS INFO: {self.agent.jid}: received info from {msg.sender}!')
-
-                recommended_state = self.agent.get('algorithm').recommend_state(lines=line_queues,
-                                                                                current_state=current_state)
-                await asyncio.sleep(1)
-                await self.send(StateRecommendationMessage(
-                    to=str(msg.sender),
-                    state=recommended_state
-                ))
+                with get_instrumentation().measure(self, msg):
+                    line_queues, current_state = CrossroadsInfoMessage.decode(msg)
+                    logger.debug('CROSSROADS INFO: %s: received info from %s!', self.agent.jid, msg.sender)
+
+                    recommended_state = self.agent.algorithm_for(str(msg.sender)).recommend_state(
+                        lines=line_queues, current_state=current_state)
+                    if self.agent.reply_delay:
+                        # reply is delayed without blocking, so other crossroads of the shard are not held back
+                        asyncio.ensure_future(self.reply(msg, recommended_state))
+                    else:
+                        await self.reply(msg, recommended_state)
+
+        async def reply(self, msg, recommended_state: str):
+            if self.agent.reply_delay:
+                await asyncio.sleep(self.agent.reply_delay)
+            await self.send(StateRecommendationMessage(
+                to=str(msg.sender),
+                state=recommended_state,
+                codec=message_codec(msg)
+            ))
 
     async def setup(self):
-        print("TrafficInfoAggregator started")
-        # self.set('algorithm', LargestFirst(timeout=10))
-        self.set('algorithm', AverageWait(timeout=10))
-        # self.set('algorithm', WeightedSum(timeout=10))
+        logger.info("TrafficInfoAggregator started")
+        # algorithms are created per crossroad by algorithm_for, e.g. algorithm_factory=LargestFirst or WeightedSum
 
         process_crossroads_info = self.ProcessCrossroadsInfo()
         self.add_behaviour(process_crossroads_info, CrossroadsInfoTemplate())
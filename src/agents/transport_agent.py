@@ -0,0 +1,45 @@
+from typing import Optional
+
+from spade.agent import Agent
+
+from src.commons.instrumentation import get_instrumentation
+from src.communication.transport import Transport, get_transport
+
+
+class _TransportContainer:
+    """
+    Proxy of SPADE container passing messages sent by behaviours to agent's transport,
+    stamped with send time when instrumentation is enabled
+    """
+
+    def __init__(self, container, transport: Transport):
+        self._container = container
+        self._transport = transport
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+    async def send(self, msg, behaviour):
+        get_instrumentation().stamp(msg)
+        await self._transport.send(msg, behaviour)
+
+
+class TransportAgent(Agent):
+    """
+    Agent connected and communicating through pluggable Transport.
+    Behaviours keep using send/receive, transport defaults to the one selected with set_transport.
+    auto_register of the start is kept, so agents started by this one register the same way.
+    """
+
+    def __init__(self, jid: str, password: str, transport: Optional[Transport] = None):
+        super().__init__(jid=jid, password=password)
+        self.transport = transport or get_transport()
+        self.auto_register = True
+        self.set_container(_TransportContainer(self.container, self.transport))
+
+    async def _async_start(self, auto_register: bool = True) -> None:
+        self.auto_register = auto_register
+        await self.transport.start_agent(self, auto_register)
+
+    async def _async_stop(self) -> None:
+        await self.transport.stop_agent(self)
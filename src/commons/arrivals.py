@@ -0,0 +1,132 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.entity.car import Car
+from src.graphs.grid import NEIGHBOR_DIRECTIONS
+from src.graphs.routing import OriginDestinationDemand, Router
+
+
+class SinusoidalProfile:
+    """
+    Rate multiplier 1 + amplitude * sin(2 pi t / period + phase), amplitude 0 gives homogeneous Poisson arrivals
+    """
+
+    def __init__(self, amplitude: float = 0.0, period: float = 60.0, phase: float = 0.0):
+        assert 0 <= amplitude <= 1 and period > 0
+        self.amplitude = amplitude
+        self.period = period
+        self.phase = phase
+
+    @property
+    def peak(self) -> float:
+        return 1 + self.amplitude
+
+    def __call__(self, times: np.ndarray) -> np.ndarray:
+        return 1 + self.amplitude * np.sin(2 * math.pi * times / self.period + self.phase)
+
+
+class ArrivalSchedule:
+    """
+    Non-homogeneous Poisson arrivals on many entry points, rates[i] cars per second on entry i times the profile.
+    Arrivals are drawn ahead in horizon long chunks with NumPy: Poisson count at the peak rate of every entry,
+    uniform times, then thinning keeps an arrival with probability profile(t) / profile.peak.
+    """
+
+    def __init__(self, rates: np.ndarray, rng: np.random.Generator, profile: Optional[SinusoidalProfile] = None,
+                 horizon: float = 10.0):
+        self.rates = np.asarray(rates, dtype=np.float64)
+        assert np.all(self.rates >= 0) and horizon > 0
+        self.rng = rng
+        self.profile = profile or SinusoidalProfile()
+        self.horizon = horizon
+        self._generated_until = 0.0
+        self._times = np.zeros(0, dtype=np.float64)
+        self._entries = np.zeros(0, dtype=np.int64)
+
+    def _generate_chunk(self):
+        start = self._generated_until
+        counts = self.rng.poisson(self.rates * self.profile.peak * self.horizon)
+        entries = np.repeat(np.arange(len(self.rates)), counts)
+        times = start + self.rng.random(len(entries)) * self.horizon
+        kept = self.rng.random(len(entries)) * self.profile.peak < self.profile(times)
+        order = np.argsort(times[kept], kind='stable')
+        self._times = np.concatenate([self._times, times[kept][order]])
+        self._entries = np.concatenate([self._entries, entries[kept][order]])
+        self._generated_until = start + self.horizon
+
+    def until(self, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Times and entry indices of arrivals due before end, not returned by earlier calls, sorted by time
+        """
+        while self._generated_until < end:
+            self._generate_chunk()
+        due = int(np.searchsorted(self._times, end))
+        times, self._times = self._times[:due], self._times[due:]
+        entries, self._entries = self._entries[:due], self._entries[due:]
+        return times, entries
+
+    def checkpoint_state(self) -> dict:
+        """
+        Arrivals drawn ahead and not returned yet, state of rng is kept by its owner
+        """
+        return {'generated_until': self._generated_until, 'times': self._times, 'entries': self._entries}
+
+    def restore_state(self, state: dict):
+        self._generated_until = state['generated_until']
+        self._times = state['times']
+        self._entries = state['entries']
+
+
+class ArrivalGenerator:
+    """
+    Cars arriving on boundary crossroads by ArrivalSchedule, rate cars per second on the whole map split
+    between origins of demand by their weights. Destinations come from demand, paths from router,
+    all cars due in a time slice are built at once and grouped by the crossroad they enter.
+    With the same seed the same cars arrive at the same times.
+    """
+    _DIRECTION_BYTES = np.frombuffer(''.join(NEIGHBOR_DIRECTIONS).encode('ascii'), dtype=np.uint8)
+
+    def __init__(self, router: Router, demand: OriginDestinationDemand, rate: float, seed: Optional[int] = None,
+                 profile: Optional[SinusoidalProfile] = None, horizon: float = 10.0):
+        self.router = router
+        self.demand = demand
+        self.rng = np.random.default_rng(seed)
+        self.schedule = ArrivalSchedule(demand.origin_rates(rate), self.rng, profile, horizon)
+        self.generated_cars = 0
+
+    def checkpoint_state(self) -> dict:
+        return {'rng': self.rng.bit_generator.state, 'generated_cars': self.generated_cars,
+                'schedule': self.schedule.checkpoint_state()}
+
+    def restore_state(self, state: dict):
+        """
+        Continue arrivals of a checkpoint, the same cars arrive as if the run was not interrupted
+        """
+        self.rng.bit_generator.state = state['rng']
+        self.generated_cars = state['generated_cars']
+        self.schedule.restore_state(state['schedule'])
+
+    def cars_until(self, end: float, time_offset: float = 0.0) -> Dict[int, List[Car]]:
+        """
+        Cars due before end seconds of schedule, by starting crossroad.
+        Create timestamp of a car is its arrival time plus time_offset, e.g. wall clock time of schedule start.
+        """
+        times, origin_indices = self.schedule.until(end)
+        if not len(times):
+            return {}
+        origins = self.demand.origins[origin_indices]
+        destinations = self.demand.sample_destinations(origin_indices, self.rng)
+        codes, lengths = self.router.route_batch(origins, destinations)
+        paths = self._DIRECTION_BYTES[codes]
+        entry_sides = [NEIGHBOR_DIRECTIONS[side] for side in self.router.entry_sides[origins].tolist()]
+        first_id = self.generated_cars + 1
+        self.generated_cars += len(times)
+        cars: Dict[int, List[Car]] = {}
+        for offset, (origin, entry_side, timestamp, path, length) in enumerate(zip(
+                origins.tolist(), entry_sides, (times + time_offset).tolist(), paths, lengths.tolist())):
+            car = Car(id=first_id + offset, starting_crossroad_id=origin, starting_queue_direction=entry_side,
+                      create_timestamp=timestamp, path=path[:length].tobytes().decode('ascii'))
+            cars.setdefault(origin, []).append(car)
+        return cars
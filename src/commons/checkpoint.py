@@ -0,0 +1,50 @@
+import gzip
+import os
+import pickle
+import time
+from typing import Iterable, Optional
+
+MAGIC = b'KJCKPT1\n'
+
+
+def save_checkpoint(path: str, state) -> int:
+    """
+    Write state to gzip compressed pickle file starting with MAGIC, returns size of the file in bytes
+    """
+    with gzip.open(path, 'wb', compresslevel=6) as file:
+        file.write(MAGIC)
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return os.path.getsize(path)
+
+
+def load_checkpoint(path: str):
+    with gzip.open(path, 'rb') as file:
+        assert file.read(len(MAGIC)) == MAGIC, f'{path} is not a simulation checkpoint'
+        return pickle.load(file)
+
+
+def checkpoint_agents(agents: Iterable, now: Optional[float] = None) -> dict:
+    """
+    States of agents by their bare jid, with wall clock time they were taken at.
+    Agents should be stopped, or at least not running behaviours, while their state is taken.
+    """
+    return {
+        'timestamp': time.time() if now is None else now,
+        'agents': {str(agent.jid.bare()): agent.checkpoint_state() for agent in agents},
+    }
+
+
+def restore_agents(agents: Iterable, checkpoint: dict, now: Optional[float] = None) -> int:
+    """
+    Restore states of agents found in checkpoint before they are started, returns number of restored agents.
+    Wall clock timestamps of the checkpoint, e.g. creation times of waiting cars, are moved by the time passed
+    since it was taken, so waiting times continue where they were.
+    """
+    time_shift = (time.time() if now is None else now) - checkpoint['timestamp']
+    restored = 0
+    for agent in agents:
+        state = checkpoint['agents'].get(str(agent.jid.bare()))
+        if state is not None:
+            agent.restore_state(state, time_shift)
+            restored += 1
+    return restored
@@ -0,0 +1,186 @@
+import json
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+from src.commons.streaming_stats import LogHistogram
+
+# metadata key of the wall clock time message was sent at, stamped only while instrumentation is enabled
+SENT_AT_METADATA_KEY = 'sent_at'
+
+
+class _NotMeasured:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOT_MEASURED = _NotMeasured()
+
+
+class Instrumentation:
+    """
+    Instrumentation recording nothing, used when it is disabled
+    """
+
+    def measure(self, behaviour, msg=None):
+        """
+        Context measuring run of behaviour after it received msg
+        """
+        return _NOT_MEASURED
+
+    def received(self, msg):
+        pass
+
+    def stamp(self, msg):
+        pass
+
+    def queue_lengths(self, crossroad_id: int, lanes: Sequence[str], counts: Sequence[int]):
+        pass
+
+    def light_switch(self, crossroad_id: int):
+        pass
+
+    def snapshot(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class _Measurement:
+    __slots__ = ('_instrumentation', '_name', '_started')
+
+    def __init__(self, instrumentation: 'MetricsInstrumentation', name: str):
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self):
+        self._started = self._instrumentation.perf_clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        instrumentation = self._instrumentation
+        instrumentation.run_duration(self._name).record(instrumentation.perf_clock() - self._started)
+        instrumentation.dump_if_due()
+        return False
+
+
+class MetricsInstrumentation(Instrumentation):
+    """
+    Low overhead metrics of running agents, kept in fixed size histograms:
+    run duration of every behaviour class (only the work after a message is received, not waiting for one),
+    mailbox depth seen when a run starts, send to receive latency per ontology of messages stamped in their
+    metadata when sent, lane queue lengths of crossroads and counts of light switches.
+    snapshot() can be pulled any time, with path it is also appended to a JSONL file every interval seconds.
+    """
+
+    def __init__(self, path: Optional[str] = None, interval: float = 10.0,
+                 clock: Callable[[], float] = time.time, perf_clock: Callable[[], float] = time.perf_counter):
+        self.path = path
+        self.interval = interval
+        self.clock = clock
+        self.perf_clock = perf_clock
+        self.run_durations: Dict[str, LogHistogram] = {}
+        self.mailbox_depths: Dict[str, List[int]] = {}
+        self.latencies: Dict[str, LogHistogram] = {}
+        self.lane_lengths: Dict[int, Dict[str, int]] = {}
+        self.light_switches: Counter = Counter()
+        self.dumps = 0
+        self._next_dump = clock() + interval
+
+    @staticmethod
+    def _histogram() -> LogHistogram:
+        return LogHistogram(min_value=1e-6, max_value=1e3)
+
+    def run_duration(self, name: str) -> LogHistogram:
+        histogram = self.run_durations.get(name)
+        if histogram is None:
+            histogram = self.run_durations[name] = self._histogram()
+        return histogram
+
+    def measure(self, behaviour, msg=None):
+        name = type(behaviour).__name__
+        # last and the largest depth
+        depth = behaviour.mailbox_size()
+        depths = self.mailbox_depths.get(name)
+        if depths is None:
+            self.mailbox_depths[name] = [depth, depth]
+        else:
+            depths[0] = depth
+            depths[1] = max(depths[1], depth)
+        if msg is not None:
+            self.received(msg)
+        return _Measurement(self, name)
+
+    def received(self, msg):
+        sent_at = msg.get_metadata(SENT_AT_METADATA_KEY)
+        if sent_at is None:
+            return
+        ontology = msg.get_metadata('ontology')
+        histogram = self.latencies.get(ontology)
+        if histogram is None:
+            histogram = self.latencies[ontology] = self._histogram()
+        # clocks of processes on one host may still differ slightly, latency is never negative
+        histogram.record(max(0.0, self.clock() - float(sent_at)))
+
+    def stamp(self, msg):
+        msg.set_metadata(SENT_AT_METADATA_KEY, repr(self.clock()))
+
+    def queue_lengths(self, crossroad_id: int, lanes: Sequence[str], counts: Sequence[int]):
+        self.lane_lengths[crossroad_id] = dict(zip(lanes, counts))
+
+    def light_switch(self, crossroad_id: int):
+        self.light_switches[crossroad_id] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            'timestamp': self.clock(),
+            'behaviours': {name: {**histogram.to_dict(),
+                                  'mailbox_depth': self.mailbox_depths.get(name, [0, 0])[0],
+                                  'max_mailbox_depth': self.mailbox_depths.get(name, [0, 0])[1]}
+                           for name, histogram in sorted(self.run_durations.items())},
+            'latency': {ontology: histogram.to_dict() for ontology, histogram in sorted(self.latencies.items())},
+            'waiting_cars': sum(sum(lanes.values()) for lanes in self.lane_lengths.values()),
+            'queue_lengths': {str(crossroad_id): lanes for crossroad_id, lanes in sorted(self.lane_lengths.items())},
+            'light_switches': sum(self.light_switches.values()),
+            'light_switches_by_crossroad': {str(crossroad_id): count
+                                            for crossroad_id, count in sorted(self.light_switches.items())},
+        }
+
+    def dump(self):
+        if self.path is None:
+            return
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(self.snapshot()) + '\n')
+        self.dumps += 1
+
+    def dump_if_due(self):
+        """
+        Dump snapshot when interval passed since the previous one, checked at the end of measured runs,
+        so dumps are written by the agents event loop without a timer of their own
+        """
+        now = self.clock()
+        if now >= self._next_dump:
+            self._next_dump = now + self.interval
+            self.dump()
+
+    def close(self):
+        self.dump()
+
+
+_instrumentation: Instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Instrumentation):
+    """
+    Select instrumentation of all agents, it is looked up on every use, so it can be set before or after start
+    """
+    global _instrumentation
+    _instrumentation = instrumentation
@@ -0,0 +1,45 @@
+import logging
+import sys
+from typing import Dict, Tuple
+
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'off': logging.CRITICAL + 1,
+}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Passes only every sample_every-th record of each logging call, warnings and errors always pass.
+    Counts are kept per call site, so rare messages are not crowded out by frequent ones.
+    """
+
+    def __init__(self, sample_every: int = 1):
+        super().__init__()
+        assert sample_every >= 1
+        self.sample_every = sample_every
+        self._seen: Dict[Tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_every == 1 or record.levelno >= logging.WARNING:
+            return True
+        site = (record.pathname, record.lineno)
+        seen = self._seen.get(site, 0)
+        self._seen[site] = seen + 1
+        return seen % self.sample_every == 0
+
+
+def configure_logging(level: str = 'info', sample_every: int = 1):
+    """
+    Log messages of the simulation modules to stdout from given level up, 'off' disables them.
+    Messages below the level are not even formatted, so disabled logging costs one level check per call.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    handler.addFilter(SamplingFilter(sample_every))
+    logger = logging.getLogger('src')
+    logger.handlers = [handler]
+    logger.setLevel(LOG_LEVELS[level])
+    logger.propagate = False
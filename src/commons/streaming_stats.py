@@ -0,0 +1,207 @@
+import csv
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+
+class LogHistogram:
+    """
+    Fixed size histogram with logarithmic buckets, every recorded value is kept with relative_error accuracy.
+    Memory does not depend on number of recorded values, histograms with the same settings can be merged.
+    Values below min_value are counted in the first bucket, values above max_value in the last one,
+    exact count, sum, min and max are kept besides buckets.
+    """
+
+    def __init__(self, relative_error: float = 0.01, min_value: float = 1e-3, max_value: float = 1e6):
+        assert 0 < relative_error < 1 and 0 < min_value < max_value
+        self.relative_error = relative_error
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_gamma = math.log((1 + relative_error) / (1 - relative_error))
+        self._offset = math.ceil(math.log(min_value) / self._log_gamma)
+        self.counts = np.zeros(self._index(max_value) + 1, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        value = min(max(value, self.min_value), self.max_value)
+        return math.ceil(math.log(value) / self._log_gamma) - self._offset
+
+    def _bucket_value(self, index: int) -> float:
+        gamma = math.exp(self._log_gamma)
+        return 2 * gamma ** (index + self._offset) / (gamma + 1)
+
+    def record(self, value: float):
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def record_many(self, values: Iterable[float]):
+        values = values.astype(np.float64, copy=False) if isinstance(values, np.ndarray) \
+            else np.fromiter(values, dtype=np.float64)
+        if not len(values):
+            return
+        clipped = np.clip(values, self.min_value, self.max_value)
+        indices = np.ceil(np.log(clipped) / self._log_gamma).astype(np.int64) - self._offset
+        np.add.at(self.counts, indices, 1)
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: 'LogHistogram') -> 'LogHistogram':
+        assert len(self.counts) == len(other.counts) and self._offset == other._offset, \
+            'Only histograms with the same settings can be merged'
+        self.counts += other.counts
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        assert 0 <= q <= 1
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank, side='right'))
+        # bucket estimate never goes outside of really recorded values
+        return min(max(self._bucket_value(index), self.min), self.max)
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max if self.count else None,
+        }
+
+
+class WindowedRate:
+    """
+    Number of events in the last window seconds, kept in a ring of resolution-long slots
+    """
+
+    def __init__(self, window: float = 60.0, resolution: float = 1.0):
+        self.window = window
+        self.resolution = resolution
+        self._slots = max(1, int(round(window / resolution)))
+        self._counts = np.zeros(self._slots, dtype=np.int64)
+        self._epochs = np.full(self._slots, -1, dtype=np.int64)
+
+    def record(self, timestamp: float, count: int = 1):
+        epoch = int(timestamp // self.resolution)
+        position = epoch % self._slots
+        if self._epochs[position] != epoch:
+            self._epochs[position] = epoch
+            self._counts[position] = 0
+        self._counts[position] += count
+
+    def total(self, now: float) -> int:
+        epoch = int(now // self.resolution)
+        return int(self._counts[(self._epochs > epoch - self._slots) & (self._epochs <= epoch)].sum())
+
+    def per_minute(self, now: float) -> float:
+        return self.total(now) * 60.0 / self.window
+
+    def merge(self, other: 'WindowedRate') -> 'WindowedRate':
+        assert self._slots == other._slots and self.resolution == other.resolution
+        for position in range(self._slots):
+            if other._epochs[position] > self._epochs[position]:
+                self._epochs[position] = other._epochs[position]
+                self._counts[position] = other._counts[position]
+            elif other._epochs[position] == self._epochs[position]:
+                self._counts[position] += other._counts[position]
+        return self
+
+
+class TravelTimeStats:
+    """
+    Streaming statistics of dispatched cars: travel time histogram, windowed throughput
+    and travel time breakdowns per origin crossroad and per exit (crossroad the car left the map from).
+    Memory depends only on the number of crossroads, not on the number of dispatched cars.
+    """
+
+    def __init__(self, window: float = 60.0, relative_error: float = 0.01, clock: Callable[[], float] = time.time):
+        self.relative_error = relative_error
+        self.clock = clock
+        self.travel_time = LogHistogram(relative_error)
+        self.throughput = WindowedRate(window)
+        self.by_origin: Dict[str, LogHistogram] = {}
+        self.by_exit: Dict[str, LogHistogram] = {}
+
+    def _breakdown(self, breakdown: Dict[str, LogHistogram], key) -> LogHistogram:
+        key = str(key)
+        histogram = breakdown.get(key)
+        if histogram is None:
+            histogram = breakdown[key] = LogHistogram(self.relative_error)
+        return histogram
+
+    def record(self, car, exit_crossroad=None):
+        travel_time = car.dispatch_timestamp - car.create_timestamp
+        self.travel_time.record(travel_time)
+        self.throughput.record(car.dispatch_timestamp)
+        self._breakdown(self.by_origin, car.starting_crossroad_id).record(travel_time)
+        self._breakdown(self.by_exit, exit_crossroad).record(travel_time)
+
+    @property
+    def count(self) -> int:
+        return self.travel_time.count
+
+    def merge(self, other: 'TravelTimeStats') -> 'TravelTimeStats':
+        self.travel_time.merge(other.travel_time)
+        self.throughput.merge(other.throughput)
+        for own, others in ((self.by_origin, other.by_origin), (self.by_exit, other.by_exit)):
+            for key, histogram in others.items():
+                self._breakdown(own, key).merge(histogram)
+        return self
+
+    def summary(self, now: Optional[float] = None) -> dict:
+        now = self.clock() if now is None else now
+        travel_time = self.travel_time.to_dict()
+        return {
+            'timestamp': now,
+            'dispatched_cars': travel_time.pop('count'),
+            **{f'{key}_travel_time': value for key, value in travel_time.items()},
+            'throughput_per_minute': self.throughput.per_minute(now),
+            'by_origin': {key: histogram.to_dict() for key, histogram in sorted(self.by_origin.items())},
+            'by_exit': {key: histogram.to_dict() for key, histogram in sorted(self.by_exit.items())},
+        }
+
+
+class StatsExporter:
+    """
+    Appends statistics summaries to a file, format is chosen by extension.
+    .jsonl gets whole summaries, .csv only their top level values (without breakdowns).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.jsonl = os.path.splitext(path)[1].lower() == '.jsonl'
+
+    def write(self, summary: dict):
+        if self.jsonl:
+            with open(self.path, 'a') as file:
+                file.write(json.dumps(summary) + '\n')
+            return
+        row = {key: value for key, value in summary.items() if not isinstance(value, dict)}
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=list(row))
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
@@ -0,0 +1,185 @@
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, NamedTuple, Tuple
+
+from src.communication.codec import BinaryCodec
+from src.entity.car import Car, Direction
+
+
+class TraceRecordType:
+    # 0 is never written, so zeroed tail of the preallocated file marks end of the trace
+    CAR_INJECTED = 1
+    CAR_HOP = 2
+    LANE_SNAPSHOT = 3
+    RECOMMENDATION = 4
+    TRANSITION = 5
+
+
+class TraceRecord(NamedTuple):
+    type: int
+    timestamp: float
+    crossroad_id: int
+    data: object
+
+
+class TraceLog:
+    """
+    Trace log recording nothing, used when tracing is disabled.
+    Callers on hot paths check enabled first, so they do not even build arguments of the records.
+    """
+    enabled = False
+
+    def car_injected(self, timestamp: float, crossroad_id: int, car: Car):
+        pass
+
+    def car_hop(self, timestamp: float, crossroad_id: int, car_id: int, direction: str):
+        pass
+
+    def lane_snapshot(self, timestamp: float, crossroad_id: int, lane_counts: Dict[str, int]):
+        pass
+
+    def recommendation(self, timestamp: float, crossroad_id: int, state: str):
+        pass
+
+    def transition(self, timestamp: float, crossroad_id: int, state: str):
+        pass
+
+    def close(self):
+        pass
+
+
+class MmapTraceLog(TraceLog):
+    """
+    Append-only binary trace of the simulation written through memory-mapped file.
+    File starts with MAGIC, every record is RECORD_HEADER (type, timestamp, crossroad id, payload length)
+    followed by payload:
+    car injected - car packed like BinaryCodec does, car hop - car id and direction code,
+    lane snapshot - number of cars in N, S, E, W lanes, recommendation and transition - state code.
+    File grows by chunk_size and is truncated to written records on close.
+    """
+    enabled = True
+    MAGIC = b'KJTRACE1'
+    RECORD_HEADER = struct.Struct('<BdiH')
+    CAR_HOP = struct.Struct('<qB')
+    LANE_SNAPSHOT = struct.Struct('<4I')
+    STATE = struct.Struct('<B')
+    DIRECTIONS = Direction.as_list()
+
+    def __init__(self, path: str, chunk_size: int = 1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._codec = BinaryCodec()
+        self._direction_codes = {direction: code for code, direction in enumerate(self.DIRECTIONS)}
+        self._file = open(path, 'w+b')
+        self._size = 0
+        self._map = None
+        self._grow(chunk_size)
+        self._map[:len(self.MAGIC)] = self.MAGIC
+        self._offset = len(self.MAGIC)
+        self.records = 0
+
+    def _grow(self, size: int):
+        if self._map is not None:
+            self._map.close()
+        self._file.truncate(size)
+        self._size = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _append(self, record_type: int, timestamp: float, crossroad_id: int, payload: bytes):
+        end = self._offset + self.RECORD_HEADER.size + len(payload)
+        if end > self._size:
+            self._grow(max(self._size * 2, end + self.chunk_size))
+        self.RECORD_HEADER.pack_into(self._map, self._offset, record_type, timestamp, crossroad_id, len(payload))
+        self._map[self._offset + self.RECORD_HEADER.size:end] = payload
+        self._offset = end
+        self.records += 1
+
+    def car_injected(self, timestamp: float, crossroad_id: int, car: Car):
+        self._append(TraceRecordType.CAR_INJECTED, timestamp, crossroad_id, self._codec.pack_car(car))
+
+    def car_hop(self, timestamp: float, crossroad_id: int, car_id: int, direction: str):
+        self._append(TraceRecordType.CAR_HOP, timestamp, crossroad_id,
+                     self.CAR_HOP.pack(car_id, self._direction_codes[direction]))
+
+    def lane_snapshot(self, timestamp: float, crossroad_id: int, lane_counts: Dict[str, int]):
+        self._append(TraceRecordType.LANE_SNAPSHOT, timestamp, crossroad_id,
+                     self.LANE_SNAPSHOT.pack(*(lane_counts[direction] for direction in self.DIRECTIONS)))
+
+    def recommendation(self, timestamp: float, crossroad_id: int, state: str):
+        self._append(TraceRecordType.RECOMMENDATION, timestamp, crossroad_id,
+                     self.STATE.pack(BinaryCodec.STATES.index(state)))
+
+    def transition(self, timestamp: float, crossroad_id: int, state: str):
+        self._append(TraceRecordType.TRANSITION, timestamp, crossroad_id,
+                     self.STATE.pack(BinaryCodec.STATES.index(state)))
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        if self._map is None:
+            return
+        self._map.flush()
+        self._map.close()
+        self._map = None
+        self._file.truncate(self._offset)
+        self._file.close()
+
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    """
+    Records of the trace in order they were written, data is decoded payload:
+    Car, (car id, direction), {direction: cars count} or state
+    """
+    codec = BinaryCodec()
+    header = MmapTraceLog.RECORD_HEADER
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size <= len(MmapTraceLog.MAGIC):
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            assert data[:len(MmapTraceLog.MAGIC)] == MmapTraceLog.MAGIC, f'{path} is not a trace log'
+            offset = len(MmapTraceLog.MAGIC)
+            while offset + header.size <= len(data):
+                record_type, timestamp, crossroad_id, length = header.unpack_from(data, offset)
+                if record_type == 0:
+                    break
+                offset += header.size
+                yield TraceRecord(record_type, timestamp, crossroad_id,
+                                  _decode_payload(codec, record_type, data[offset:offset + length]))
+                offset += length
+
+
+def _decode_payload(codec: BinaryCodec, record_type: int, payload: bytes):
+    if record_type == TraceRecordType.CAR_INJECTED:
+        return codec.unpack_car(payload)[0]
+    if record_type == TraceRecordType.CAR_HOP:
+        car_id, direction = MmapTraceLog.CAR_HOP.unpack(payload)
+        return car_id, MmapTraceLog.DIRECTIONS[direction]
+    if record_type == TraceRecordType.LANE_SNAPSHOT:
+        return dict(zip(MmapTraceLog.DIRECTIONS, MmapTraceLog.LANE_SNAPSHOT.unpack(payload)))
+    return BinaryCodec.STATES[MmapTraceLog.STATE.unpack(payload)[0]]
+
+
+def read_injections(path: str) -> Iterator[Tuple[float, int, Car]]:
+    """
+    Arrival stream of the trace: timestamp, crossroad id and the car as it was injected
+    """
+    for record in read_trace(path):
+        if record.type == TraceRecordType.CAR_INJECTED:
+            yield record.timestamp, record.crossroad_id, record.data
+
+
+_trace_log: TraceLog = TraceLog()
+
+
+def get_trace_log() -> TraceLog:
+    return _trace_log
+
+
+def set_trace_log(trace_log: TraceLog):
+    """
+    Select trace log agents record their events to
+    """
+    global _trace_log
+    _trace_log = trace_log
@@ -2,4 +2,4 @@ from typing import List
 
 
 def serialize_list(l: List):
-    return [e.__dict__ for e in l]
+    return [e.to_dict() if hasattr(e, 'to_dict') else e.__dict__ for e in l]
@@ -0,0 +1,256 @@
+import base64
+import json
+import math
+import struct
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple, Union
+
+from src.commons.util import serialize_list
+from src.entity.LightState import LightState
+from src.entity.car import Car, Direction
+from src.entity.lane_summary import LaneSummary
+
+# metadata key telling receiver how the body was encoded, messages without it are json
+CODEC_METADATA_KEY = 'codec'
+
+Lines = Dict[str, Union[List, LaneSummary]]
+
+
+class Codec(ABC):
+    """
+    Encoding of agents messages bodies
+    """
+    name: str
+
+    @abstractmethod
+    def encode_car(self, car: Car) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode_car(self, body: str) -> Car:
+        raise NotImplementedError
+
+    @abstractmethod
+    def encode_cars(self, cars: List[Car]) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode_cars(self, body: str) -> List[Car]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def encode_crossroads_info(self, line_queues: Dict[str, List], current_state: str, summary: bool) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode_crossroads_info(self, body: str) -> Tuple[Lines, str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def encode_state(self, state: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode_state(self, body: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def encode_credits(self, count: int) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode_credits(self, body: str) -> int:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """
+    Original json bodies, understood by every agent
+    """
+    name = 'json'
+
+    def encode_car(self, car: Car) -> str:
+        return car.to_json()
+
+    def decode_car(self, body: str) -> Car:
+        return Car.from_json(body)
+
+    def encode_cars(self, cars: List[Car]) -> str:
+        return json.dumps(serialize_list(cars))
+
+    def decode_cars(self, body: str) -> List[Car]:
+        return [Car(**car) for car in json.loads(body)]
+
+    def encode_crossroads_info(self, line_queues: Dict[str, List], current_state: str, summary: bool) -> str:
+        if summary:
+            now = time.time()
+            lines = {'lane_summary': {line: LaneSummary.from_cars(list_of_cars, now).to_dict()
+                                      for line, list_of_cars in line_queues.items()}}
+        else:
+            lines = {'line_queues': {line: serialize_list(list_of_cars)
+                                     for line, list_of_cars in line_queues.items()}}
+        return json.dumps({
+            **lines,
+            'current_state': current_state
+        })
+
+    def decode_crossroads_info(self, body: str) -> Tuple[Lines, str]:
+        msg_body = json.loads(body)
+        if 'lane_summary' in msg_body:
+            lines = {line: LaneSummary.from_dict(summary) for line, summary in msg_body['lane_summary'].items()}
+        else:
+            lines = msg_body['line_queues']
+        return lines, msg_body['current_state']
+
+    def encode_state(self, state: str) -> str:
+        return json.dumps({'state': state})
+
+    def decode_state(self, body: str) -> str:
+        return json.loads(body)['state']
+
+    def encode_credits(self, count: int) -> str:
+        return json.dumps({'credits': count})
+
+    def decode_credits(self, body: str) -> int:
+        return json.loads(body)['credits']
+
+
+class BinaryCodec(Codec):
+    """
+    Struct packed bodies, base64 encoded to stay valid XMPP text.
+    Car is a fixed size header followed by its path packed 2 bits per direction,
+    crossroads info is a header followed by 4 cars lists or 4 fixed size lane summaries.
+    """
+    name = 'binary'
+
+    DIRECTIONS = Direction.as_list()
+    STATES = [LightState.NS, LightState.EW]
+    # id, starting crossroad id, starting queue direction, create timestamp, dispatch timestamp, path length
+    CAR_HEADER = struct.Struct('<qiBddH')
+    # summary flag, current state
+    INFO_HEADER = struct.Struct('<BB')
+    LANE_LENGTH = struct.Struct('<I')
+    # count, sum and min of create timestamps, oldest waiting age
+    LANE_SUMMARY = struct.Struct('<Iddd')
+
+    def __init__(self):
+        self._codes = {direction: code for code, direction in enumerate(self.DIRECTIONS)}
+
+    def pack_car(self, car: Car) -> bytes:
+        hops = car.remaining_hops
+        dispatch_timestamp = math.nan if car.dispatch_timestamp is None else car.dispatch_timestamp
+        # Car keeps its path packed the same way, 4 directions a byte with the first one in the lowest bits
+        return self.CAR_HEADER.pack(car.id, car.starting_crossroad_id, self._codes[car.starting_queue_direction],
+                                    car.create_timestamp, dispatch_timestamp, hops) + \
+            car.packed_path.to_bytes((hops + 3) // 4, 'little')
+
+    def unpack_car(self, data: bytes, offset: int = 0) -> Tuple[Car, int]:
+        car_id, crossroad_id, queue, create_timestamp, dispatch_timestamp, path_length = \
+            self.CAR_HEADER.unpack_from(data, offset)
+        offset += self.CAR_HEADER.size
+        path_bytes = (path_length + 3) // 4
+        car = Car.from_packed_path(id=car_id, starting_crossroad_id=crossroad_id,
+                                   starting_queue_direction=self.DIRECTIONS[queue], create_timestamp=create_timestamp,
+                                   packed_path=int.from_bytes(data[offset:offset + path_bytes], 'little'),
+                                   hops=path_length,
+                                   dispatch_timestamp=None if math.isnan(dispatch_timestamp) else dispatch_timestamp)
+        return car, offset + path_bytes
+
+    def encode_car(self, car: Car) -> str:
+        return base64.b64encode(self.pack_car(car)).decode('ascii')
+
+    def decode_car(self, body: str) -> Car:
+        return self.unpack_car(base64.b64decode(body))[0]
+
+    def encode_cars(self, cars: List[Car]) -> str:
+        return base64.b64encode(self.LANE_LENGTH.pack(len(cars)) +
+                                b''.join(self.pack_car(car) for car in cars)).decode('ascii')
+
+    def decode_cars(self, body: str) -> List[Car]:
+        data = base64.b64decode(body)
+        count, = self.LANE_LENGTH.unpack_from(data)
+        offset = self.LANE_LENGTH.size
+        cars = []
+        for _ in range(count):
+            car, offset = self.unpack_car(data, offset)
+            cars.append(car)
+        return cars
+
+    def encode_crossroads_info(self, line_queues: Dict[str, List], current_state: str, summary: bool) -> str:
+        chunks = [self.INFO_HEADER.pack(summary, self.STATES.index(current_state))]
+        if summary:
+            now = time.time()
+            for line in self.DIRECTIONS:
+                lane = LaneSummary.from_cars(line_queues[line], now)
+                chunks.append(self.LANE_SUMMARY.pack(lane.count, lane.ts_sum,
+                                                     math.nan if lane.ts_min is None else lane.ts_min,
+                                                     lane.oldest_age))
+        else:
+            for line in self.DIRECTIONS:
+                chunks.append(self.LANE_LENGTH.pack(len(line_queues[line])))
+                chunks.extend(self.pack_car(car) for car in line_queues[line])
+        return base64.b64encode(b''.join(chunks)).decode('ascii')
+
+    def decode_crossroads_info(self, body: str) -> Tuple[Lines, str]:
+        data = base64.b64decode(body)
+        summary, state = self.INFO_HEADER.unpack_from(data)
+        offset = self.INFO_HEADER.size
+        lines = {}
+        for line in self.DIRECTIONS:
+            if summary:
+                count, ts_sum, ts_min, oldest_age = self.LANE_SUMMARY.unpack_from(data, offset)
+                offset += self.LANE_SUMMARY.size
+                lines[line] = LaneSummary(count=count, ts_sum=ts_sum,
+                                          ts_min=None if math.isnan(ts_min) else ts_min, oldest_age=oldest_age)
+            else:
+                count, = self.LANE_LENGTH.unpack_from(data, offset)
+                offset += self.LANE_LENGTH.size
+                lines[line] = []
+                for _ in range(count):
+                    car, offset = self.unpack_car(data, offset)
+                    lines[line].append(car)
+        return lines, self.STATES[state]
+
+    def encode_state(self, state: str) -> str:
+        return base64.b64encode(bytes([self.STATES.index(state)])).decode('ascii')
+
+    def decode_state(self, body: str) -> str:
+        return self.STATES[base64.b64decode(body)[0]]
+
+    def encode_credits(self, count: int) -> str:
+        return base64.b64encode(self.LANE_LENGTH.pack(count)).decode('ascii')
+
+    def decode_credits(self, body: str) -> int:
+        return self.LANE_LENGTH.unpack(base64.b64decode(body))[0]
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec(),
+    BinaryCodec.name: BinaryCodec(),
+}
+
+_default_codec: Codec = CODECS[JsonCodec.name]
+
+
+def get_default_codec() -> Codec:
+    return _default_codec
+
+
+def set_default_codec(codec: Codec):
+    """
+    Select codec used for messages sent afterwards, received messages are decoded by their own codec
+    """
+    global _default_codec
+    _default_codec = codec
+
+
+def message_codec(msg) -> Codec:
+    """
+    Codec the message body was encoded with
+    """
+    return CODECS[msg.get_metadata(CODEC_METADATA_KEY) or JsonCodec.name]
+
+
+def codec_metadata(metadata: Dict[str, str], codec: Codec) -> Dict[str, str]:
+    return {**metadata, CODEC_METADATA_KEY: codec.name}
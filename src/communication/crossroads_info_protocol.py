@@ -1,26 +1,35 @@
-from typing import Dict, List
-import json
+from typing import Dict, List, Optional, Tuple
 
 from spade.message import Message
 from spade.template import Template
 
+from src.communication.codec import Codec, Lines, codec_metadata, get_default_codec, message_codec
 from src.communication.fipa.ontology import Ontology
 from src.communication.fipa.performative import Performative
-from src.commons.util import serialize_list
 
 
 METADATA = {'performative': Performative.INFORM, 'ontology': Ontology.CROSSROADS_INFO}
 
 
 class CrossroadsInfoMessage(Message):
-    def __init__(self, to: str, line_queues: Dict[str, List], current_state: str):
+    """
+    State of crossroad queues sent to TrafficInfoAggregator.
+    By default carries every waiting car, with summary=True only fixed size LaneSummary of each lane.
+    """
+
+    def __init__(self, to: str, line_queues: Dict[str, List], current_state: str, summary: bool = False,
+                 codec: Optional[Codec] = None):
+        codec = codec or get_default_codec()
         super().__init__(to=to,
-                         metadata=METADATA,
-                         body=json.dumps({
-                            'line_queues': {line: serialize_list(list_of_cars)
-                                            for line, list_of_cars in line_queues.items()},
-                            'current_state': current_state
-                         }))
+                         metadata=codec_metadata(METADATA, codec),
+                         body=codec.encode_crossroads_info(line_queues, current_state, summary))
+
+    @staticmethod
+    def decode(msg: Message) -> Tuple[Lines, str]:
+        """
+        Lanes in any of the forms, ready for Algorithm.recommend_state, and current state of the crossroad
+        """
+        return message_codec(msg).decode_crossroads_info(msg.body)
 
 
 class CrossroadsInfoTemplate(Template):
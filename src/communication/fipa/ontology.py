@@ -3,6 +3,8 @@ class Ontology:
     Contexts of the messages
     """
     MOVE_CAR = 'move_car'
+    MOVE_CARS_BATCH = 'move_cars_batch'
     CROSSROADS_INFO = 'crossroads_info'
     STATE_RECOMMENDATION = 'state_recommendation'
+    LANE_CREDIT = 'lane_credit'
 
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from spade.message import Message
+from spade.template import Template
+
+from src.communication.codec import Codec, codec_metadata, get_default_codec, message_codec
+from src.communication.fipa.ontology import Ontology
+from src.communication.fipa.performative import Performative
+
+METADATA = {'performative': Performative.INFORM, 'ontology': Ontology.LANE_CREDIT}
+
+
+class LaneCreditMessage(Message):
+    """
+    Places freed in receiver's lane of the sender, returned to upstream crossroad as credits
+    """
+
+    def __init__(self, to: str, count: int, codec: Optional[Codec] = None):
+        codec = codec or get_default_codec()
+        super().__init__(to=to, metadata=codec_metadata(METADATA, codec), body=codec.encode_credits(count))
+
+    @staticmethod
+    def decode(msg: Message) -> int:
+        return message_codec(msg).decode_credits(msg.body)
+
+
+class LaneCreditTemplate(Template):
+    def __init__(self):
+        super().__init__()
+        self.metadata = METADATA
@@ -1,19 +1,64 @@
+from typing import List, Optional
+
 from spade.message import Message
 from spade.template import Template
 
+from src.communication.codec import Codec, codec_metadata, get_default_codec, message_codec
 from src.communication.fipa.ontology import Ontology
 from src.communication.fipa.performative import Performative
 from src.entity.car import Car
 
 METADATA = {'performative': Performative.INFORM, 'ontology': Ontology.MOVE_CAR}
+BATCH_METADATA = {'performative': Performative.INFORM, 'ontology': Ontology.MOVE_CARS_BATCH}
 
 
 class MoveCarMessage(Message):
-    def __init__(self, to: str, car: Car):
-        super().__init__(to=to, metadata=METADATA, body=car.to_json())
+    def __init__(self, to: str, car: Car, codec: Optional[Codec] = None):
+        codec = codec or get_default_codec()
+        super().__init__(to=to, metadata=codec_metadata(METADATA, codec), body=codec.encode_car(car))
+
+    @staticmethod
+    def decode(msg: Message) -> Car:
+        return message_codec(msg).decode_car(msg.body)
 
 
 class MoveCarTemplate(Template):
     def __init__(self):
         super().__init__()
         self.metadata = METADATA
+
+
+class MoveCarsBatchMessage(Message):
+    """
+    All cars sent from one crossroad to the same receiver in one tick
+    """
+
+    def __init__(self, to: str, cars: List[Car], codec: Optional[Codec] = None):
+        codec = codec or get_default_codec()
+        super().__init__(to=to, metadata=codec_metadata(BATCH_METADATA, codec), body=codec.encode_cars(cars))
+
+    @staticmethod
+    def decode(msg: Message) -> List[Car]:
+        return message_codec(msg).decode_cars(msg.body)
+
+
+class MoveCarsBatchTemplate(Template):
+    def __init__(self):
+        super().__init__()
+        self.metadata = BATCH_METADATA
+
+
+def decode_moved_cars(msg: Message) -> List[Car]:
+    """
+    Cars from either MoveCarMessage or MoveCarsBatchMessage
+    """
+    if msg.get_metadata('ontology') == Ontology.MOVE_CARS_BATCH:
+        return MoveCarsBatchMessage.decode(msg)
+    return [MoveCarMessage.decode(msg)]
+
+
+def moved_cars_template():
+    """
+    Template matching both single car and batch moves
+    """
+    return MoveCarTemplate() | MoveCarsBatchTemplate()
@@ -1,8 +1,9 @@
-import json
+from typing import Optional
 
 from spade.message import Message
 from spade.template import Template
 
+from src.communication.codec import Codec, codec_metadata, get_default_codec, message_codec
 from src.communication.fipa.ontology import Ontology
 from src.communication.fipa.performative import Performative
 
@@ -11,13 +12,18 @@ METADATA = {'performative': Performative.INFORM, 'ontology': Ontology.STATE_RECO
 
 
 class StateRecommendationMessage(Message):
-    def __init__(self, to: str, state: str):
+    def __init__(self, to: str, state: str, codec: Optional[Codec] = None):
+        codec = codec or get_default_codec()
         super().__init__(to=to,
-                         metadata=METADATA,
-                         body=json.dumps({'state': state}))
+                         metadata=codec_metadata(METADATA, codec),
+                         body=codec.encode_state(state))
+
+    @staticmethod
+    def decode(msg: Message) -> str:
+        return message_codec(msg).decode_state(msg.body)
 
 
 class StateRecommendationTemplate(Template):
     def __init__(self):
         super().__init__()
-        self.metadata = METADATA
\ No newline at end of file
+        self.metadata = METADATA
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from spade.agent import Agent
+from spade.behaviour import FSMBehaviour
+from spade.container import Container
+from spade.message import Message
+
+
+class TransportStats:
+    """
+    Counts messages passed through transport, per ontology
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.sent: Counter = Counter()
+        self.dropped = 0
+
+    def record(self, msg: Message):
+        self.sent[msg.get_metadata('ontology')] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(self.sent.values())
+
+    def messages_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.total / elapsed if elapsed > 0 else 0.0
+
+    def reset(self):
+        self.started_at = time.monotonic()
+        self.sent.clear()
+        self.dropped = 0
+
+    def report(self) -> dict:
+        return {
+            'messages': self.total,
+            'dropped': self.dropped,
+            'messages_per_second': round(self.messages_per_second(), 2),
+            'per_ontology': dict(self.sent),
+        }
+
+
+class Transport(ABC):
+    """
+    Way of connecting agents and passing messages between them.
+    Agents using it keep their send/receive code, behaviours are matched by SPADE templates.
+    """
+    name: str
+
+    def __init__(self):
+        self.stats = TransportStats()
+
+    @abstractmethod
+    async def start_agent(self, agent, auto_register: bool):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stop_agent(self, agent):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def send(self, msg: Message, behaviour):
+        raise NotImplementedError
+
+
+class XmppTransport(Transport):
+    """
+    Default SPADE transport, every agent registers and connects to XMPP server (prosody container)
+    """
+    name = 'xmpp'
+
+    async def start_agent(self, agent, auto_register: bool):
+        await Agent._async_start(agent, auto_register)
+
+    async def stop_agent(self, agent):
+        await Agent._async_stop(agent)
+
+    async def send(self, msg: Message, behaviour):
+        self.stats.record(msg)
+        await Container().send(msg, behaviour)
+
+
+class LocalTransport(Transport):
+    """
+    In-process transport without XMPP server.
+    Each agent gets asyncio.Queue inbox, drained by a task dispatching messages to behaviours matching their templates.
+    Messages to agents which are not started are dropped, as XMPP server does for offline users.
+    """
+    name = 'local'
+
+    def __init__(self):
+        super().__init__()
+        self._inboxes: Dict[str, asyncio.Queue] = {}
+        self._pumps: Dict[str, asyncio.Task] = {}
+
+    async def start_agent(self, agent, auto_register: bool):
+        jid = str(agent.jid.bare())
+        inbox = asyncio.Queue()
+        self._inboxes[jid] = inbox
+        self._pumps[jid] = asyncio.ensure_future(self._pump(agent, inbox))
+
+        await agent.setup()
+        agent._alive.set()
+        for behaviour in agent.behaviours:
+            if not behaviour.is_running:
+                behaviour.set_agent(agent)
+                if issubclass(type(behaviour), FSMBehaviour):
+                    for _, state in behaviour.get_states().items():
+                        state.set_agent(agent)
+                behaviour.start()
+
+    async def stop_agent(self, agent):
+        jid = str(agent.jid.bare())
+        for behaviour in agent.behaviours:
+            behaviour.kill()
+        self._inboxes.pop(jid, None)
+        if pump := self._pumps.pop(jid, None):
+            pump.cancel()
+        agent._alive.clear()
+
+    async def send(self, msg: Message, behaviour):
+        inbox = self._inboxes.get(str(msg.to.bare()))
+        if inbox is None:
+            self.stats.dropped += 1
+            return
+        self.stats.record(msg)
+        inbox.put_nowait(msg)
+
+    @staticmethod
+    async def _pump(agent, inbox: asyncio.Queue):
+        while True:
+            msg = await inbox.get()
+            for behaviour in agent.behaviours:
+                if behaviour.match(msg):
+                    await behaviour.enqueue(msg)
+
+
+class ShardedLocalTransport(LocalTransport):
+    """
+    LocalTransport of one shard of the map running in its own process.
+    Messages to agents of this process are delivered locally, messages to agents owned by other shards
+    (routes maps bare jid to shard) are put as plain tuples to inbox queue of that shard's process.
+    Thread reading own inbox queue hands received messages over to the agents event loop.
+    """
+    name = 'sharded'
+
+    def __init__(self, shard: int, routes: Dict[str, int], inboxes: List):
+        super().__init__()
+        self.shard = shard
+        self.routes = routes
+        self.shard_inboxes = inboxes
+        self.forwarded = 0
+        self.received = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+
+    async def start_agent(self, agent, auto_register: bool):
+        if self._reader is None:
+            self._loop = asyncio.get_event_loop()
+            self._reader = threading.Thread(target=self._read_inbox, daemon=True)
+            self._reader.start()
+        await super().start_agent(agent, auto_register)
+
+    async def send(self, msg: Message, behaviour):
+        to = str(msg.to.bare())
+        shard = self.routes.get(to, self.shard)
+        if shard == self.shard:
+            await super().send(msg, behaviour)
+            return
+        self.stats.record(msg)
+        self.forwarded += 1
+        sender = str(msg.sender) if msg.sender else None
+        self.shard_inboxes[shard].put((to, sender, msg.body, dict(msg.metadata)))
+
+    def _read_inbox(self):
+        inbox = self.shard_inboxes[self.shard]
+        while (item := inbox.get()) is not None:
+            self._loop.call_soon_threadsafe(self._deliver, item)
+
+    def _deliver(self, item: Tuple[str, str, str, Dict[str, str]]):
+        to, sender, body, metadata = item
+        inbox = self._inboxes.get(to)
+        if inbox is None:
+            self.stats.dropped += 1
+            return
+        self.received += 1
+        inbox.put_nowait(Message(to=to, sender=sender, body=body, metadata=metadata))
+
+    def close(self):
+        """
+        Stop thread reading shard inbox
+        """
+        if self._reader is not None:
+            self.shard_inboxes[self.shard].put(None)
+            self._reader.join()
+            self._reader = None
+
+
+TRANSPORTS = {
+    XmppTransport.name: XmppTransport,
+    LocalTransport.name: LocalTransport,
+}
+
+_transport: Transport = XmppTransport()
+
+
+def get_transport() -> Transport:
+    return _transport
+
+
+def set_transport(transport: Transport):
+    """
+    Select transport used by agents created afterwards
+    """
+    global _transport
+    _transport = transport
@@ -1,6 +1,26 @@
 from argparse import Namespace
 
+from src.entity.car import Direction
+
 LightState = Namespace(
     NS='NS',
     EW='EW'
-)
\ No newline at end of file
+)
+
+# queues opened in given light state and directions cars are allowed to leave them
+STATE_SCHEMES = {
+    LightState.NS: {
+        Direction.N: {Direction.S, Direction.E, Direction.W},
+        Direction.S: {Direction.N, Direction.E, Direction.W},
+    },
+    LightState.EW: {
+        Direction.E: {Direction.W, Direction.N, Direction.S},
+        Direction.W: {Direction.E, Direction.N, Direction.S},
+    },
+}
+
+# state the lights switch to when no recommendation arrives in time
+DEFAULT_NEXT_STATE = {
+    LightState.NS: LightState.EW,
+    LightState.EW: LightState.NS,
+}
@@ -1,25 +1,36 @@
-import time
 from abc import ABC, abstractmethod
-import threading
+from typing import Callable
 import time
 
-from src.agents.crossroad_handler import LightState
+from src.entity.LightState import LightState
+from src.entity.lane_summary import LaneSummary
 
 
 class Algorithm(ABC):
-    def __init__(self, timeout: float):
+    """
+    Base of algorithms recommending light state.
+    State which was not current nor recommended for timeout seconds becomes high priority
+    and is recommended before others. Deadlines are checked lazily on each recommendation,
+    so no timer threads are created.
+    clock is used to calculate waiting time of cars, deadline_clock to track starvation.
+    Lanes may be given as lists of serialized cars, LaneQueue or LaneSummary, _process_data always gets summaries.
+    """
+
+    def __init__(self, timeout: float,
+                 clock: Callable[[], float] = time.time,
+                 deadline_clock: Callable[[], float] = time.monotonic):
         self._timers_timeout = timeout
+        self._clock = clock
+        self._deadline_clock = deadline_clock
         self._high_priority_states = []
-        self._state_timers = {
-            state: threading.Timer(
-                self._timers_timeout,
-                lambda: self._high_priority_states.append(state))
-            for state in LightState.__dict__.keys()
-        }
-        for t in self._state_timers.values():
-            t.start()
+        now = self._deadline_clock()
+        self._state_deadlines = {state: now + self._timers_timeout for state in LightState.__dict__.keys()}
 
     def recommend_state(self, **kwargs):
+        self._collect_starving_states()
+        if 'lines' in kwargs:
+            kwargs['lines'] = {line: cars if isinstance(cars, LaneSummary) else LaneSummary.from_cars(cars)
+                               for line, cars in kwargs['lines'].items()}
         if 'current_state' in kwargs:
             if kwargs['current_state'] in self._high_priority_states:
                 self._high_priority_states.remove(kwargs['current_state'])
@@ -36,18 +47,41 @@ class Algorithm(ABC):
     def _process_data(self, **kwargs):
         raise NotImplementedError
 
+    def _collect_starving_states(self):
+        """
+        Mark states with passed deadline as high priority, in order their deadlines passed
+        """
+        now = self._deadline_clock()
+        if min(self._state_deadlines.values()) > now:
+            return
+        for state, deadline in sorted(self._state_deadlines.items(), key=lambda item: item[1]):
+            if deadline > now:
+                break
+            self._high_priority_states.append(state)
+            self._state_deadlines[state] = float('inf')
+
     def _reset_timer(self, state: str):
-        self._state_timers[state].cancel()
-        self._state_timers[state] = threading.Timer(self._timers_timeout,
-                                                    lambda: self._high_priority_states.append(state))
-        self._state_timers[state].start()
+        self._state_deadlines[state] = self._deadline_clock() + self._timers_timeout
+
+    def checkpoint_state(self) -> dict:
+        """
+        Starvation timers as time left to their deadlines, so they can be restored on another clock
+        """
+        now = self._deadline_clock()
+        return {'high_priority_states': list(self._high_priority_states),
+                'deadlines_left': {state: deadline - now for state, deadline in self._state_deadlines.items()}}
+
+    def restore_state(self, state: dict):
+        now = self._deadline_clock()
+        self._high_priority_states = list(state['high_priority_states'])
+        self._state_deadlines = {light_state: now + left for light_state, left in state['deadlines_left'].items()}
 
 
 class LargestFirst(Algorithm):
     def _process_data(self, lines, current_state):
         if self._high_priority_states:
             return self._high_priority_states[0]
-        elif (len(lines['N']) + len(lines['S'])) >= (len(lines['E']) + len(lines['W'])):
+        elif (lines['N'].count + lines['S'].count) >= (lines['E'].count + lines['W'].count):
             return LightState.NS
         else:
             return LightState.EW
@@ -58,13 +92,8 @@ class AverageWait(Algorithm):
         if self._high_priority_states:
             return self._high_priority_states[0]
 
-        current_ts = time.time()
-        wait_dict = {}
-        for line, cars in lines.items():
-            if not cars:
-                wait_dict[line] = 0
-            else:
-                wait_dict[line] = sum([current_ts - car['create_timestamp'] for car in cars]) / len(cars)
+        current_ts = self._clock()
+        wait_dict = {line: summary.average_wait(current_ts) for line, summary in lines.items()}
 
         if ((wait_dict['N'] + wait_dict['S'])/2) >= ((wait_dict['W'] + wait_dict['E'])/2):
             return LightState.NS
@@ -77,19 +106,11 @@ class WeightedSum(Algorithm):
         if self._high_priority_states:
             return self._high_priority_states[0]
 
-        current_ts = time.time()
-        wait_dict = {}
-        for line, cars in lines.items():
-            if not cars:
-                wait_dict[line] = 0
-            else:
-                wait_dict[line] = sum([current_ts - car['create_timestamp'] for car in cars]) / len(cars)
+        current_ts = self._clock()
+        wait_dict = {line: summary.average_wait(current_ts) for line, summary in lines.items()}
 
-        if (wait_dict['N']*len(lines['N']) + wait_dict['S']*len(lines['S'])) >= \
-                (wait_dict['W']*len(lines['W']) + wait_dict['E']*len(lines['E'])):
+        if (wait_dict['N']*lines['N'].count + wait_dict['S']*lines['S'].count) >= \
+                (wait_dict['W']*lines['W'].count + wait_dict['E']*lines['E'].count):
             return LightState.NS
         else:
             return LightState.EW
-
-
-
@@ -0,0 +1,128 @@
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import numpy as np
+
+from src.entity.LightState import LightState
+from src.entity.algorithms import Algorithm, AverageWait, LargestFirst, WeightedSum
+from src.entity.car import Direction
+from src.entity.lane_queue import LaneQueue
+from src.entity.lane_summary import LaneSummary
+
+# lanes are stored in Direction.as_list() order: N, S, E, W
+LANES = Direction.as_list()
+N, S, E, W = (LANES.index(direction) for direction in (Direction.N, Direction.S, Direction.E, Direction.W))
+# light states are stored as indices of STATES
+STATES = [LightState.NS, LightState.EW]
+NS, EW = 0, 1
+
+
+def _largest_first(counts: np.ndarray, waits: np.ndarray) -> np.ndarray:
+    return np.where(counts[:, N] + counts[:, S] >= counts[:, E] + counts[:, W], NS, EW)
+
+
+def _average_wait(counts: np.ndarray, waits: np.ndarray) -> np.ndarray:
+    average = np.divide(waits, counts, out=np.zeros_like(waits), where=counts > 0)
+    return np.where((average[:, N] + average[:, S]) / 2 >= (average[:, W] + average[:, E]) / 2, NS, EW)
+
+
+def _weighted_sum(counts: np.ndarray, waits: np.ndarray) -> np.ndarray:
+    # average wait multiplied by cars count is total wait of the lane
+    return np.where(waits[:, N] + waits[:, S] >= waits[:, W] + waits[:, E], NS, EW)
+
+
+BATCH_POLICIES: Dict[Type[Algorithm], Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    LargestFirst: _largest_first,
+    AverageWait: _average_wait,
+    WeightedSum: _weighted_sum,
+}
+
+
+def lane_stats(lines: Dict[str, Iterable]) -> Tuple[List[int], List[float]]:
+    """
+    Cars count and sum of create timestamps of each lane, in LANES order.
+    Accepts lanes of Car objects, of serialized car dicts, LaneQueue or LaneSummary.
+    """
+    counts, ts_sums = [], []
+    for lane in LANES:
+        cars = lines[lane]
+        if isinstance(cars, (LaneQueue, LaneSummary)):
+            counts.append(len(cars) if isinstance(cars, LaneQueue) else cars.count)
+            ts_sums.append(cars.ts_sum)
+            continue
+        counts.append(len(cars))
+        ts_sums.append(sum(car['create_timestamp'] if isinstance(car, dict) else car.create_timestamp
+                           for car in cars))
+    return counts, ts_sums
+
+
+class BatchController:
+    """
+    Light state recommendations for many crossroads computed in one vectorized pass.
+    Keeps per-lane cars count and sum of create timestamps of every crossroad in NumPy arrays
+    and makes the same decisions as the scalar Algorithm it mirrors, including starvation rule:
+    a state not chosen for timeout seconds is forced on the next recommendation.
+    """
+
+    def __init__(self, crossroads_count: int, algorithm: Type[Algorithm] = AverageWait, timeout: float = 10.0,
+                 clock: Callable[[], float] = time.time):
+        assert algorithm in BATCH_POLICIES, f'No batch policy for {algorithm.__name__}'
+        self._policy = BATCH_POLICIES[algorithm]
+        self._timeout = timeout
+        self._clock = clock
+        # timestamps are kept relative to controller creation, so waits are not computed from huge numbers
+        self._epoch = clock()
+        self.counts = np.zeros((crossroads_count, len(LANES)), dtype=np.int64)
+        self.ts_sums = np.zeros((crossroads_count, len(LANES)), dtype=np.float64)
+        self.current_states = np.full(crossroads_count, EW, dtype=np.int8)
+        self.deadlines = np.full((crossroads_count, len(STATES)), self._epoch + timeout, dtype=np.float64)
+        self.pending = np.zeros(crossroads_count, dtype=bool)
+
+    def __len__(self):
+        return len(self.current_states)
+
+    def update(self, index: int, counts: List[int], ts_sums: List[float], current_state: str):
+        """
+        Store report of single crossroad, to be decided in the next recommend call
+        """
+        self.counts[index] = counts
+        self.ts_sums[index] = np.asarray(ts_sums, dtype=np.float64) - np.asarray(counts) * self._epoch
+        self.current_states[index] = STATES.index(current_state)
+        self.pending[index] = True
+
+    def update_many(self, indices: np.ndarray, counts: np.ndarray, ts_sums: np.ndarray, current_states: np.ndarray):
+        """
+        Store reports of many crossroads at once, current_states given as STATES indices
+        """
+        self.counts[indices] = counts
+        self.ts_sums[indices] = ts_sums - counts * self._epoch
+        self.current_states[indices] = current_states
+        self.pending[indices] = True
+
+    def recommend(self, indices: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recommend states of given crossroads, by default of all which reported since the last call.
+        Returns crossroads indices and recommended STATES indices.
+        """
+        if indices is None:
+            indices = np.flatnonzero(self.pending)
+        self.pending[indices] = False
+        now = self._clock()
+        counts = self.counts[indices]
+        waits = counts * (now - self._epoch) - self.ts_sums[indices]
+        best = self._policy(counts, waits).astype(np.int8)
+
+        current = self.current_states[indices]
+        other = 1 - current
+        deadlines = self.deadlines[indices]
+        starving = deadlines[np.arange(len(indices)), other] <= now
+        best = np.where(starving, other, best).astype(np.int8)
+
+        deadlines[np.arange(len(indices)), current] = now + self._timeout
+        deadlines[np.arange(len(indices)), best] = now + self._timeout
+        self.deadlines[indices] = deadlines
+        return indices, best
+
+    def recommend_states(self, indices: Optional[np.ndarray] = None) -> Dict[int, str]:
+        indices, best = self.recommend(indices)
+        return {int(index): STATES[state] for index, state in zip(indices, best)}
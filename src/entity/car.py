@@ -1,6 +1,7 @@
 import json
-from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterable, List, Optional
+
+import numpy as np
 
 
 class Direction:
@@ -14,34 +15,220 @@ class Direction:
         return [Direction.N, Direction.S, Direction.E, Direction.W]
 
 
-@dataclass
+# every byte of packed path decoded to its 4 directions
+_BYTE_DIRECTIONS = [''.join(Direction.as_list()[(value >> (2 * position)) & 3] for position in range(4))
+                    for value in range(256)]
+
+
 class Car:
-    id: int
-    starting_crossroad_id: int
-    starting_queue_direction: str
-    create_timestamp: float
-    path: List[str]
-    dispatch_timestamp: Optional[float] = None
+    """
+    Car travelling through the map.
+    Path is packed 2 bits per direction into an int like in CarStore, the next direction in the lowest bits,
+    advancing the car shifts it out, so it is O(1) and path property returns only directions left to go.
+    """
+    __slots__ = ('id', 'starting_crossroad_id', 'starting_queue_direction', 'create_timestamp',
+                 'dispatch_timestamp', '_path', '_hops')
+    DIRECTIONS = Direction.as_list()
+    _CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
 
-    def to_json(self) -> str:
-        return json.dumps({
+    def __init__(self, id: int, starting_crossroad_id: int, starting_queue_direction: str, create_timestamp: float,
+                 path: Iterable[str], dispatch_timestamp: Optional[float] = None):
+        self.id = id
+        self.starting_crossroad_id = starting_crossroad_id
+        self.starting_queue_direction = starting_queue_direction
+        self.create_timestamp = create_timestamp
+        self.dispatch_timestamp = dispatch_timestamp
+        self.path = path
+
+    @classmethod
+    def from_packed_path(cls, id: int, starting_crossroad_id: int, starting_queue_direction: str,
+                         create_timestamp: float, packed_path: int, hops: int,
+                         dispatch_timestamp: Optional[float] = None) -> 'Car':
+        car = cls(id, starting_crossroad_id, starting_queue_direction, create_timestamp, (), dispatch_timestamp)
+        car._path = packed_path & ((1 << (2 * hops)) - 1)
+        car._hops = hops
+        return car
+
+    @property
+    def path(self) -> List[str]:
+        return list(self.path_string())
+
+    @path.setter
+    def path(self, path: Iterable[str]):
+        codes = self._CODES
+        packed = 0
+        hops = 0
+        for direction in path:
+            packed |= codes[direction] << (2 * hops)
+            hops += 1
+        self._path = packed
+        self._hops = hops
+
+    @property
+    def packed_path(self) -> int:
+        """
+        Directions left to go, 2 bits each, the next one in the lowest bits
+        """
+        return self._path
+
+    @property
+    def remaining_hops(self) -> int:
+        return self._hops
+
+    def path_string(self) -> str:
+        """
+        Directions left to go as one string, decoded from packed path a byte at a time
+        """
+        byte_directions = _BYTE_DIRECTIONS
+        packed = self._path.to_bytes((self._hops + 3) // 4, 'little')
+        return ''.join([byte_directions[value] for value in packed])[:self._hops]
+
+    @property
+    def direction(self):
+        assert self._hops, f'Car lost {self}'
+        return self.DIRECTIONS[self._path & 3]
+
+    def advance(self) -> str:
+        """
+        Consume next direction of the path
+        """
+        direction = self.direction
+        self._path >>= 2
+        self._hops -= 1
+        return direction
+
+    def to_dict(self) -> dict:
+        return {
             "id": self.id,
             "starting_crossroad_id": self.starting_crossroad_id,
             "starting_queue_direction": self.starting_queue_direction,
             "create_timestamp": self.create_timestamp,
             "dispatch_timestamp": self.dispatch_timestamp,
-            "path": self.path,
-        })
-
-    @property
-    def direction(self):
-        assert self.path, f'Car lost {self}'
-        return self.path[0]
+            "path": self.path_string(),
+        }
 
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
 
     @classmethod
     def from_json(cls, json_str) -> 'Car':
         return cls(**json.loads(json_str))
 
+    def __eq__(self, other):
+        if not isinstance(other, Car):
+            return NotImplemented
+        return (self.id == other.id and self._path == other._path and self._hops == other._hops and
+                self.starting_crossroad_id == other.starting_crossroad_id and
+                self.starting_queue_direction == other.starting_queue_direction and
+                self.create_timestamp == other.create_timestamp and
+                self.dispatch_timestamp == other.dispatch_timestamp)
+
     def __repr__(self):
         return f"({self.id}, {self.path})"
+
+
+class CarStore:
+    """
+    Struct-of-arrays storage for large car populations.
+    Every field is a NumPy array indexed by store position, paths are packed 2 bits per direction
+    into uint64, so a car takes a few dozen bytes and whole batches can be advanced at once.
+    """
+    MAX_PATH_LENGTH = 32
+    DIRECTIONS = Direction.as_list()
+    _CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+    _FIELDS = ('ids', 'starting_crossroad_ids', 'starting_queue_directions', 'create_timestamps',
+               'dispatch_timestamps', 'paths', 'path_lengths', 'cursors')
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.starting_crossroad_ids = np.zeros(capacity, dtype=np.int32)
+        self.starting_queue_directions = np.zeros(capacity, dtype=np.uint8)
+        self.create_timestamps = np.zeros(capacity, dtype=np.float64)
+        self.dispatch_timestamps = np.full(capacity, np.nan, dtype=np.float64)
+        self.paths = np.zeros(capacity, dtype=np.uint64)
+        self.path_lengths = np.zeros(capacity, dtype=np.uint8)
+        self.cursors = np.zeros(capacity, dtype=np.uint8)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, count: int):
+        capacity = len(self.ids)
+        if self.size + count <= capacity:
+            return
+        new_capacity = max(capacity * 2, self.size + count)
+        for name in self._FIELDS:
+            old = getattr(self, name)
+            new = np.full(new_capacity, np.nan if name == 'dispatch_timestamps' else 0, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+
+    @classmethod
+    def pack_path(cls, path: Iterable[str]) -> int:
+        packed = 0
+        for position, direction in enumerate(path):
+            assert position < cls.MAX_PATH_LENGTH, f'Path longer than {cls.MAX_PATH_LENGTH}'
+            packed |= cls._CODES[direction] << (2 * position)
+        return packed
+
+    def add(self, car: Car) -> int:
+        self._reserve(1)
+        index = self.size
+        assert car.remaining_hops <= self.MAX_PATH_LENGTH, f'Path longer than {self.MAX_PATH_LENGTH}'
+        self.ids[index] = car.id
+        self.starting_crossroad_ids[index] = car.starting_crossroad_id
+        self.starting_queue_directions[index] = self._CODES[car.starting_queue_direction]
+        self.create_timestamps[index] = car.create_timestamp
+        self.dispatch_timestamps[index] = np.nan if car.dispatch_timestamp is None else car.dispatch_timestamp
+        self.paths[index] = car.packed_path
+        self.path_lengths[index] = car.remaining_hops
+        self.cursors[index] = 0
+        self.size += 1
+        return index
+
+    def add_many(self, ids: np.ndarray, starting_crossroad_ids: np.ndarray, starting_queue_directions: np.ndarray,
+                 create_timestamps: np.ndarray, path_codes: np.ndarray, path_lengths: np.ndarray) -> np.ndarray:
+        """
+        Add batch of cars, path_codes is (cars, max path length) array of direction codes
+        """
+        assert path_codes.shape[1] <= self.MAX_PATH_LENGTH and np.all(path_lengths <= self.MAX_PATH_LENGTH), \
+            f'Path longer than {self.MAX_PATH_LENGTH}'
+        count = len(ids)
+        self._reserve(count)
+        indices = np.arange(self.size, self.size + count)
+        shifts = (2 * np.arange(path_codes.shape[1])).astype(np.uint64)
+        self.ids[indices] = ids
+        self.starting_crossroad_ids[indices] = starting_crossroad_ids
+        self.starting_queue_directions[indices] = starting_queue_directions
+        self.create_timestamps[indices] = create_timestamps
+        self.dispatch_timestamps[indices] = np.nan
+        self.paths[indices] = np.bitwise_or.reduce(path_codes.astype(np.uint64) << shifts, axis=1)
+        self.path_lengths[indices] = path_lengths
+        self.cursors[indices] = 0
+        self.size += count
+        return indices
+
+    def directions(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Codes of next directions of given cars
+        """
+        assert np.all(self.cursors[indices] < self.path_lengths[indices]), 'Car lost'
+        shifts = (2 * self.cursors[indices]).astype(np.uint64)
+        return ((self.paths[indices] >> shifts) & np.uint64(3)).astype(np.uint8)
+
+    def advance(self, indices: np.ndarray) -> np.ndarray:
+        directions = self.directions(indices)
+        self.cursors[indices] += 1
+        return directions
+
+    def get(self, index: int) -> Car:
+        start, end = int(self.cursors[index]), int(self.path_lengths[index])
+        packed = int(self.paths[index])
+        dispatch_timestamp = float(self.dispatch_timestamps[index])
+        return Car.from_packed_path(id=int(self.ids[index]),
+                                    starting_crossroad_id=int(self.starting_crossroad_ids[index]),
+                                    starting_queue_direction=self.DIRECTIONS[self.starting_queue_directions[index]],
+                                    create_timestamp=float(self.create_timestamps[index]),
+                                    packed_path=packed >> (2 * start), hops=end - start,
+                                    dispatch_timestamp=None if np.isnan(dispatch_timestamp) else dispatch_timestamp)
@@ -0,0 +1,41 @@
+import math
+from typing import Dict, Iterable, Optional
+
+
+class DischargeModel:
+    """
+    Saturation-flow discharge of crossroad lanes with bounded lane capacity.
+    Open lane lets saturation_flow cars per green second go, fraction of a car left is carried to the next move
+    while the lane stays open. Lane takes at most lane_capacity cars from its neighbour crossroad, None is unbounded.
+    Capacity is kept by credits: upstream crossroad starts with lane_capacity credits for every neighbour,
+    spends one per car sent and gets it back when the car leaves the downstream lane,
+    a move without credit waits, so full lanes block their upstream neighbours and queues spill back.
+    Lanes on the map border take all arriving cars, traffic outside of the map is not modelled.
+    Default is one car per lane every 2 s move period with unbounded lanes.
+    """
+
+    def __init__(self, saturation_flow: float = 0.5, lane_capacity: Optional[int] = None):
+        assert saturation_flow > 0 and (lane_capacity is None or lane_capacity > 0)
+        self.saturation_flow = saturation_flow
+        self.lane_capacity = lane_capacity
+        self._carry: Dict[str, float] = {}
+
+    def allowances(self, open_lanes: Iterable[str], green_time: float) -> Dict[str, int]:
+        """
+        Number of cars every open lane can discharge after green_time seconds, closed lanes lose their carry
+        """
+        allowances = {}
+        carry = {}
+        for lane in open_lanes:
+            allowance = self._carry.get(lane, 0.0) + self.saturation_flow * green_time
+            allowances[lane] = math.floor(allowance)
+            carry[lane] = allowance - allowances[lane]
+        self._carry = carry
+        return allowances
+
+    def initial_credits(self, connected: Dict[str, Optional[object]]) -> Dict[str, Optional[int]]:
+        """
+        Credits for every direction with a neighbour crossroad, None where moves are never blocked
+        """
+        return {direction: None if neighbour is None else self.lane_capacity
+                for direction, neighbour in connected.items()}
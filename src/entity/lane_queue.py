@@ -0,0 +1,115 @@
+from collections import deque
+from typing import Iterable, Optional
+
+from src.entity.lane_summary import LaneSummary
+
+
+class LaneQueue(deque):
+    """
+    Deque of cars waiting on one lane, keeping its LaneSummary aggregates up to date.
+    append, extend and popleft update count, sum of create timestamps and the oldest timestamp in O(1)
+    (the oldest one by a monotonic deque of candidates), so waiting times of the lane are known without
+    going over its cars. Other mutations are rare and recompute aggregates from the cars.
+    """
+
+    def __init__(self, cars: Iterable = ()):
+        super().__init__()
+        self.ts_sum = 0.0
+        self._oldest: deque = deque()
+        self.extend(cars)
+
+    def append(self, car):
+        super().append(car)
+        self._added(car.create_timestamp)
+
+    def extend(self, cars: Iterable):
+        for car in cars:
+            self.append(car)
+
+    def __iadd__(self, cars: Iterable):
+        self.extend(cars)
+        return self
+
+    def popleft(self):
+        car = super().popleft()
+        if self:
+            self.ts_sum -= car.create_timestamp
+        else:
+            # start over when empty, so float error of subtractions does not build up
+            self.ts_sum = 0.0
+        if self._oldest and self._oldest[0] == car.create_timestamp:
+            self._oldest.popleft()
+        return car
+
+    def clear(self):
+        super().clear()
+        self.ts_sum = 0.0
+        self._oldest.clear()
+
+    def appendleft(self, car):
+        super().appendleft(car)
+        self._recount()
+
+    def extendleft(self, cars: Iterable):
+        super().extendleft(cars)
+        self._recount()
+
+    def pop(self):
+        car = super().pop()
+        self._recount()
+        return car
+
+    def insert(self, index: int, car):
+        super().insert(index, car)
+        self._recount()
+
+    def remove(self, car):
+        super().remove(car)
+        self._recount()
+
+    def rotate(self, n: int = 1):
+        super().rotate(n)
+        self._recount()
+
+    def reverse(self):
+        super().reverse()
+        self._recount()
+
+    def __setitem__(self, index, car):
+        super().__setitem__(index, car)
+        self._recount()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._recount()
+
+    def _added(self, timestamp: float):
+        self.ts_sum += timestamp
+        while self._oldest and self._oldest[-1] > timestamp:
+            self._oldest.pop()
+        self._oldest.append(timestamp)
+
+    def _recount(self):
+        self.ts_sum = 0.0
+        self._oldest.clear()
+        for car in self:
+            self._added(car.create_timestamp)
+
+    @property
+    def ts_min(self) -> Optional[float]:
+        return self._oldest[0] if self._oldest else None
+
+    def total_wait(self, now: float) -> float:
+        return len(self) * now - self.ts_sum
+
+    def average_wait(self, now: float) -> float:
+        return self.total_wait(now) / len(self) if self else 0.0
+
+    def snapshot(self, now: Optional[float] = None) -> LaneSummary:
+        """
+        Read-only summary of the lane at the moment, made in O(1) without copying cars
+        """
+        if not self:
+            return LaneSummary()
+        ts_min = self._oldest[0]
+        return LaneSummary(len(self), self.ts_sum, ts_min, 0.0 if now is None else now - ts_min)
@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+@dataclass
+class LaneSummary:
+    """
+    Fixed size description of cars waiting on one lane, enough for Algorithm to recommend state.
+    oldest_age is waiting time of the first car at the moment summary was made.
+    """
+    count: int = 0
+    ts_sum: float = 0.0
+    ts_min: Optional[float] = None
+    oldest_age: float = 0.0
+
+    @classmethod
+    def from_cars(cls, cars: Iterable, now: Optional[float] = None) -> 'LaneSummary':
+        """
+        Summarize lane of Car objects or serialized car dicts, LaneQueue gives its snapshot without going over cars
+        """
+        if hasattr(cars, 'snapshot'):
+            return cars.snapshot(now)
+        timestamps = [car['create_timestamp'] if isinstance(car, dict) else car.create_timestamp for car in cars]
+        if not timestamps:
+            return cls()
+        ts_min = min(timestamps)
+        return cls(count=len(timestamps),
+                   ts_sum=sum(timestamps),
+                   ts_min=ts_min,
+                   oldest_age=0.0 if now is None else now - ts_min)
+
+    def total_wait(self, now: float) -> float:
+        return self.count * now - self.ts_sum
+
+    def average_wait(self, now: float) -> float:
+        return self.total_wait(now) / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'ts_sum': self.ts_sum, 'ts_min': self.ts_min, 'oldest_age': self.oldest_age}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LaneSummary':
+        return cls(**data)
@@ -0,0 +1,103 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+
+# waiting time crossing a threshold up to this much earlier counts, so checks at computed timestamps see it
+AGE_TOLERANCE = 1e-6
+
+
+class StatusReporter:
+    """
+    Decides when crossroad reports its lanes to the aggregator, instead of reporting on fixed period.
+    Report is due when count of some lane moves to another multiple of count_threshold, the oldest car
+    of some lane waits past another multiple of age_threshold, or heartbeat seconds passed since the last report.
+    Lights state is sent with every report but its change alone does not trigger one, as it mostly follows
+    the recommendation replying to the previous report. Reports are never sent more often than every min_interval seconds,
+    change in the meantime is reported when min_interval passes.
+    """
+
+    def __init__(self, count_threshold: int = 1, age_threshold: float = 5.0,
+                 min_interval: float = 1.0, heartbeat: float = 10.0):
+        assert count_threshold >= 1 and age_threshold > 0 and 0 <= min_interval <= heartbeat
+        self.count_threshold = count_threshold
+        self.age_threshold = age_threshold
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.last_report_ts: Optional[float] = None
+        self.reports = 0
+        self._reported: Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]] = None
+
+    def _levels(self, counts: Sequence[int], oldest_ages: Sequence[float]) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        count_threshold = self.count_threshold
+        age_threshold = self.age_threshold
+        return (tuple([count // count_threshold for count in counts]),
+                tuple([int((age + AGE_TOLERANCE) // age_threshold) if count else -1
+                       for count, age in zip(counts, oldest_ages)]))
+
+    def should_report(self, counts: Sequence[int], oldest_ages: Sequence[float], now: float) -> bool:
+        """
+        Whether lanes with given counts and waiting times of their first cars have to be reported now
+        """
+        if self.last_report_ts is None:
+            return True
+        if now < self.last_report_ts + self.min_interval:
+            return False
+        return now >= self.last_report_ts + self.heartbeat or \
+            self._levels(counts, oldest_ages) != self._reported
+
+    def reported(self, counts: Sequence[int], oldest_ages: Sequence[float], now: float):
+        self.last_report_ts = now
+        self.reports += 1
+        self._reported = self._levels(counts, oldest_ages)
+
+    def report_if_due(self, counts: Sequence[int], oldest_ages: Sequence[float], now: float) -> bool:
+        """
+        should_report and reported in one step, levels of the lanes are computed once
+        """
+        if self.last_report_ts is not None:
+            if now < self.last_report_ts + self.min_interval:
+                return False
+            if now < self.last_report_ts + self.heartbeat:
+                levels = self._levels(counts, oldest_ages)
+                if levels == self._reported:
+                    return False
+                self.last_report_ts = now
+                self.reports += 1
+                self._reported = levels
+                return True
+        self.reported(counts, oldest_ages, now)
+        return True
+
+    def next_check_ts(self, counts: Sequence[int], oldest_ages: Sequence[float], now: float) -> float:
+        """
+        Time when report may become due without any change of the lanes:
+        heartbeat, or the oldest car of a lane reaching next multiple of age_threshold
+        """
+        if self.last_report_ts is None:
+            return now
+        age_threshold = self.age_threshold
+        check_ts = self.last_report_ts + self.heartbeat
+        for count, age in zip(counts, oldest_ages):
+            if count:
+                next_level = (age + AGE_TOLERANCE) // age_threshold + 1
+                age_check_ts = now + next_level * age_threshold - age
+                if age_check_ts < check_ts:
+                    check_ts = age_check_ts
+        return max(check_ts, self.last_report_ts + self.min_interval, now)
+
+    def change_ts(self, now: float) -> float:
+        """
+        Time when change of lanes can be reported
+        """
+        if self.last_report_ts is None:
+            return now
+        return max(self.last_report_ts + self.min_interval, now)
+
+
+def lane_levels(line_queues: Dict[str, Sequence], lines: Sequence[str], now: float):
+    """
+    Counts of cars and waiting times of the first cars of lanes, in lines order, as StatusReporter takes them
+    """
+    queues = [line_queues[line] for line in lines]
+    counts = [len(cars) for cars in queues]
+    oldest_ages = [now - cars[0].create_timestamp if cars else 0.0 for cars in queues]
+    return counts, oldest_ages
@@ -0,0 +1,105 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.entity.car import Direction
+
+# columns of the neighbor table, in Direction.as_list() order
+NEIGHBOR_DIRECTIONS = Direction.as_list()
+
+
+def occupancy_mask(width: int, height: int, crossroads_count: Optional[int] = None) -> np.ndarray:
+    """
+    Grid positions taken by crossroads, first crossroads_count positions in np.ndindex order
+    """
+    crossroads_count = width * height if crossroads_count is None else crossroads_count
+    assert crossroads_count <= width * height
+    mask = np.zeros(width * height, dtype=bool)
+    mask[:crossroads_count] = True
+    return mask.reshape(width, height)
+
+
+def grid_ids(mask: np.ndarray) -> np.ndarray:
+    """
+    Crossroad id at every grid position, numbered from 1 in np.ndindex order, 0 where there is no crossroad
+    """
+    ids = np.zeros(mask.shape, dtype=np.int64)
+    ids[mask] = np.arange(1, int(mask.sum()) + 1)
+    return ids
+
+
+def _previous_along(ids: np.ndarray, axis: int) -> np.ndarray:
+    """
+    Id of the nearest crossroad before every position along axis, 0 if there is none.
+    Empty positions are skipped, like a street going through a place without crossroad.
+    """
+    positions = np.arange(ids.shape[axis]).reshape((-1, 1) if axis == 0 else (1, -1))
+    last_taken = np.maximum.accumulate(np.where(ids > 0, positions, -1), axis=axis)
+    previous = np.full(ids.shape, -1, dtype=np.int64)
+    if axis == 0:
+        previous[1:, :] = last_taken[:-1, :]
+    else:
+        previous[:, 1:] = last_taken[:, :-1]
+    other = np.indices(ids.shape)[1 - axis]
+    index = (np.maximum(previous, 0), other) if axis == 0 else (other, np.maximum(previous, 0))
+    return np.where(previous >= 0, ids[index], 0)
+
+
+def neighbor_table(ids: np.ndarray) -> np.ndarray:
+    """
+    Table of (crossroads + 1, 4) neighbor ids, row is crossroad id, columns are N, S, E, W, 0 is map border.
+    N is y + 1, E is x + 1, row 0 is unused.
+    """
+    west = _previous_along(ids, axis=0)
+    east = _previous_along(ids[::-1, :], axis=0)[::-1, :]
+    south = _previous_along(ids, axis=1)
+    north = _previous_along(ids[:, ::-1], axis=1)[:, ::-1]
+    table = np.zeros((int(ids.max(initial=0)) + 1, len(NEIGHBOR_DIRECTIONS)), dtype=np.int64)
+    taken = ids > 0
+    table[ids[taken]] = np.stack([north[taken], south[taken], east[taken], west[taken]], axis=1)
+    return table
+
+
+def grid_edges(table: np.ndarray) -> np.ndarray:
+    """
+    Directed edges (crossroad, neighbor) of the grid as (edges, 2) array, both directions of every street
+    """
+    nodes, directions = np.nonzero(table)
+    return np.stack([nodes, table[nodes, directions]], axis=1)
+
+
+def grid_layout(width: int, height: int, crossroads_count: Optional[int] = None,
+                mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Crossroad ids grid and neighbor table for the first crossroads_count positions or given occupancy mask
+    """
+    if mask is None:
+        mask = occupancy_mask(width, height, crossroads_count)
+    assert mask.shape == (width, height)
+    ids = grid_ids(mask)
+    return ids, neighbor_table(ids)
+
+
+def grid_neighbors(width: int, height: int, crossroads_count: int,
+                   mask: Optional[np.ndarray] = None) -> Dict[int, Dict[str, Optional[int]]]:
+    """
+    Crossroads layout used by MapGenerator without building the networkx graph.
+    Crossroads are numbered from 1 in np.ndindex order, missing neighbor (map border) is None.
+    """
+    _, table = grid_layout(width, height, crossroads_count, mask)
+    return {
+        idx: {direction: int(neighbor) or None for direction, neighbor in zip(NEIGHBOR_DIRECTIONS, row)}
+        for idx, row in enumerate(table.tolist()[1:], start=1)
+    }
+
+
+def grid_regions(width: int, height: int, crossroads_count: int, regions_count: int) -> Dict[int, int]:
+    """
+    Split crossroads into regions_count contiguous regions of (almost) equal size.
+    Crossroads are taken in np.ndindex order, so every region is a strip of neighbouring grid columns.
+    Returns region index, from 0, of every crossroad id.
+    """
+    assert 0 < regions_count <= crossroads_count <= width * height
+    crossroad_ids = np.arange(1, crossroads_count + 1)
+    return {int(idx): region for region, ids in enumerate(np.array_split(crossroad_ids, regions_count))
+            for idx in ids}
@@ -1,22 +1,35 @@
 import matplotlib
 matplotlib.use('Agg')
 
+from typing import List, Tuple
+
 import networkx as nx
 import matplotlib.pyplot as plt
 from netgraph import Graph
 import numpy as np
 
+from src.graphs.renderer import GraphRenderer
+
+
 class IntersectionsGraph(nx.DiGraph):
+    """
+    Map of crossroads with queue lengths on edges and light states on nodes.
+    Updates do not render the graph themselves, they only notify the renderer, disabled by default.
+    """
+    renderer: GraphRenderer = GraphRenderer()
+
+    def set_renderer(self, renderer: GraphRenderer):
+        self.renderer = renderer
 
     def update_intersection(self, node_id: str, values: dict):
         neighbors = self.get_node_neighbors(node_id)
         for direction, value in values.items():
             nx.set_edge_attributes(self, {(neighbors[direction], node_id): {"value": value}})
-        self.visualize()
+        self.renderer.mark_dirty(self)
 
     def update_intersection_state(self, node_id: str, state: str):
         nx.set_node_attributes(self, {node_id: {"state": state}})
-        self.visualize()
+        self.renderer.mark_dirty(self)
 
     def get_node_neighbors(self, node):
         x = self.nodes[node]['x_cord']
@@ -36,7 +49,7 @@ class IntersectionsGraph(nx.DiGraph):
                 neighbors['N'] = neighbor
         return neighbors
 
-    def visualize(self):
+    def visualize(self, path: str = 'grid_graph.png'):
         plt.clf()
         scale_x = max(nx.get_node_attributes(self, 'x_cord').values()) + 1
         scale_y = max(nx.get_node_attributes(self, 'y_cord').values()) + 1
@@ -64,9 +77,14 @@ class IntersectionsGraph(nx.DiGraph):
 
         plt.gca()
         plt.axis("off")
-        plt.savefig('grid_graph.png')
+        plt.savefig(path)
         # plt.show()
 
-
-# global graph variable for simulation used by agents
-simulation_graph = IntersectionsGraph()
+    def snapshot(self) -> Tuple[List, List]:
+        while True:
+            try:
+                return ([(node, dict(data)) for node, data in self.nodes(data=True)],
+                        [(u, v, dict(data)) for u, v, data in self.edges(data=True)])
+            except RuntimeError:
+                # graph changed size while copying, try again
+                continue
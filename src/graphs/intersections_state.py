@@ -0,0 +1,96 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.entity.LightState import LightState
+from src.graphs.grid import NEIGHBOR_DIRECTIONS
+from src.graphs.renderer import GraphRenderer
+
+
+class IntersectionsState:
+    """
+    Runtime state of the map kept in dense NumPy arrays indexed by crossroad id:
+    queue lengths of N, S, E, W lanes and light state of every crossroad.
+    Queue length of a lane is the value of the edge coming from the neighbor in that direction,
+    updates write array cells only, the networkx IntersectionsGraph is built on demand by to_graph.
+    """
+    STATES = ['', LightState.NS, LightState.EW]
+    _DIRECTION_COLUMNS = {direction: column for column, direction in enumerate(NEIGHBOR_DIRECTIONS)}
+    _STATE_CODES = {state: code for code, state in enumerate(STATES)}
+    renderer: GraphRenderer = GraphRenderer()
+
+    def __init__(self):
+        self.load(np.zeros((0, 0), dtype=np.int64), np.zeros((1, len(NEIGHBOR_DIRECTIONS)), dtype=np.int64))
+
+    def load(self, grid: np.ndarray, neighbors: np.ndarray):
+        """
+        Set map layout: grid of crossroad ids (0 where there is none) and neighbor table from src.graphs.grid
+        """
+        size = len(neighbors)
+        self.neighbors = neighbors
+        self.positions = np.zeros((size, 2), dtype=np.int64)
+        xs, ys = np.nonzero(grid)
+        self.positions[grid[xs, ys]] = np.stack([xs, ys], axis=1)
+        self.nodes = np.sort(grid[grid > 0])
+        self.queue_lengths = np.zeros((size, len(NEIGHBOR_DIRECTIONS)), dtype=np.int64)
+        self.light_states = np.zeros(size, dtype=np.uint8)
+        self._graph = None
+
+    def set_renderer(self, renderer: GraphRenderer):
+        self.renderer = renderer
+
+    def update_intersection(self, node_id: int, values: Dict[str, int]):
+        row = self.queue_lengths[node_id]
+        for direction, value in values.items():
+            row[self._DIRECTION_COLUMNS[direction]] = value
+        self.renderer.mark_dirty(self)
+
+    def update_intersection_state(self, node_id: int, state: str):
+        self.light_states[node_id] = self._STATE_CODES[state]
+        self.renderer.mark_dirty(self)
+
+    def get_node_neighbors(self, node: int) -> Dict[str, Optional[int]]:
+        return {direction: int(neighbor) or None
+                for direction, neighbor in zip(NEIGHBOR_DIRECTIONS, self.neighbors[node].tolist())}
+
+    def snapshot(self) -> Tuple[List, List]:
+        """
+        Nodes and edges with their attributes, in the form accepted by add_nodes_from and add_edges_from
+        """
+        queue_lengths = self.queue_lengths.copy()
+        light_states = self.light_states.copy()
+        nodes = [(node, {"x_cord": x, "y_cord": y, "state": self.STATES[state]})
+                 for node, (x, y), state in zip(self.nodes.tolist(), self.positions[self.nodes].tolist(),
+                                                light_states[self.nodes].tolist())]
+        # edge (neighbor, node) carries queue length of node's lane facing the neighbor
+        node_ids, columns = np.nonzero(self.neighbors)
+        values = queue_lengths[node_ids, columns]
+        edges = [(neighbor, node, {"value": value}) for neighbor, node, value in
+                 zip(self.neighbors[node_ids, columns].tolist(), node_ids.tolist(), values.tolist())]
+        return nodes, edges
+
+    def to_graph(self):
+        """
+        networkx view of the current state for visualization and analysis.
+        Graph structure is built once per layout, later calls only refresh node and edge attributes.
+        """
+        from src.graphs.intersections_graph import IntersectionsGraph
+
+        nodes, edges = self.snapshot()
+        if self._graph is None:
+            self._graph = IntersectionsGraph()
+            self._graph.add_nodes_from(nodes)
+            self._graph.add_edges_from(edges)
+            return self._graph
+        for node, data in nodes:
+            self._graph.nodes[node].update(data)
+        for neighbor, node, data in edges:
+            self._graph.edges[neighbor, node].update(data)
+        return self._graph
+
+    def visualize(self, path: str = 'grid_graph.png'):
+        self.to_graph().visualize(path)
+
+
+# global state of the map for simulation used by agents
+simulation_graph = IntersectionsState()
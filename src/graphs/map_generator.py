@@ -1,60 +1,105 @@
 import random
-from typing import Tuple
+from typing import Collection, Optional, Tuple
 import numpy as np
-from src.agents.car_dispatcher import CarDispatcher
-from src.graphs.intersections_graph import simulation_graph
+from src.agents.car_dispatcher import CarDispatcher, dispatcher_stats_path
+from src.agents.traffic_info_aggregator import TrafficInfoAggregator
+from src.graphs.grid import NEIGHBOR_DIRECTIONS, grid_layout, grid_regions
+from src.graphs.intersections_state import simulation_graph
 from src.agents.crossroad_handler import CrossroadHandler
+from src.entity.discharge import DischargeModel
+
+
+# where cars leaving the map go: one dispatcher, one per map edge or one per grid region
+DISPATCHER_MODES = ('single', 'edge', 'region')
 
 
 class MapGenerator:
+    """
+    Builds grid map of crossroads with NumPy: crossroad ids and N/S/E/W neighbor table are computed
+    with array operations and loaded into the simulation state.
+    Crossroads take first crossroads_count grid positions, or positions set in occupancy mask.
+    Neighbor table (see grid.neighbor_table) is kept in self.neighbors for reuse.
+    """
 
-    def __init__(self, crossroads_count, width, height):
+    def __init__(self, crossroads_count, width, height, mask: Optional[np.ndarray] = None):
         assert crossroads_count <= width * height
+        assert mask is None or int(mask.sum()) == crossroads_count
         self.crossroads_count = crossroads_count
         self.width = width
         self.height = height
-        self.grid = np.zeros([width, height], dtype=int)
+        self.grid, self.neighbors = grid_layout(width, height, crossroads_count, mask)
         self.graph = simulation_graph
+        self.aggregators: list[TrafficInfoAggregator] = []
+        self.dispatchers: list[CarDispatcher] = []
 
-    def _create_edges(self, axis):
-        node_1 = None
-        grid = self.grid if axis == 0 else self.grid.T.copy(order='C')
-        for node_2 in (grid_iter := np.nditer(grid, flags=['multi_index'])):
-            if grid_iter.multi_index[1] == 0:
-                node_1 = None
-            node_2 = int(node_2)
-            if not node_2:
-                continue
-            elif not node_1:
-                node_1 = node_2
-                continue
-            else:
-                self.graph.add_edge(node_1, node_2, value=0)
-                self.graph.add_edge(node_2, node_1, value=0)
-                node_1 = node_2
+    def build_graph(self):
+        """
+        Load crossroads layout into the simulation state, networkx graph is built from it only when needed
+        """
+        self.graph.load(self.grid, self.neighbors)
 
-    def generate(self, jid_dispatcher="dispatcher@localhost") -> Tuple[CarDispatcher, list[CrossroadHandler]]:
-        # position nodes on the grid
+    def generate(self, jid_dispatcher="dispatcher@localhost",
+                 info_summary: bool = False,
+                 aggregators_count: Optional[int] = None,
+                 stats_path: Optional[str] = None,
+                 crossroad_ids: Optional[Collection[int]] = None,
+                 dispatcher_mode: str = 'single',
+                 dispatchers_count: int = 4,
+                 saturation_flow: float = 0.5,
+                 lane_capacity: Optional[int] = None) -> Tuple[list[CarDispatcher], list[CrossroadHandler]]:
+        """
+        Without aggregators_count every crossroad creates its own aggregator,
+        otherwise crossroads are split by grid region between aggregators_count shared aggregators,
+        which are kept in self.aggregators and have to be started before the crossroads.
+        With crossroad_ids only these crossroads get agents, e.g. the ones of one shard of the map.
+        Cars leaving the map go to jid_dispatcher in 'single' dispatcher_mode, to dispatcher of the map edge
+        they leave through in 'edge' mode (dispatcher_n@localhost, ...) and to dispatcher of the grid region
+        in 'region' mode (dispatcher0@localhost, ...), regions are split like the aggregators ones.
+        Dispatchers used by the crossroads are returned and kept in self.dispatchers.
+        Lanes discharge saturation_flow cars per green second and take lane_capacity cars, see DischargeModel.
+        """
+        assert dispatcher_mode in DISPATCHER_MODES
         crossroad_handlers = []
-        for idx, (x, y) in enumerate(list(np.ndindex(self.grid.shape))[:self.crossroads_count], start=1):
-            self.grid[x, y] = idx
-            self.graph.add_node(idx, x_cord=x, y_cord=y, state="")
-
-        # add horizontal edges
-        self._create_edges(1)
-        # add vertical edges
-        self._create_edges(0)
-        
-        for node in self.graph.nodes:
+        exits = set()
+        self.build_graph()
+        dispatcher_name, domain = jid_dispatcher.split("@")
+        dispatcher_regions = {}
+        if dispatcher_mode == 'region':
+            dispatcher_regions = grid_regions(self.width, self.height, self.crossroads_count, dispatchers_count)
+
+        regions = {}
+        if aggregators_count is not None:
+            regions = grid_regions(self.width, self.height, self.crossroads_count, aggregators_count)
+            self.aggregators = [TrafficInfoAggregator(f"aggregator{region}@localhost", "pwd")
+                                for region in range(aggregators_count)]
+
+        for node, node_neighbors in enumerate(self.neighbors.tolist()[1:], start=1):
+            if crossroad_ids is not None and node not in crossroad_ids:
+                continue
             neighbors_jid = {}
-            for direction, node_id in self.graph.get_node_neighbors(node).items():
-                if node_id is None:
-                    neighbors_jid[f"{direction.lower()}_crossroad_jid"] = jid_dispatcher
-                else:
+            for direction, node_id in zip(NEIGHBOR_DIRECTIONS, node_neighbors):
+                if node_id:
                     neighbors_jid[f"{direction.lower()}_crossroad_jid"] = f"crossroad{node_id}@localhost"
+                    continue
+                if dispatcher_mode == 'edge':
+                    exit_jid = f"{dispatcher_name}_{direction.lower()}@{domain}"
+                elif dispatcher_mode == 'region':
+                    exit_jid = f"{dispatcher_name}{dispatcher_regions[node]}@{domain}"
+                else:
+                    exit_jid = jid_dispatcher
+                neighbors_jid[f"{direction.lower()}_crossroad_jid"] = exit_jid
+                exits.add(exit_jid)
+            aggregator_jid = str(self.aggregators[regions[node]].jid) if node in regions else None
             crossroad_handlers.append(CrossroadHandler(f"crossroad{node}@localhost",
-                                                       "pwd", node, **neighbors_jid))
+                                                       "pwd", node, info_summary=info_summary,
+                                                       aggregator_jid=aggregator_jid,
+                                                       discharge_model=DischargeModel(saturation_flow, lane_capacity),
+                                                       **neighbors_jid))
 
-        dispatcher = CarDispatcher(jid_dispatcher, "pwd")
-        return dispatcher, crossroad_handlers
+        if dispatcher_mode == 'single':
+            exits = {jid_dispatcher}
+        self.dispatchers = [CarDispatcher(jid, "pwd", stats_path=stats_path if len(exits) == 1 else
+                                          dispatcher_stats_path(stats_path, jid.split("@")[0]))
+                            for jid in sorted(exits)]
+        return self.dispatchers, crossroad_handlers
 
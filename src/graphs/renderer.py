@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from typing import List, Optional, Tuple
+
+
+class GraphRenderer:
+    """
+    Renderer of the simulation graph doing nothing, used when rendering is disabled
+    """
+
+    def mark_dirty(self, graph):
+        pass
+
+    def close(self):
+        pass
+
+
+def _render_worker(snapshots: multiprocessing.Queue, output: str, frames_dir: Optional[str],
+                   animation: Optional[str], max_fps: float):
+    from src.graphs.intersections_graph import IntersectionsGraph
+
+    # simulation is stopped with ctrl+c, the worker finishes when the renderer is closed
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    frames: List[str] = []
+    while (snapshot := snapshots.get()) is not None:
+        nodes, edges = snapshot
+        graph = IntersectionsGraph()
+        graph.add_nodes_from(nodes)
+        graph.add_edges_from(edges)
+        if frames_dir is not None:
+            path = os.path.join(frames_dir, f'frame_{len(frames):06d}.png')
+            frames.append(path)
+        else:
+            path = output
+        graph.visualize(path)
+
+    if animation is not None and frames:
+        from PIL import Image
+        images = [Image.open(frame) for frame in frames]
+        images[0].save(animation, save_all=True, append_images=images[1:],
+                       duration=int(1000 / max_fps), loop=0)
+
+
+class RateLimitedRenderer(GraphRenderer):
+    """
+    Renders the simulation graph in a background worker process at most max_fps times per second.
+    Graph updates only mark it dirty, a daemon thread snapshots dirty graph and hands it to the worker,
+    snapshots are dropped while the worker is still busy with the previous one.
+    By default output png is overwritten, with frames_dir numbered frames are written there instead
+    and with animation they are also assembled into gif when renderer is closed.
+    """
+
+    def __init__(self, max_fps: float = 1.0, output: str = 'grid_graph.png',
+                 frames_dir: Optional[str] = None, animation: Optional[str] = None):
+        assert max_fps > 0
+        if animation is not None and frames_dir is None:
+            frames_dir = os.path.splitext(animation)[0] + '_frames'
+        if frames_dir is not None:
+            os.makedirs(frames_dir, exist_ok=True)
+        self.max_fps = max_fps
+        self.rendered_frames = 0
+        self._graph = None
+        self._dirty = threading.Event()
+        self._closed = threading.Event()
+        context = multiprocessing.get_context('spawn')
+        self._snapshots = context.Queue(maxsize=1)
+        self._worker = context.Process(target=_render_worker,
+                                       args=(self._snapshots, output, frames_dir, animation, max_fps),
+                                       daemon=True)
+        self._worker.start()
+        self._pump = threading.Thread(target=self._run, daemon=True)
+        self._pump.start()
+
+    def mark_dirty(self, graph):
+        self._graph = graph
+        self._dirty.set()
+
+    def _snapshot(self) -> Tuple[list, list]:
+        return self._graph.snapshot()
+
+    def _run(self):
+        while not self._closed.wait(1 / self.max_fps):
+            if not self._dirty.is_set():
+                continue
+            self._dirty.clear()
+            try:
+                self._snapshots.put_nowait(self._snapshot())
+                self.rendered_frames += 1
+            except queue.Full:
+                self._dirty.set()
+
+    def close(self):
+        """
+        Render last state of the graph and wait for the worker to finish
+        """
+        self._closed.set()
+        self._pump.join()
+        if self._dirty.is_set():
+            self._snapshots.put(self._snapshot())
+            self.rendered_frames += 1
+        self._snapshots.put(None)
+        self._worker.join()
@@ -0,0 +1,233 @@
+import bisect
+import itertools
+import random
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order
+
+from src.graphs.grid import NEIGHBOR_DIRECTIONS, grid_edges
+
+
+class Router:
+    """
+    Shortest routes between crossroads of the map, as directions a car takes on every crossroad.
+    Works on neighbor table from src.graphs.grid (IntersectionsState.neighbors, MapGenerator.neighbors).
+    Cars enter the map on boundary crossroads from the side without neighbor and leave it the same way,
+    so every route ends with a hop to the dispatcher and no car runs out of its path.
+    Breadth-first search trees of recently used origins and recently used routes are kept in LRU caches.
+    """
+
+    def __init__(self, neighbors: np.ndarray, trees_cache_size: int = 64, paths_cache_size: int = 65536):
+        self.neighbors = neighbors
+        self._neighbor_rows = neighbors.tolist()
+        self.trees_cache_size = trees_cache_size
+        self.paths_cache_size = paths_cache_size
+        self._trees: OrderedDict = OrderedDict()
+        self._paths: OrderedDict = OrderedDict()
+        edges = grid_edges(neighbors)
+        self._adjacency = csr_matrix((np.ones(len(edges), dtype=np.int8), (edges[:, 0], edges[:, 1])),
+                                     shape=(len(neighbors), len(neighbors)))
+        border = neighbors == 0
+        border[0] = False
+        self.boundary = np.nonzero(border.any(axis=1))[0]
+        # side without neighbor used to enter and leave boundary crossroad, another one if there is
+        self.entry_sides = np.argmax(border, axis=1).astype(np.uint8)
+        self.exit_sides = (border.shape[1] - 1 - np.argmax(border[:, ::-1], axis=1)).astype(np.uint8)
+
+    def __getstate__(self):
+        # caches are rebuilt on demand, so they are not kept in checkpoints
+        state = self.__dict__.copy()
+        state['_trees'] = OrderedDict()
+        state['_paths'] = OrderedDict()
+        return state
+
+    @classmethod
+    def from_graph(cls, graph, **kwargs) -> 'Router':
+        """
+        Router of networkx IntersectionsGraph, nodes have to be numbered from 1
+        """
+        neighbors = np.zeros((max(graph.nodes) + 1, len(NEIGHBOR_DIRECTIONS)), dtype=np.int64)
+        for node in graph.nodes:
+            node_neighbors = graph.get_node_neighbors(node)
+            neighbors[node] = [node_neighbors[direction] or 0 for direction in NEIGHBOR_DIRECTIONS]
+        return cls(neighbors, **kwargs)
+
+    def _tree(self, origin: int) -> np.ndarray:
+        """
+        Breadth-first search tree from origin as parent of every crossroad, negative if not reachable
+        """
+        parents = self._trees.get(origin)
+        if parents is not None:
+            self._trees.move_to_end(origin)
+            return parents
+        _, parents = breadth_first_order(self._adjacency, origin, directed=True, return_predecessors=True)
+        parents[origin] = origin
+        self._trees[origin] = parents
+        if len(self._trees) > self.trees_cache_size:
+            self._trees.popitem(last=False)
+        return parents
+
+    def _walk(self, trees: np.ndarray, tree_indices: np.ndarray, origins: np.ndarray,
+              destinations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Walk routes back from destinations to origins at once, one hop per step, on stacked parent arrays of
+        search trees. Returns direction codes padded with zeros and lengths of the routes.
+        """
+        assert np.all(trees[tree_indices, destinations] >= 0), 'Some destinations are not reachable'
+        rows = np.arange(len(destinations))
+        current = destinations.copy()
+        # codes are collected from the end of the route, starting with the hop leaving the map
+        steps = [self.exit_sides[destinations]]
+        hops = np.zeros(len(destinations), dtype=np.int64)
+        active = np.nonzero(current != origins)[0]
+        while len(active):
+            moving = current[active]
+            previous = trees[tree_indices[active], moving]
+            codes = np.zeros(len(destinations), dtype=np.uint8)
+            codes[active] = np.argmax(self.neighbors[previous] == moving[:, None], axis=1)
+            steps.append(codes)
+            current[active] = previous
+            hops[active] += 1
+            active = active[previous != origins[active]]
+        lengths = hops + 1
+        reversed_codes = np.stack(steps, axis=1)
+        # code taken on step from the end is at position length - 1 - step of the route
+        columns = lengths[:, None] - 1 - np.arange(reversed_codes.shape[1])
+        valid = columns >= 0
+        codes = np.zeros(reversed_codes.shape, dtype=np.uint8)
+        codes[np.broadcast_to(rows[:, None], columns.shape)[valid], columns[valid]] = reversed_codes[valid]
+        return codes, lengths
+
+    def route_codes(self, origin: int, destinations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Direction codes of routes from origin to many destinations, including the hop leaving the map,
+        as (destinations, longest route) array padded with zeros and lengths of the routes
+        """
+        destinations = np.asarray(destinations)
+        return self._walk(self._tree(origin)[None, :], np.zeros(len(destinations), dtype=np.int64),
+                          np.full(len(destinations), origin), destinations)
+
+    def route_batch(self, origins: np.ndarray, destinations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Direction codes and lengths of routes of a batch of cars, in the layout of CarStore.add_many.
+        Routes are about width + height hops long, CarStore takes at most CarStore.MAX_PATH_LENGTH of them,
+        so on grids larger than about 16x16 add_many rejects the batch.
+        Routes from up to trees_cache_size origins are walked together.
+        """
+        origins = np.asarray(origins)
+        destinations = np.asarray(destinations)
+        unique_origins, tree_indices = np.unique(origins, return_inverse=True)
+        lengths = np.zeros(len(origins), dtype=np.int64)
+        parts = []
+        for first in range(0, len(unique_origins), self.trees_cache_size):
+            chunk = unique_origins[first:first + self.trees_cache_size]
+            trees = np.stack([self._tree(int(origin)) for origin in chunk])
+            indices = np.nonzero((tree_indices >= first) & (tree_indices < first + len(chunk)))[0]
+            codes, lengths[indices] = self._walk(trees, tree_indices[indices] - first, origins[indices],
+                                                 destinations[indices])
+            parts.append((indices, codes))
+        path_codes = np.zeros((len(origins), int(lengths.max(initial=1))), dtype=np.uint8)
+        for indices, codes in parts:
+            path_codes[indices, :codes.shape[1]] = codes
+        return path_codes, lengths
+
+    def route(self, origin: int, destination: int) -> List[str]:
+        """
+        Directions of the route from origin to destination, the last one leaves the map
+        """
+        key = (origin, destination)
+        path = self._paths.get(key)
+        if path is None:
+            parents = self._tree(origin)
+            assert parents[destination] >= 0, f'Crossroad {destination} is not reachable from {origin}'
+            directions = [NEIGHBOR_DIRECTIONS[self.exit_sides[destination]]]
+            current = destination
+            while current != origin:
+                previous = int(parents[current])
+                directions.append(NEIGHBOR_DIRECTIONS[self._neighbor_rows[previous].index(current)])
+                current = previous
+            path = self._paths[key] = ''.join(reversed(directions))
+            if len(self._paths) > self.paths_cache_size:
+                self._paths.popitem(last=False)
+        else:
+            self._paths.move_to_end(key)
+        return list(path)
+
+    def entry_side(self, origin: int) -> str:
+        """
+        Lane car entering the map on origin crossroad arrives to
+        """
+        return NEIGHBOR_DIRECTIONS[self.entry_sides[origin]]
+
+
+class OriginDestinationDemand:
+    """
+    Origin-destination demand matrix: weight of cars entering on every origin crossroad
+    and leaving on every destination crossroad
+    """
+
+    def __init__(self, origins: np.ndarray, destinations: np.ndarray, weights: np.ndarray):
+        weights = np.asarray(weights, dtype=np.float64)
+        assert weights.shape == (len(origins), len(destinations)) and weights.sum() > 0
+        self.origins = np.asarray(origins)
+        self.destinations = np.asarray(destinations)
+        self.weights = weights
+        self._probabilities = (weights / weights.sum()).ravel()
+        self._cumulative_weights = list(itertools.accumulate(self._probabilities))
+        self._row_cumulative_weights = None
+
+    @classmethod
+    def uniform(cls, router: Router, origins: Optional[List[int]] = None) -> 'OriginDestinationDemand':
+        """
+        Same demand between every pair of boundary crossroads, origins can be limited to given crossroads.
+        Car leaving the map where it entered would need a U-turn, which lights never allow,
+        so such pairs are left out unless the crossroad has another side without neighbor.
+        """
+        entries = router.boundary if origins is None else np.intersect1d(router.boundary, origins)
+        assert len(entries), 'None of the origins is on the map boundary'
+        weights = np.ones((len(entries), len(router.boundary)))
+        u_turns = (entries[:, None] == router.boundary) & \
+                  (router.entry_sides[entries] == router.exit_sides[entries])[:, None]
+        weights[u_turns] = 0.0
+        return cls(entries, router.boundary, weights)
+
+    def _pair(self, flat_index):
+        return divmod(flat_index, len(self.destinations))
+
+    def sample(self, count: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Origins and destinations of count cars
+        """
+        origin_indices, destination_indices = self._pair(rng.choice(len(self._probabilities), size=count,
+                                                                    p=self._probabilities))
+        return self.origins[origin_indices], self.destinations[destination_indices]
+
+    def origin_rates(self, rate: float) -> np.ndarray:
+        """
+        Cars per second entering on every origin when rate cars per second enter the whole map
+        """
+        return rate * self.weights.sum(axis=1) / self.weights.sum()
+
+    def sample_destinations(self, origin_indices: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Destinations of cars entering on origins of given indices, drawn from their rows of the matrix
+        """
+        if self._row_cumulative_weights is None:
+            rows = np.cumsum(self.weights, axis=1)
+            self._row_cumulative_weights = rows / np.maximum(rows[:, -1:], 1e-300)
+        origin_indices = np.asarray(origin_indices)
+        thresholds = rng.random(len(origin_indices))
+        destination_indices = np.empty(len(origin_indices), dtype=np.int64)
+        for origin_index in np.unique(origin_indices):
+            cars = np.nonzero(origin_indices == origin_index)[0]
+            destination_indices[cars] = np.searchsorted(self._row_cumulative_weights[origin_index],
+                                                        thresholds[cars], side='right')
+        return self.destinations[np.minimum(destination_indices, len(self.destinations) - 1)]
+
+    def sample_one(self, rng: random.Random) -> Tuple[int, int]:
+        flat_index = min(bisect.bisect_right(self._cumulative_weights, rng.random()), len(self._probabilities) - 1)
+        origin_index, destination_index = self._pair(flat_index)
+        return int(self.origins[origin_index]), int(self.destinations[destination_index])
@@ -0,0 +1,212 @@
+import argparse
+import multiprocessing
+import queue
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from src.commons.logs import LOG_LEVELS, configure_logging
+from src.commons.streaming_stats import TravelTimeStats
+from src.communication.codec import CODECS, set_default_codec
+from src.communication.transport import ShardedLocalTransport, set_transport
+from src.graphs.grid import grid_regions
+
+
+def shard_routes(regions: Dict[int, int]) -> Dict[str, int]:
+    """
+    Shard owning every crossroad agent and its aggregator, by bare jid
+    """
+    routes = {}
+    for crossroad_id, shard in regions.items():
+        routes[f"crossroad{crossroad_id}@localhost"] = shard
+        routes[f"crossroad{crossroad_id}_aggr@localhost"] = shard
+    return routes
+
+
+def shard_dispatcher_jid(shard: int) -> str:
+    """
+    Dispatcher of cars leaving the map through crossroads of the shard, in 'edge' mode base of the edge ones
+    """
+    return f"dispatcher-{shard}@localhost"
+
+
+def run_shard(shard: int, shards_count: int, width: int, height: int, duration: float, seed: Optional[int],
+              codec: str, info_summary: bool, arrival_rate: Optional[float], dispatcher_mode: str,
+              inboxes: List, barrier, results, log_level: str = 'off', log_sample: int = 1):
+    """
+    Worker process running crossroads of one grid region with their aggregators, own dispatchers
+    and load generator sending cars to crossroads of the region.
+    With arrival_rate every shard sends its even share of the cars per second by Poisson arrival schedule.
+    Failed shard breaks the barrier, so other shards do not wait for it, and reports its traceback as error.
+    """
+    try:
+        _run_shard(shard, shards_count, width, height, duration, seed, codec, info_summary, arrival_rate,
+                   dispatcher_mode, inboxes, barrier, results, log_level, log_sample)
+    except BaseException:
+        barrier.abort()
+        results.put({'shard': shard, 'error': traceback.format_exc()})
+        raise
+
+
+def _run_shard(shard: int, shards_count: int, width: int, height: int, duration: float, seed: Optional[int],
+               codec: str, info_summary: bool, arrival_rate: Optional[float], dispatcher_mode: str,
+               inboxes: List, barrier, results, log_level: str, log_sample: int):
+    # agents are imported here, so spawned worker builds them in its own process and event loop
+    from src.agents.car_dispatcher import first_dispatch_timestamp, merged_stats
+    from src.agents.startup import StartupTimer, start_agents
+    from src.agents.load_generator import ArrivalLoadGenerator, LoadGenerator
+    from src.graphs.map_generator import MapGenerator
+
+    timer = StartupTimer()
+    configure_logging(log_level, log_sample)
+    set_default_codec(CODECS[codec])
+    regions = grid_regions(width, height, width * height, shards_count)
+    transport = ShardedLocalTransport(shard, shard_routes(regions), inboxes)
+    set_transport(transport)
+    crossroad_ids = sorted(crossroad_id for crossroad_id, region in regions.items() if region == shard)
+
+    map_generator = MapGenerator(crossroads_count=width * height, width=width, height=height)
+    # only crossroads of the shard get agents, each creating its own aggregator, the layout of the whole map
+    # is loaded for routing, dispatchers are named after the shard, so their jids are unique across processes
+    dispatchers, crossroads = map_generator.generate(jid_dispatcher=shard_dispatcher_jid(shard),
+                                                     info_summary=info_summary, crossroad_ids=set(crossroad_ids),
+                                                     dispatcher_mode=dispatcher_mode)
+    timer.phase('map')
+    start_agents(crossroads)
+    timer.phase('crossroads')
+    start_agents(dispatchers)
+    timer.phase('dispatchers')
+    # cars crossing shard border are dropped until the other shard has started its crossroads
+    barrier.wait()
+    timer.phase('barrier')
+
+    transport.stats.reset()
+    cpu_started = time.process_time()
+    shard_seed = None if seed is None else seed + shard
+    if arrival_rate is None:
+        load_generator = LoadGenerator(f"load_generator{shard}@localhost", "pwd", 1, 2, crossroad_ids, seed=shard_seed)
+    else:
+        load_generator = ArrivalLoadGenerator(f"load_generator{shard}@localhost", "pwd", arrival_rate / shards_count,
+                                              crossroad_ids, seed=shard_seed)
+    load_generator.start().result()
+    timer.phase('load_generator')
+    time.sleep(duration)
+    cpu_time = time.process_time() - cpu_started
+
+    load_generator.stop().result()
+    for crossroad in crossroads:
+        crossroad.stop().result()
+    for dispatcher in dispatchers:
+        dispatcher.stop().result()
+    report = transport.stats.report()
+    transport.close()
+    results.put({
+        'shard': shard,
+        'crossroads': len(crossroad_ids),
+        'stats': merged_stats(dispatchers),
+        'transport': report,
+        'forwarded': transport.forwarded,
+        'received': transport.received,
+        # CPU seconds used by the shard process while simulating, close to duration when it is saturated
+        'cpu_time': round(cpu_time, 3),
+        'startup': timer.report(first_dispatch_timestamp(dispatchers)),
+    })
+
+
+def collect_reports(results, workers: List, timeout: float) -> List[dict]:
+    """
+    Reports of all shards sorted by shard, workers are indexed by their shard.
+    Shard which exited without a report or did not report within timeout seconds gets an error report,
+    so the launcher never waits forever for a dead shard.
+    """
+    reports = {}
+    deadline = time.monotonic() + timeout
+    while len(reports) < len(workers) and time.monotonic() < deadline:
+        try:
+            report = results.get(timeout=min(1.0, max(0.0, deadline - time.monotonic())))
+            reports[report['shard']] = report
+        except queue.Empty:
+            if all(worker.exitcode is not None for shard, worker in enumerate(workers) if shard not in reports):
+                break
+    for shard, worker in enumerate(workers):
+        if shard not in reports:
+            reports[shard] = {'shard': shard, 'error': f'no report, exit code {worker.exitcode}' if
+                              worker.exitcode is not None else f'no report within {timeout} seconds'}
+    return [reports[shard] for shard in sorted(reports)]
+
+
+def launch(shards: int, width: int, height: int, duration: float, seed: Optional[int] = None,
+           codec: str = 'binary', info_summary: bool = False, arrival_rate: Optional[float] = None,
+           dispatcher_mode: str = 'single', log_level: str = 'off', log_sample: int = 1,
+           startup_timeout: float = 120.0) -> List[dict]:
+    """
+    Run the map split into shards, one worker process each, returns reports of the shards sorted by shard,
+    failed ones have 'error' instead of the statistics
+    """
+    context = multiprocessing.get_context('spawn')
+    inboxes = [context.Queue() for _ in range(shards)]
+    results = context.Queue()
+    barrier = context.Barrier(shards, timeout=startup_timeout)
+    workers = [context.Process(target=run_shard,
+                               args=(shard, shards, width, height, duration, seed, codec, info_summary,
+                                     arrival_rate, dispatcher_mode, inboxes, barrier, results, log_level,
+                                     log_sample))
+               for shard in range(shards)]
+    for worker in workers:
+        worker.start()
+    reports = collect_reports(results, workers, duration + startup_timeout)
+    for worker, report in zip(workers, reports):
+        if 'error' in report:
+            # failed shard may still be stuck, e.g. stopping its agents
+            worker.terminate()
+        worker.join()
+        if worker.exitcode != 0 and 'error' not in report:
+            report['error'] = f'exit code {worker.exitcode}'
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run crossroads simulation split into shards, one process each')
+    parser.add_argument('--width', type=int, default=6)
+    parser.add_argument('--height', type=int, default=6)
+    parser.add_argument('--shards', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of simulation after all shards started')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--codec', choices=list(CODECS), default='binary')
+    parser.add_argument('--info-summary', action='store_true')
+    parser.add_argument('--dispatchers', choices=['single', 'edge'], default='single',
+                        help='one dispatcher per shard or one per map edge in every shard')
+    parser.add_argument('--arrival-rate', type=float, default=None,
+                        help='cars per second on the whole map sent by Poisson arrival schedule')
+    parser.add_argument('--log-level', choices=list(LOG_LEVELS), default='off', help='logging of agents in shards')
+    parser.add_argument('--log-sample', type=int, default=1,
+                        help='log only every n-th message of each kind below warning level')
+    parser.add_argument('--startup-timeout', type=float, default=120.0,
+                        help='seconds shards may take to start and stop, on top of duration')
+    args = parser.parse_args()
+
+    reports = launch(args.shards, args.width, args.height, args.duration, args.seed, args.codec, args.info_summary,
+                     args.arrival_rate, args.dispatchers, args.log_level, args.log_sample, args.startup_timeout)
+    failed = [report for report in reports if 'error' in report]
+    if failed:
+        for report in failed:
+            print(f"Shard {report['shard']} failed: {report['error']}", file=sys.stderr)
+        sys.exit(1)
+
+    stats = TravelTimeStats()
+    for report in reports:
+        stats.merge(report['stats'])
+        print(f"Shard {report['shard']}: {report['crossroads']} crossroads, "
+              f"{report['transport']['messages']} messages ({report['transport']['messages_per_second']}/s), "
+              f"{report['forwarded']} forwarded, {report['received']} received from other shards")
+        print(f"Shard {report['shard']} startup:", report['startup'])
+    messages = sum(report['transport']['messages'] for report in reports)
+    print(f"Total: {messages} messages, {messages / args.duration:.2f} messages/s")
+    summary = stats.summary()
+    print("Travel time:", {key: value for key, value in summary.items() if not isinstance(value, dict)})
+    print("By exit:", {exit_jid: breakdown['count'] for exit_jid, breakdown in summary['by_exit'].items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,148 @@
+import argparse
 import time
 
-from src.agents.load_generator import LoadGenerator
-from src.graphs.map_generator import MapGenerator
+from src.commons.checkpoint import checkpoint_agents, load_checkpoint, restore_agents, save_checkpoint
+from src.commons.instrumentation import MetricsInstrumentation, get_instrumentation, set_instrumentation
+from src.commons.logs import LOG_LEVELS, configure_logging
+from src.commons.trace import MmapTraceLog, get_trace_log, set_trace_log
+from src.communication.codec import CODECS, set_default_codec
+from src.communication.transport import TRANSPORTS, get_transport, set_transport
+from src.graphs.renderer import GraphRenderer, RateLimitedRenderer
+from src.agents.car_dispatcher import first_dispatch_timestamp, merged_stats
+from src.agents.startup import StartupTimer, process_started_at, start_agents
+from src.agents.load_generator import ArrivalLoadGenerator, LoadGenerator, ReplayLoadGenerator
+from src.graphs.map_generator import DISPATCHER_MODES, MapGenerator
 
 
 def main():
+    timer = StartupTimer(started_at=process_started_at())
+    timer.phase('imports')
+    parser = argparse.ArgumentParser(description='Run crossroads simulation with SPADE agents')
+    parser.add_argument('--transport', choices=list(TRANSPORTS), default='xmpp',
+                        help='xmpp needs prosody container, local runs all agents in-process')
+    parser.add_argument('--codec', choices=list(CODECS), default='json',
+                        help='encoding of sent messages, received ones are decoded by codec from their metadata')
+    parser.add_argument('--info-summary', action='store_true',
+                        help='crossroads send per-lane summaries to aggregators instead of whole queues')
+    parser.add_argument('--aggregators', type=int, default=None,
+                        help='number of aggregators shared by grid regions, by default one per crossroad')
+    parser.add_argument('--stats-output', default=None,
+                        help='csv or jsonl file dispatcher appends travel time statistics to every 10 seconds, '
+                             'with many dispatchers every one gets its own file')
+    parser.add_argument('--dispatchers', choices=DISPATCHER_MODES, default='single',
+                        help='one dispatcher for the map, one per map edge or one per grid region')
+    parser.add_argument('--dispatchers-count', type=int, default=4, help='number of region dispatchers')
+    parser.add_argument('--saturation-flow', type=float, default=0.5, help='cars per green second of a lane')
+    parser.add_argument('--lane-capacity', type=int, default=None,
+                        help='cars a lane takes from neighbour crossroad, unbounded by default')
+    parser.add_argument('--seed', type=int, default=None, help='seed of generated cars')
+    parser.add_argument('--trace', default=None, help='binary trace log to record simulation events to')
+    parser.add_argument('--replay', default=None, help='trace log whose recorded cars are sent instead of random ones')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='replay speedup, 2 halves intervals')
+    parser.add_argument('--arrival-rate', type=float, default=None,
+                        help='cars per second sent in batches by Poisson arrival schedule, for stress tests')
+    parser.add_argument('--metrics', default=None,
+                        help='jsonl file behaviour durations, mailbox depths, message latencies, queue lengths '
+                             'and light switches are appended to')
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help='seconds between metrics dumps')
+    parser.add_argument('--log-level', choices=list(LOG_LEVELS), default='info',
+                        help='debug logs every message of the agents, off disables logging')
+    parser.add_argument('--log-sample', type=int, default=1,
+                        help='log only every n-th message of each kind below warning level')
+    parser.add_argument('--checkpoint', default=None,
+                        help='file state of all agents is saved to when the simulation is stopped')
+    parser.add_argument('--restore', default=None,
+                        help='checkpoint of the same map to start from, e.g. saturated queues, instead of empty map')
+    parser.add_argument('--start-concurrency', type=int, default=64,
+                        help='maximum number of agents starting at the same time')
+    parser.add_argument('--no-register', action='store_true',
+                        help='agents log in to accounts provisioned on the XMPP server beforehand '
+                             'instead of registering them on every run')
+    parser.add_argument('--render-fps', type=float, default=0.0,
+                        help='maximum frequency of rendering grid_graph.png, disabled by default')
+    parser.add_argument('--render-frames', default=None,
+                        help='directory to write numbered frames to instead of overwriting grid_graph.png')
+    parser.add_argument('--render-animation', default=None, help='gif assembled from frames at the end')
+    args = parser.parse_args()
+    configure_logging(args.log_level, args.log_sample)
+    set_transport(TRANSPORTS[args.transport]())
+    set_default_codec(CODECS[args.codec])
+    if args.trace:
+        set_trace_log(MmapTraceLog(args.trace))
+    if args.metrics:
+        set_instrumentation(MetricsInstrumentation(args.metrics, interval=args.metrics_interval))
+
     map_generator = MapGenerator(crossroads_count=9, width=3, height=3)
-    dispatcher, crossroads = map_generator.generate()
-    map_generator.graph.visualize()
-    for crossroad in crossroads:
-        crossroad.start().result()
-    dispatcher.start().result()
-    load_generator = LoadGenerator("load_generator1@localhost", "pwd", 1, 2, [crossroad.crossroad_id for crossroad in crossroads])
-    load_generator.start().result()
+    dispatchers, crossroads = map_generator.generate(info_summary=args.info_summary,
+                                                     aggregators_count=args.aggregators,
+                                                     stats_path=args.stats_output,
+                                                     dispatcher_mode=args.dispatchers,
+                                                     dispatchers_count=args.dispatchers_count,
+                                                     saturation_flow=args.saturation_flow,
+                                                     lane_capacity=args.lane_capacity)
+    if args.render_fps > 0:
+        renderer = RateLimitedRenderer(max_fps=args.render_fps, frames_dir=args.render_frames,
+                                       animation=args.render_animation)
+    else:
+        renderer = GraphRenderer()
+    map_generator.graph.set_renderer(renderer)
+    renderer.mark_dirty(map_generator.graph)
+    if args.replay:
+        load_generator = ReplayLoadGenerator("load_generator1@localhost", "pwd", args.replay, speed=args.replay_speed)
+    elif args.arrival_rate is not None:
+        load_generator = ArrivalLoadGenerator("load_generator1@localhost", "pwd", args.arrival_rate,
+                                              [crossroad.crossroad_id for crossroad in crossroads], seed=args.seed)
+    else:
+        load_generator = LoadGenerator("load_generator1@localhost", "pwd", 1, 2,
+                                       [crossroad.crossroad_id for crossroad in crossroads], seed=args.seed)
+    # replayed trace is not checkpointed, it is replayed from its start
+    checkpointed_agents = map_generator.aggregators + crossroads + dispatchers + \
+        ([] if args.replay else [load_generator])
+    if args.restore:
+        restored = restore_agents(checkpointed_agents, load_checkpoint(args.restore))
+        print(f"Restored {restored} agents from {args.restore}")
+    timer.phase('map')
+    auto_register = not args.no_register
+    start_agents(map_generator.aggregators, auto_register, args.start_concurrency)
+    timer.phase('aggregators')
+    start_agents(crossroads, auto_register, args.start_concurrency)
+    timer.phase('crossroads')
+    start_agents(dispatchers, auto_register, args.start_concurrency)
+    timer.phase('dispatchers')
+    load_generator.start(auto_register=auto_register).result()
+    timer.phase('load_generator')
+    print(f"Started {len(map_generator.aggregators) + len(crossroads) + len(dispatchers) + 1} agents "
+          f"in {timer.elapsed:.2f}s")
+
+    def stop_agents():
+        stopping = [load_generator.stop()]
+        stopping.extend(crossroad.stop() for crossroad in crossroads)
+        stopping.extend(dispatcher.stop() for dispatcher in dispatchers)
+        stopping.extend(aggregator.stop() for aggregator in map_generator.aggregators)
+        return stopping
 
+    stopping = None
     while load_generator.is_alive():
         try:
             time.sleep(1)
         except KeyboardInterrupt:
-            for crossroad in crossroads:
-                crossroad.stop()
-                dispatcher.stop()
+            stopping = stop_agents()
             break
+    if args.checkpoint:
+        # state is taken once behaviours stopped changing it, also when the load generator finished on its own,
+        # cars in messages on the way are lost
+        for future in stopping if stopping is not None else stop_agents():
+            future.result()
+        size = save_checkpoint(args.checkpoint, checkpoint_agents(checkpointed_agents))
+        print(f"Saved checkpoint of {len(checkpointed_agents)} agents to {args.checkpoint} ({size} bytes)")
+    renderer.close()
+    get_trace_log().close()
+    get_instrumentation().close()
     print("Agents finished")
+    summary = merged_stats(dispatchers).summary()
+    print("Travel time:", {key: value for key, value in summary.items() if not isinstance(value, dict)})
+    print(f"Transport {args.transport}:", get_transport().stats.report())
+    print("Startup:", timer.report(first_dispatch_timestamp(dispatchers)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+import heapq
+import itertools
+from typing import Callable, List, Tuple
+
+
+class VirtualClock:
+    """
+    Simulation time source.
+    Callable like time.time, so it can be passed wherever the agents expect a clock.
+    Time only moves forward when EventScheduler advances it.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def __call__(self) -> float:
+        return self._now
+
+    @property
+    def now(self) -> float:
+        return self._now
+
+    def advance_to(self, timestamp: float):
+        assert timestamp >= self._now, f'Clock cannot go back from {self._now} to {timestamp}'
+        self._now = timestamp
+
+
+class ScheduledEvent:
+    """
+    Handle of an event put into EventScheduler, can be cancelled before it runs
+    """
+    __slots__ = ('timestamp', 'callback', 'args', 'cancelled')
+
+    def __init__(self, timestamp: float, callback: Callable, args: Tuple = ()):
+        self.timestamp = timestamp
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventScheduler:
+    """
+    Priority queue of events ordered by virtual timestamp.
+    Events scheduled for the same timestamp are run in order of scheduling.
+    Cancelled events stay in the heap and are skipped when popped.
+    """
+
+    def __init__(self, clock: VirtualClock = None):
+        self.clock = clock or VirtualClock()
+        self._queue: List[Tuple[float, int, ScheduledEvent]] = []
+        self._sequence = itertools.count()
+        self.processed_events = 0
+
+    def __getstate__(self):
+        # sequence continues from its next number, itertools.count is not picklable on newer Pythons
+        state = self.__dict__.copy()
+        state['_sequence'] = next(self._sequence)
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._sequence = itertools.count(state['_sequence'])
+
+    def call_later(self, delay: float, callback: Callable, *args) -> ScheduledEvent:
+        event = ScheduledEvent(self.clock._now + delay, callback, args)
+        heapq.heappush(self._queue, (event.timestamp, next(self._sequence), event))
+        return event
+
+    def call_at(self, timestamp: float, callback: Callable, *args) -> ScheduledEvent:
+        event = ScheduledEvent(max(timestamp, self.clock._now), callback, args)
+        heapq.heappush(self._queue, (event.timestamp, next(self._sequence), event))
+        return event
+
+    def next_timestamp(self) -> float:
+        return self._queue[0][0] if self._queue else float('inf')
+
+    def run_until(self, end_time: float):
+        """
+        Process all events scheduled before end_time, then move the clock to end_time
+        """
+        queue = self._queue
+        clock = self.clock
+        heappop = heapq.heappop
+        while queue and queue[0][0] <= end_time:
+            timestamp, _, event = heappop(queue)
+            if event.cancelled:
+                continue
+            # heap order keeps timestamps from going back, so the clock is moved without advance_to checks
+            clock._now = timestamp
+            event.callback(*event.args)
+            self.processed_events += 1
+        clock.advance_to(max(end_time, clock.now))
+
+    def __len__(self):
+        return len(self._queue)
@@ -0,0 +1,552 @@
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.commons.arrivals import ArrivalGenerator, SinusoidalProfile
+from src.commons.checkpoint import load_checkpoint, save_checkpoint
+from src.commons.streaming_stats import TravelTimeStats
+from src.commons.trace import MmapTraceLog, TraceLog, read_injections
+from src.entity.LightState import LightState, STATE_SCHEMES, DEFAULT_NEXT_STATE
+from src.entity.algorithms import Algorithm, AverageWait, LargestFirst, WeightedSum
+from src.entity.batch_algorithms import BatchController, STATES, lane_stats
+from src.entity.car import Car, Direction
+from src.entity.discharge import DischargeModel
+from src.entity.lane_queue import LaneQueue
+from src.entity.lane_summary import LaneSummary
+from src.entity.status_reporting import StatusReporter, lane_levels
+from src.graphs.grid import grid_layout, grid_neighbors
+from src.graphs.routing import OriginDestinationDemand, Router
+from src.simulation.clock import EventScheduler, VirtualClock
+
+
+LANES = Direction.as_list()
+ALGORITHMS = {algorithm.__name__: algorithm for algorithm in (LargestFirst, AverageWait, WeightedSum)}
+
+
+class HeadlessDispatcher:
+    """
+    Counterpart of CarDispatcher.DispatchCar.
+    Sets dispatch timestamp for received cars as they arrive, like the agent draining its mailbox,
+    dispatch_interval > 0 emulates a sink taking one batch per interval.
+    """
+
+    def __init__(self, simulation: 'HeadlessSimulation', dispatch_interval: float = 0.0):
+        self.simulation = simulation
+        self.dispatch_interval = dispatch_interval
+        self.stats = TravelTimeStats(clock=simulation.clock)
+        self._next_free_ts = 0.0
+
+    def receive_cars(self, cars: List[Car], sender: Optional[int]):
+        dispatch_ts = max(self.simulation.clock.now, self._next_free_ts)
+        self._next_free_ts = dispatch_ts + self.dispatch_interval
+        self.simulation.scheduler.call_at(dispatch_ts, self._dispatch, cars, sender)
+
+    def _dispatch(self, cars: List[Car], sender: Optional[int]):
+        for car in cars:
+            car.dispatch_timestamp = self.simulation.clock.now
+            self.stats.record(car, exit_crossroad=sender)
+
+
+class HeadlessAggregator:
+    """
+    Counterpart of TrafficInfoAggregator.ProcessCrossroadsInfo.
+    Recommends state as soon as info arrives and replies after reply_delay.
+    """
+
+    def __init__(self, simulation: 'HeadlessSimulation', algorithm: Algorithm, reply_delay: float = 0.0):
+        self.simulation = simulation
+        self.algorithm = algorithm
+        self.reply_delay = reply_delay
+
+    def receive_info(self, crossroad: 'HeadlessCrossroad', lines: Dict[str, LaneSummary], current_state: str):
+        recommended_state = self.algorithm.recommend_state(lines=lines, current_state=current_state)
+        self.simulation.send(self.reply_delay, crossroad.receive_recommendation, recommended_state)
+
+
+class HeadlessBatchAggregator:
+    """
+    Single aggregator for the whole map in batched controller mode.
+    Reports arriving at the same moment are decided together in one BatchController pass.
+    """
+
+    def __init__(self, simulation: 'HeadlessSimulation', controller: BatchController, reply_delay: float = 0.0):
+        self.simulation = simulation
+        self.controller = controller
+        self.reply_delay = reply_delay
+        self._crossroads: List['HeadlessCrossroad'] = []
+        self._indices: Dict[int, int] = {}
+        self._tick = None
+
+    def register(self, crossroad: 'HeadlessCrossroad'):
+        self._indices[crossroad.crossroad_id] = len(self._crossroads)
+        self._crossroads.append(crossroad)
+
+    def receive_info(self, crossroad: 'HeadlessCrossroad', lines: Dict[str, LaneSummary], current_state: str):
+        counts, ts_sums = lane_stats(lines)
+        self.controller.update(self._indices[crossroad.crossroad_id], counts, ts_sums, current_state)
+        if self._tick is None:
+            self._tick = self.simulation.scheduler.call_later(0.0, self.tick)
+
+    def tick(self):
+        self._tick = None
+        indices, states = self.controller.recommend()
+        for index, state in zip(indices, states):
+            self.simulation.send(self.reply_delay, self._crossroads[index].receive_recommendation, STATES[state])
+
+
+class HeadlessCrossroad:
+    """
+    Counterpart of CrossroadHandler driven by EventScheduler instead of SPADE behaviours.
+    Keeps the same queues, light states and timings:
+    MoveCars every move_period discharging lanes by discharge_model, SendWaitingInfo when status_reporter finds
+    report due,
+    at least every update_status_time seconds,
+    lights switch on recommendation or to the default state after light_timeout without one.
+    """
+
+    def __init__(self, simulation: 'HeadlessSimulation',
+                 crossroad_id: int,
+                 connected_crossroads: Dict[str, Optional[int]],
+                 aggregator,
+                 update_status_time: float = 10.0,
+                 move_period: float = 2.0,
+                 light_timeout: float = 30.0,
+                 status_reporter: Optional[StatusReporter] = None,
+                 discharge_model: Optional[DischargeModel] = None):
+        self.simulation = simulation
+        self.crossroad_id = crossroad_id
+        self.connected_crossroads = connected_crossroads
+        self.reversed_connected_crossroads = {crossroad: direction
+                                              for direction, crossroad in connected_crossroads.items()
+                                              if crossroad is not None}
+        self.aggregator = aggregator
+        self.update_status_time = update_status_time
+        self.status_reporter = status_reporter or StatusReporter(heartbeat=update_status_time)
+        self.move_period = move_period
+        self.discharge_model = discharge_model or DischargeModel()
+        self.credits = self.discharge_model.initial_credits(connected_crossroads)
+        self.light_timeout = light_timeout
+        self.lights_state: str = LightState.EW
+        self.state_scheme: Dict[str, set] = STATE_SCHEMES[LightState.EW]
+        self.line_queues: Dict[str, LaneQueue] = {direction: LaneQueue() for direction in Direction.as_list()}
+        self._light_timer = None
+        self._light_deadline = 0.0
+        self._report_check = None
+
+    def start(self):
+        scheduler = self.simulation.scheduler
+        self._change_state(LightState.EW)
+        scheduler.call_later(0.0, self.move_cars)
+        self._schedule_report_check(self.simulation.clock.now)
+
+    def move_cars(self):
+        departing_cars: Dict[Optional[int], List[Car]] = {}
+        freed_places: Dict[str, int] = {}
+        allowances = self.discharge_model.allowances(self.state_scheme, self.move_period)
+        trace = self.simulation.trace
+        # unbounded lanes never run out of credits, their checks are skipped
+        bounded = self.discharge_model.lane_capacity is not None
+        for queue_direction, allowed_directions in self.state_scheme.items():
+            line_queue = self.line_queues[queue_direction]
+            for _ in range(allowances[queue_direction]):
+                if not line_queue:
+                    break
+                if not line_queue[0].remaining_hops:
+                    # agent's MoveCars fails on 'Car lost' assertion here
+                    self.simulation.lost_cars += 1
+                    line_queue.popleft()
+                    continue
+                direction = line_queue[0].direction
+                if direction not in allowed_directions:
+                    break
+                credits = self.credits[direction] if bounded else None
+                if credits is not None:
+                    if credits <= 0:
+                        self.simulation.blocked_moves += 1
+                        break
+                    self.credits[direction] = credits - 1
+                car_to_move = line_queue.popleft()
+                car_to_move.advance()
+                freed_places[queue_direction] = freed_places.get(queue_direction, 0) + 1
+                if trace.enabled:
+                    trace.car_hop(self.simulation.clock.now, self.crossroad_id, car_to_move.id, direction)
+                departing_cars.setdefault(self.connected_crossroads[direction], []).append(car_to_move)
+        for destination, cars in departing_cars.items():
+            self.simulation.move_cars(cars, self.crossroad_id, destination)
+        if bounded:
+            self._return_credits(freed_places)
+        if departing_cars:
+            self._status_changed()
+        self.simulation.scheduler.call_later(self.move_period, self.move_cars)
+
+    def _return_credits(self, freed_places: Dict[str, int]):
+        for lane, count in freed_places.items():
+            upstream = self.connected_crossroads[lane]
+            if upstream is not None:
+                self.simulation.send(0.0, self.simulation.crossroads[upstream].receive_credits, self.crossroad_id,
+                                     count)
+
+    def receive_credits(self, sender: int, count: int):
+        direction = self.reversed_connected_crossroads[sender]
+        self.credits[direction] = min(self.credits[direction] + count, self.discharge_model.lane_capacity)
+
+    def receive_cars(self, cars: List[Car], sender: Optional[int]):
+        if sender in self.reversed_connected_crossroads:
+            self.line_queues[self.reversed_connected_crossroads[sender]].extend(cars)
+        else:
+            for car in cars:
+                self.line_queues[car.starting_queue_direction].append(car)
+        self._status_changed()
+
+    def _schedule_report_check(self, timestamp: float):
+        if self._report_check is not None:
+            self._report_check.cancel()
+        self._report_check = self.simulation.scheduler.call_at(timestamp, self.send_waiting_info)
+
+    def _status_changed(self):
+        """
+        Check report as soon as status_reporter allows, unless the check is already scheduled earlier
+        """
+        check_ts = self.status_reporter.change_ts(self.simulation.clock.now)
+        if self._report_check is None or self._report_check.timestamp > check_ts:
+            self._schedule_report_check(check_ts)
+
+    def send_waiting_info(self):
+        self._report_check = None
+        now = self.simulation.clock.now
+        counts, oldest_ages = lane_levels(self.line_queues, LANES, now)
+        if self.status_reporter.report_if_due(counts, oldest_ages, now):
+            lines = {line: cars.snapshot(now) for line, cars in self.line_queues.items()}
+            if self.simulation.trace.enabled:
+                self.simulation.trace.lane_snapshot(now, self.crossroad_id, dict(zip(LANES, counts)))
+            self.simulation.send(0.0, self.aggregator.receive_info, self, lines, self.lights_state)
+        self._schedule_report_check(self.status_reporter.next_check_ts(counts, oldest_ages, now))
+
+    def receive_recommendation(self, recommended_state: str):
+        if self.simulation.trace.enabled:
+            self.simulation.trace.recommendation(self.simulation.clock.now, self.crossroad_id, recommended_state)
+        if recommended_state != self.lights_state:
+            self._change_state(recommended_state)
+        else:
+            self._restart_light_timer()
+
+    def _change_state(self, state: str):
+        self.lights_state = state
+        self.state_scheme = STATE_SCHEMES[state]
+        self.simulation.light_changes += 1
+        if self.simulation.trace.enabled:
+            self.simulation.trace.transition(self.simulation.clock.now, self.crossroad_id, state)
+        self._restart_light_timer()
+
+    def _restart_light_timer(self):
+        """
+        Move the light deadline, pending timer is not cancelled but checks the deadline when it fires,
+        so recommendations arriving every few seconds do not push a new event each
+        """
+        self._light_deadline = self.simulation.clock.now + self.light_timeout
+        if self._light_timer is None:
+            self._light_timer = self.simulation.scheduler.call_at(self._light_deadline, self._on_light_timeout)
+
+    def _on_light_timeout(self):
+        if self.simulation.clock.now < self._light_deadline:
+            self._light_timer = self.simulation.scheduler.call_at(self._light_deadline, self._on_light_timeout)
+            return
+        self._light_timer = None
+        self._change_state(DEFAULT_NEXT_STATE[self.lights_state])
+
+
+class HeadlessLoadGenerator:
+    """
+    Counterpart of LoadGenerator.GenerateCar.
+    Cars are injected with sine wave frequency between min and max interval.
+    Origin and destination are drawn from demand, cars take the shortest route of simulation router.
+    """
+
+    def __init__(self, simulation: 'HeadlessSimulation', min_interval: float, max_interval: float,
+                 available_crossroads_ids: List[int], demand: Optional[OriginDestinationDemand] = None):
+        self.simulation = simulation
+        self.available_crossroads_ids = available_crossroads_ids
+        self.demand = demand or OriginDestinationDemand.uniform(simulation.router, available_crossroads_ids)
+        self.generated_cars = 0
+        self.sample = 0
+        self.frequency = ((max_interval + min_interval) / 2) + \
+                         (((max_interval - min_interval) / 2) * np.sin(2 * np.linspace(0, 2 * np.pi, 20)))
+
+    def start(self):
+        self.simulation.scheduler.call_later(0.0, self.generate_car)
+
+    def generate_car(self):
+        router = self.simulation.router
+        crossroad_id, destination = self.demand.sample_one(self.simulation.random)
+        self.generated_cars += 1
+        car = Car(
+            id=self.generated_cars,
+            starting_crossroad_id=crossroad_id,
+            starting_queue_direction=router.entry_side(crossroad_id),
+            create_timestamp=self.simulation.clock.now,
+            path=router.route(crossroad_id, destination)
+        )
+        if self.simulation.trace.enabled:
+            self.simulation.trace.car_injected(self.simulation.clock.now, crossroad_id, car)
+        self.simulation.send(0.0, self.simulation.crossroads[crossroad_id].receive_cars, [car], None)
+        self.simulation.scheduler.call_later(float(self.frequency[self.sample]), self.generate_car)
+        self.sample = (self.sample + 1) % len(self.frequency)
+
+
+class HeadlessArrivalLoadGenerator:
+    """
+    Counterpart of ArrivalLoadGenerator.SendArrivals.
+    Every time_slice cars due by the arrival schedule are injected, one batch per crossroad.
+    """
+
+    def __init__(self, simulation: 'HeadlessSimulation', arrivals: ArrivalGenerator, time_slice: float = 0.1):
+        self.simulation = simulation
+        self.arrivals = arrivals
+        self.time_slice = time_slice
+        self._start_time = None
+
+    @property
+    def generated_cars(self) -> int:
+        return self.arrivals.generated_cars
+
+    def start(self):
+        self._start_time = self.simulation.clock.now
+        self.simulation.scheduler.call_later(self.time_slice, self.inject_cars)
+
+    def inject_cars(self):
+        now = self.simulation.clock.now
+        for crossroad_id, cars in self.arrivals.cars_until(now - self._start_time, self._start_time).items():
+            if self.simulation.trace.enabled:
+                for car in cars:
+                    self.simulation.trace.car_injected(car.create_timestamp, crossroad_id, car)
+            self.simulation.send(0.0, self.simulation.crossroads[crossroad_id].receive_cars, cars, None)
+        self.simulation.scheduler.call_later(self.time_slice, self.inject_cars)
+
+
+class HeadlessReplayLoadGenerator:
+    """
+    Load generator feeding arrival stream recorded in a trace log back into the crossroads.
+    Cars are injected to the recorded crossroads keeping recorded intervals, first car at the simulation start,
+    so traces recorded by agents in real time can be replayed too.
+    """
+
+    def __init__(self, simulation: 'HeadlessSimulation', trace_path: str):
+        self.simulation = simulation
+        self.generated_cars = 0
+        self._injections = read_injections(trace_path)
+        self._time_offset = None
+
+    def start(self):
+        self._schedule_next()
+
+    def _schedule_next(self):
+        injection = next(self._injections, None)
+        if injection is None:
+            return
+        timestamp, crossroad_id, car = injection
+        if self._time_offset is None:
+            self._time_offset = self.simulation.clock.now - timestamp
+        self.simulation.scheduler.call_at(timestamp + self._time_offset, self.inject_car, crossroad_id, car)
+
+    def inject_car(self, crossroad_id: int, car: Car):
+        self.generated_cars += 1
+        self.simulation.trace.car_injected(self.simulation.clock.now, crossroad_id, car)
+        self.simulation.send(0.0, self.simulation.crossroads[crossroad_id].receive_cars, [car], None)
+        self._schedule_next()
+
+
+class HeadlessSimulation:
+    """
+    Discrete-event simulation of the whole map in virtual time.
+    Reuses crossroad queues, light states, Car and Algorithm classes without SPADE agents and XMPP server,
+    so a simulated day of a small grid takes seconds.
+    With controller='batch' one BatchController decides for all crossroads instead of aggregator per crossroad,
+    algorithm_factory has to be one of the Algorithm classes then.
+    Events are recorded to trace log, with replay path cars are injected from a recorded trace
+    instead of being generated, so algorithms can be compared on identical traffic.
+    With arrival_rate cars arrive by non-homogeneous Poisson schedule instead of sine wave intervals.
+    Lanes discharge saturation_flow cars per green second and hold lane_capacity cars, see DischargeModel.
+    Whole simulation, with pending events, can be saved by checkpoint and continued, or forked with another
+    algorithm, from the file by restore, so runs can start from saturated queues without a warm-up.
+    """
+
+    def __init__(self, width: int = 3, height: int = 3, crossroads_count: Optional[int] = None,
+                 algorithm_factory: Callable[..., Algorithm] = AverageWait,
+                 algorithm_timeout: float = 10.0,
+                 min_interval: float = 1.0, max_interval: float = 2.0,
+                 update_status_time: float = 10.0,
+                 message_latency: float = 0.0,
+                 controller: str = 'scalar',
+                 seed: Optional[int] = None,
+                 trace: Optional[TraceLog] = None,
+                 replay: Optional[str] = None,
+                 arrival_rate: Optional[float] = None,
+                 arrival_amplitude: float = 0.5,
+                 arrival_period: float = 60.0,
+                 saturation_flow: float = 0.5,
+                 lane_capacity: Optional[int] = None):
+        self.clock = VirtualClock()
+        self.scheduler = EventScheduler(self.clock)
+        self.random = random.Random(seed)
+        self.message_latency = message_latency
+        self.trace = trace or TraceLog()
+        self.lost_cars = 0
+        self.blocked_moves = 0
+        self.light_changes = 0
+
+        crossroads_count = width * height if crossroads_count is None else crossroads_count
+        self.router = Router(grid_layout(width, height, crossroads_count)[1])
+        self.dispatcher = HeadlessDispatcher(self)
+        self.crossroads: Dict[int, HeadlessCrossroad] = {}
+        self.batch_aggregator = None
+        if controller == 'batch':
+            self.batch_aggregator = HeadlessBatchAggregator(
+                self, BatchController(crossroads_count, algorithm=algorithm_factory,
+                                      timeout=algorithm_timeout, clock=self.clock))
+        for crossroad_id, neighbors in grid_neighbors(width, height, crossroads_count).items():
+            if self.batch_aggregator is not None:
+                aggregator = self.batch_aggregator
+            else:
+                aggregator = HeadlessAggregator(self, algorithm_factory(timeout=algorithm_timeout,
+                                                                        clock=self.clock,
+                                                                        deadline_clock=self.clock))
+            self.crossroads[crossroad_id] = HeadlessCrossroad(
+                self, crossroad_id, neighbors, aggregator, update_status_time=update_status_time,
+                discharge_model=DischargeModel(saturation_flow=saturation_flow, lane_capacity=lane_capacity))
+            if self.batch_aggregator is not None:
+                self.batch_aggregator.register(self.crossroads[crossroad_id])
+        if replay is not None:
+            self.load_generator = HeadlessReplayLoadGenerator(self, replay)
+        elif arrival_rate is not None:
+            demand = OriginDestinationDemand.uniform(self.router)
+            self.load_generator = HeadlessArrivalLoadGenerator(self, ArrivalGenerator(
+                self.router, demand, arrival_rate, seed=seed,
+                profile=SinusoidalProfile(amplitude=arrival_amplitude, period=arrival_period)))
+        else:
+            self.load_generator = HeadlessLoadGenerator(self, min_interval, max_interval, list(self.crossroads))
+        self._started = False
+
+    def send(self, delay: float, handler: Callable, *args):
+        """
+        Deliver message to handler after delay plus message latency
+        """
+        self.scheduler.call_later(delay + self.message_latency, handler, *args)
+
+    def move_cars(self, cars: List[Car], sender: int, destination: Optional[int]):
+        """
+        Hand off batch of cars leaving sender towards one neighbour, or the dispatcher when destination is None
+        """
+        if destination is None:
+            self.send(0.0, self.dispatcher.receive_cars, cars, sender)
+        else:
+            self.send(0.0, self.crossroads[destination].receive_cars, cars, sender)
+
+    def run(self, duration: float) -> 'HeadlessSimulation':
+        if not self._started:
+            for crossroad in self.crossroads.values():
+                crossroad.start()
+            self.load_generator.start()
+            self._started = True
+        self.scheduler.run_until(self.clock.now + duration)
+        return self
+
+    def __getstate__(self):
+        assert not isinstance(self.load_generator, HeadlessReplayLoadGenerator), 'Replayed runs are not checkpointed'
+        state = self.__dict__.copy()
+        # trace log is a file of the run, restored simulation records to its own one
+        state['trace'] = TraceLog()
+        return state
+
+    def checkpoint(self, path: str) -> int:
+        """
+        Save the whole simulation to path, returns size of the file in bytes
+        """
+        return save_checkpoint(path, self)
+
+    @classmethod
+    def restore(cls, path: str, trace: Optional[TraceLog] = None) -> 'HeadlessSimulation':
+        simulation = load_checkpoint(path)
+        assert isinstance(simulation, cls), f'{path} is not a checkpoint of headless simulation'
+        simulation.trace = trace or TraceLog()
+        return simulation
+
+    def use_algorithm(self, algorithm_factory: Callable[..., Algorithm], algorithm_timeout: float = 10.0):
+        """
+        Let aggregators recommend with another algorithm from now on, starvation timers are kept
+        """
+        assert self.batch_aggregator is None, 'Algorithm of batched controller is set when it is created'
+        for crossroad in self.crossroads.values():
+            algorithm = algorithm_factory(timeout=algorithm_timeout, clock=self.clock, deadline_clock=self.clock)
+            algorithm.restore_state(crossroad.aggregator.algorithm.checkpoint_state())
+            crossroad.aggregator.algorithm = algorithm
+
+    def summary(self) -> dict:
+        travel_time = self.dispatcher.stats.travel_time
+        return {
+            'simulated_time': self.clock.now,
+            'generated_cars': self.load_generator.generated_cars,
+            'dispatched_cars': travel_time.count,
+            'lost_cars': self.lost_cars,
+            'waiting_cars': sum(len(queue) for crossroad in self.crossroads.values()
+                                for queue in crossroad.line_queues.values()),
+            'light_changes': self.light_changes,
+            'blocked_moves': self.blocked_moves,
+            'mean_travel_time': travel_time.mean,
+            'p95_travel_time': travel_time.quantile(0.95),
+            'processed_events': self.scheduler.processed_events,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run crossroads simulation in virtual time')
+    parser.add_argument('--width', type=int, default=3)
+    parser.add_argument('--height', type=int, default=3)
+    parser.add_argument('--duration', type=float, default=24 * 60 * 60, help='simulated seconds')
+    parser.add_argument('--controller', choices=['scalar', 'batch'], default='scalar')
+    parser.add_argument('--algorithm', choices=list(ALGORITHMS), default=None,
+                        help=f'{AverageWait.__name__} by default, with --restore the checkpointed one, '
+                             f'changing it on restore needs scalar controller')
+    parser.add_argument('--saturation-flow', type=float, default=0.5, help='cars per green second of a lane')
+    parser.add_argument('--lane-capacity', type=int, default=None,
+                        help='cars a lane takes from neighbour crossroad, unbounded by default')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--trace', default=None, help='binary trace log to record events to')
+    parser.add_argument('--replay', default=None, help='trace log whose recorded cars are injected')
+    parser.add_argument('--arrival-rate', type=float, default=None,
+                        help='cars per second arriving by Poisson schedule instead of sine wave intervals')
+    parser.add_argument('--checkpoint', default=None, help='file the simulation is saved to at the end')
+    parser.add_argument('--restore', default=None,
+                        help='checkpoint to continue for duration seconds, map and traffic options are taken from it')
+    args = parser.parse_args()
+
+    trace = MmapTraceLog(args.trace) if args.trace else None
+    start = time.perf_counter()
+    if args.restore:
+        simulation = HeadlessSimulation.restore(args.restore, trace=trace)
+        if args.algorithm is not None:
+            if simulation.batch_aggregator is not None:
+                parser.error(f'{args.restore} was checkpointed with batch controller, '
+                             f'its algorithm cannot be changed with --algorithm')
+            simulation.use_algorithm(ALGORITHMS[args.algorithm])
+    else:
+        simulation = HeadlessSimulation(width=args.width, height=args.height, controller=args.controller,
+                                        algorithm_factory=ALGORITHMS[args.algorithm or AverageWait.__name__],
+                                        seed=args.seed, trace=trace, replay=args.replay,
+                                        arrival_rate=args.arrival_rate,
+                                        saturation_flow=args.saturation_flow,
+                                        lane_capacity=args.lane_capacity)
+    simulation.run(args.duration)
+    elapsed = time.perf_counter() - start
+    simulation.trace.close()
+    if args.checkpoint:
+        print(f'checkpoint: {args.checkpoint} ({simulation.checkpoint(args.checkpoint)} bytes)')
+    for key, value in simulation.summary().items():
+        print(f'{key}: {value}')
+    print(f'wall time: {elapsed:.2f}s')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from aioxmpp import JID
+
+from src.agents.crossroad_handler import CrossroadHandler
+from src.entity.discharge import DischargeModel
+
+
+def make_crossroad() -> CrossroadHandler:
+    crossroad = CrossroadHandler("crossroad1@localhost", "pwd", 1, discharge_model=DischargeModel(0.5, 4),
+                                 n_crossroad_jid="dispatcher@localhost", s_crossroad_jid="crossroad2@localhost",
+                                 e_crossroad_jid="dispatcher@localhost", w_crossroad_jid="dispatcher@localhost")
+    crossroad.set("reversed_connected_crossroads",
+                  dict((reversed(item) for item in crossroad.connected_crossroads.items())))
+    crossroad.credits = {'N': 0, 'S': 1, 'E': 0, 'W': 0}
+    return crossroad
+
+
+class TestLaneCredits:
+    def test_credits_should_be_returned_to_lane_of_sender_with_resource(self):
+        crossroad = make_crossroad()
+        crossroad.add_credits(JID.fromstr("crossroad2@localhost/resource"), 2)
+        assert crossroad.credits['S'] == 3
+        crossroad.add_credits(JID.fromstr("crossroad2@localhost"), 5)
+        assert crossroad.credits['S'] == 4
+
+    def test_credits_from_unknown_sender_should_be_ignored(self):
+        crossroad = make_crossroad()
+        crossroad.add_credits(JID.fromstr("crossroad9@localhost"), 2)
+        crossroad.add_credits(None, 2)
+        assert crossroad.credits == {'N': 0, 'S': 1, 'E': 0, 'W': 0}
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.agents.startup import StartupTimer, process_started_at, start_agents
+
+
+class StartsCounter:
+    def __init__(self):
+        self.starting = 0
+        self.max_starting = 0
+        self.lock = threading.Lock()
+
+
+class SlowAgent:
+    def __init__(self, executor: ThreadPoolExecutor, counter: StartsCounter):
+        self.executor = executor
+        self.counter = counter
+        self.auto_register = None
+
+    def _start(self):
+        with self.counter.lock:
+            self.counter.starting += 1
+            self.counter.max_starting = max(self.counter.max_starting, self.counter.starting)
+        time.sleep(0.01)
+        with self.counter.lock:
+            self.counter.starting -= 1
+
+    def start(self, auto_register: bool = True):
+        self.auto_register = auto_register
+        return self.executor.submit(self._start)
+
+
+class TestStartAgents:
+    def test_starts_should_not_exceed_concurrency(self):
+        counter = StartsCounter()
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            agents = [SlowAgent(executor, counter) for _ in range(40)]
+            assert start_agents(agents, auto_register=False, concurrency=4) == 40
+        assert 1 <= counter.max_starting <= 4
+        assert counter.starting == 0
+        assert all(agent.auto_register is False for agent in agents)
+
+    def test_agents_modules_should_not_import_visualization(self):
+        code = 'import sys, src.main; print("matplotlib" in sys.modules or "netgraph" in sys.modules)'
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=root).stdout
+        assert output.strip() == 'False'
+
+
+class TestStartupTimer:
+    def test_phases_should_sum_up_to_total(self):
+        now = [10.0]
+        timer = StartupTimer(started_at=8.0, clock=lambda: now[0])
+        timer.phase('imports')
+        now[0] = 13.5
+        timer.phase('crossroads')
+        assert timer.report(first_car_timestamp=20.0) == {'imports': 2.0, 'crossroads': 3.5, 'total': 5.5,
+                                                          'time_to_first_car': 12.0}
+
+    def test_process_start_should_precede_now(self):
+        started_at = process_started_at()
+        if started_at is None:
+            pytest.skip('process start time is not known on this platform')
+        assert started_at <= time.time()
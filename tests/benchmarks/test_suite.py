@@ -0,0 +1,34 @@
+import json
+import sys
+
+import pytest
+
+from benchmarks.suite import compare, main
+
+
+def save_results(path, results):
+    with open(path, 'w') as file:
+        json.dump({'results': results}, file)
+
+
+class TestCompare:
+    def test_should_return_only_benchmarks_slower_over_threshold(self):
+        baseline = {'fast': 1.0, 'slow': 1.0, 'faster': 1.0, 'removed': 1.0}
+        current = {'fast': 1.05, 'slow': 1.2, 'faster': 0.5, 'added': 1.0}
+        assert compare(baseline, current, threshold=0.1) == ['slow']
+
+    def test_regression_should_exit_with_1(self, tmp_path, monkeypatch):
+        baseline, current = str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json')
+        save_results(baseline, {'car.to_json': 1e-6})
+        save_results(current, {'car.to_json': 2e-6})
+        monkeypatch.setattr(sys, 'argv', ['suite', 'compare', baseline, current])
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+        assert exit_info.value.code == 1
+
+    def test_results_within_threshold_should_pass(self, tmp_path, monkeypatch):
+        baseline, current = str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json')
+        save_results(baseline, {'car.to_json': 1e-6})
+        save_results(current, {'car.to_json': 1.05e-6})
+        monkeypatch.setattr(sys, 'argv', ['suite', 'compare', baseline, current, '--threshold', '0.1'])
+        main()
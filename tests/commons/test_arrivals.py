@@ -0,0 +1,58 @@
+import numpy as np
+
+from src.commons.arrivals import ArrivalGenerator, ArrivalSchedule, SinusoidalProfile
+from src.graphs.grid import grid_layout
+from src.graphs.routing import OriginDestinationDemand, Router
+
+
+class TestArrivalSchedule:
+    def test_arrivals_should_follow_entry_rates(self):
+        schedule = ArrivalSchedule(np.array([100.0, 300.0, 0.0]), np.random.default_rng(0))
+        times, entries = schedule.until(50.0)
+        assert np.all(np.diff(times) >= 0) and times[-1] < 50.0
+        counts = np.bincount(entries, minlength=3)
+        assert abs(counts[0] - 5000) < 300 and abs(counts[1] - 15000) < 500 and counts[2] == 0
+        # every arrival is returned once
+        later_times, _ = schedule.until(60.0)
+        assert later_times[0] >= 50.0
+
+    def test_thinning_should_follow_the_profile(self):
+        profile = SinusoidalProfile(amplitude=1.0, period=20.0)
+        times, _ = ArrivalSchedule(np.array([200.0]), np.random.default_rng(0), profile).until(20.0)
+        # rate is above the mean in the first half of the period, expected 4.5 times more arrivals there
+        first_half = np.count_nonzero(times < 10.0)
+        assert first_half > 3.5 * (len(times) - first_half)
+
+
+class TestArrivalGenerator:
+    def test_cars_should_enter_boundary_crossroads_with_routes(self):
+        router = Router(grid_layout(width=3, height=3)[1])
+        demand = OriginDestinationDemand.uniform(router)
+        first = ArrivalGenerator(router, demand, rate=500.0, seed=1).cars_until(1.0, time_offset=100.0)
+        second = ArrivalGenerator(router, demand, rate=500.0, seed=1).cars_until(1.0, time_offset=100.0)
+        cars = [car for crossroad_cars in first.values() for car in crossroad_cars]
+        assert 400 < len(cars) < 600
+        assert sorted(car.id for car in cars) == list(range(1, len(cars) + 1))
+        assert 5 not in first
+        for crossroad_id, crossroad_cars in first.items():
+            for car in crossroad_cars:
+                assert car.starting_crossroad_id == crossroad_id
+                assert car.starting_queue_direction == router.entry_side(crossroad_id)
+                assert 100.0 <= car.create_timestamp < 101.0
+        assert {crossroad_id: [car.to_json() for car in crossroad_cars] for crossroad_id, crossroad_cars in
+                first.items()} == {crossroad_id: [car.to_json() for car in crossroad_cars] for
+                                   crossroad_id, crossroad_cars in second.items()}
+
+    def test_restored_generator_should_continue_arrivals(self):
+        router = Router(grid_layout(width=3, height=3)[1])
+        demand = OriginDestinationDemand.uniform(router)
+        uninterrupted = ArrivalGenerator(router, demand, rate=50.0, seed=2)
+        uninterrupted.cars_until(3.0)
+        expected = uninterrupted.cars_until(6.0)
+        interrupted = ArrivalGenerator(router, demand, rate=50.0, seed=2)
+        interrupted.cars_until(3.0)
+        restored = ArrivalGenerator(router, demand, rate=50.0, seed=7)
+        restored.restore_state(interrupted.checkpoint_state())
+        cars = restored.cars_until(6.0)
+        assert {origin: [car.to_json() for car in origin_cars] for origin, origin_cars in cars.items()} == \
+               {origin: [car.to_json() for car in origin_cars] for origin, origin_cars in expected.items()}
@@ -0,0 +1,44 @@
+import gzip
+
+import pytest
+
+from src.commons.checkpoint import checkpoint_agents, load_checkpoint, restore_agents, save_checkpoint
+from src.entity.LightState import LightState
+from src.entity.car import Car, Direction
+from src.graphs.intersections_state import IntersectionsState
+from src.graphs.map_generator import MapGenerator
+
+
+def generate():
+    map_generator = MapGenerator(crossroads_count=4, width=2, height=2)
+    map_generator.graph = IntersectionsState()
+    return map_generator.generate()
+
+
+class TestAgentsCheckpoint:
+    def test_restored_agents_should_get_queues_lights_and_statistics(self, tmp_path):
+        dispatchers, crossroads = generate()
+        crossroad = crossroads[0]
+        crossroad.line_queues[Direction.N].append(Car(id=1, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+                                                      create_timestamp=90.0, path=[Direction.S]))
+        crossroad.lights_state = LightState.NS
+        dispatchers[0].stats.record(Car(id=2, starting_crossroad_id=1, starting_queue_direction=Direction.S,
+                                        create_timestamp=80.0, path=[], dispatch_timestamp=95.0))
+        path = str(tmp_path / 'agents.ckpt')
+        save_checkpoint(path, checkpoint_agents(crossroads + dispatchers, now=100.0))
+
+        restored_dispatchers, restored_crossroads = generate()
+        assert restore_agents(restored_crossroads + restored_dispatchers, load_checkpoint(path), now=250.0) == 5
+        lane = restored_crossroads[0].line_queues[Direction.N]
+        # the car keeps waiting 10 seconds
+        assert [car.id for car in lane] == [1] and lane.snapshot(250.0).oldest_age == 10.0
+        assert restored_crossroads[0].lights_state == LightState.NS
+        assert restored_crossroads[1].lights_state == LightState.EW
+        assert restored_dispatchers[0].stats.count == 1
+
+    def test_other_files_should_be_rejected(self, tmp_path):
+        path = tmp_path / 'other.gz'
+        with gzip.open(path, 'wb') as file:
+            file.write(b'not a checkpoint')
+        with pytest.raises(AssertionError):
+            load_checkpoint(str(path))
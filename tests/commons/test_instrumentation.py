@@ -0,0 +1,61 @@
+import json
+
+from src.commons.instrumentation import Instrumentation, MetricsInstrumentation, SENT_AT_METADATA_KEY
+from src.communication.lane_credit_protocol import LaneCreditMessage
+
+
+class MoveCars:
+    def __init__(self, mailbox_size: int):
+        self._mailbox_size = mailbox_size
+
+    def mailbox_size(self) -> int:
+        return self._mailbox_size
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestMetricsInstrumentation:
+    def test_runs_and_latencies_should_be_recorded(self, tmp_path):
+        clock = FakeClock()
+        path = tmp_path / 'metrics.jsonl'
+        instrumentation = MetricsInstrumentation(str(path), interval=10.0, clock=clock, perf_clock=clock)
+        msg = LaneCreditMessage(to='crossroad1@localhost', count=1)
+        instrumentation.stamp(msg)
+        # metadata is copied per message, the protocol constant stays unstamped
+        assert LaneCreditMessage(to='crossroad1@localhost', count=1).get_metadata(SENT_AT_METADATA_KEY) is None
+        clock.now += 0.25
+        for depth in (3, 1):
+            with instrumentation.measure(MoveCars(depth), msg):
+                clock.now += 0.5
+        instrumentation.queue_lengths(1, ['N', 'S'], [2, 3])
+        instrumentation.light_switch(1)
+
+        snapshot = instrumentation.snapshot()
+        move_cars = snapshot['behaviours']['MoveCars']
+        assert move_cars['count'] == 2 and abs(move_cars['mean'] - 0.5) < 0.01
+        assert (move_cars['mailbox_depth'], move_cars['max_mailbox_depth']) == (1, 3)
+        assert snapshot['latency']['lane_credit']['count'] == 2
+        assert snapshot['latency']['lane_credit']['max'] == 0.25 + 0.5
+        assert snapshot['waiting_cars'] == 5 and snapshot['light_switches'] == 1
+        assert not path.exists()
+
+        clock.now += 10.0
+        with instrumentation.measure(MoveCars(0)):
+            pass
+        instrumentation.close()
+        dumps = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(dumps) == 2 and dumps[-1]['behaviours']['MoveCars']['count'] == 3
+
+    def test_disabled_instrumentation_should_not_stamp(self):
+        msg = LaneCreditMessage(to='crossroad1@localhost', count=1)
+        instrumentation = Instrumentation()
+        instrumentation.stamp(msg)
+        with instrumentation.measure(MoveCars(0), msg):
+            pass
+        assert msg.get_metadata(SENT_AT_METADATA_KEY) is None and instrumentation.snapshot() == {}
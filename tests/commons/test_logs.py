@@ -0,0 +1,17 @@
+import logging
+
+from src.commons.logs import SamplingFilter
+
+
+def make_record(level: int, lineno: int) -> logging.LogRecord:
+    return logging.LogRecord('src.agents', level, 'crossroad_handler.py', lineno, 'message', None, None)
+
+
+class TestSamplingFilter:
+    def test_every_nth_record_of_each_call_should_pass(self):
+        sampling = SamplingFilter(sample_every=3)
+        passed = [sampling.filter(make_record(logging.DEBUG, 10)) for _ in range(7)]
+        assert passed == [True, False, False, True, False, False, True]
+        # other call site is counted separately, warnings are never dropped
+        assert sampling.filter(make_record(logging.INFO, 20))
+        assert all(sampling.filter(make_record(logging.WARNING, 10)) for _ in range(3))
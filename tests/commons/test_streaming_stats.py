@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.commons.streaming_stats import LogHistogram, StatsExporter, TravelTimeStats, WindowedRate
+from src.entity.car import Car, Direction
+
+
+def dispatched_car(origin: int, created: float, dispatched: float) -> Car:
+    return Car(id=origin, starting_crossroad_id=origin, starting_queue_direction=Direction.N,
+               create_timestamp=created, path=[], dispatch_timestamp=dispatched)
+
+
+class TestLogHistogram:
+    def test_quantiles_should_be_within_relative_error(self):
+        values = np.random.default_rng(0).exponential(30.0, 100_000)
+        histogram = LogHistogram(relative_error=0.01)
+        histogram.record_many(values)
+        for q in (0.5, 0.95, 0.99):
+            exact = np.quantile(values, q)
+            assert abs(histogram.quantile(q) - exact) / exact < 0.02
+        assert histogram.count == len(values)
+
+    def test_merged_histogram_should_equal_one_recorded_all_values(self):
+        first, second, both = LogHistogram(), LogHistogram(), LogHistogram()
+        for value in range(1, 100):
+            (first if value % 2 else second).record(value)
+            both.record(value)
+        merged = first.merge(second)
+        assert np.array_equal(merged.counts, both.counts)
+        assert merged.to_dict() == both.to_dict()
+
+
+class TestTravelTimeStats:
+    def test_throughput_should_only_count_last_window(self):
+        rate = WindowedRate(window=60.0)
+        rate.record(10.0, 5)
+        rate.record(65.0, 3)
+        assert rate.total(65.0) == 8
+        assert rate.total(100.0) == 3
+
+    def test_summary_should_break_down_by_origin_and_exit(self, tmp_path):
+        stats = TravelTimeStats(clock=lambda: 100.0)
+        stats.record(dispatched_car(1, 0.0, 10.0), exit_crossroad='crossroad3@localhost')
+        stats.record(dispatched_car(2, 0.0, 20.0), exit_crossroad='crossroad3@localhost')
+        summary = stats.summary()
+        assert summary['dispatched_cars'] == 2
+        assert summary['mean_travel_time'] == 15.0
+        assert set(summary['by_origin']) == {'1', '2'}
+        assert summary['by_exit']['crossroad3@localhost']['count'] == 2
+
+        exporter = StatsExporter(str(tmp_path / 'stats.csv'))
+        exporter.write(summary)
+        exporter.write(summary)
+        lines = (tmp_path / 'stats.csv').read_text().splitlines()
+        assert lines[0].startswith('timestamp,dispatched_cars') and len(lines) == 3
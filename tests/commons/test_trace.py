@@ -0,0 +1,39 @@
+from src.commons.trace import MmapTraceLog, TraceRecordType, read_injections, read_trace
+from src.entity.LightState import LightState
+from src.entity.car import Car, Direction
+from src.entity.algorithms import LargestFirst
+from src.simulation.headless import HeadlessSimulation
+
+
+class TestTraceLog:
+    def test_records_should_be_read_back_in_order(self, tmp_path):
+        path = str(tmp_path / 'trace.bin')
+        car = Car(id=5, starting_crossroad_id=2, starting_queue_direction=Direction.W, create_timestamp=1.5,
+                  path=[Direction.E, Direction.N])
+        # tiny chunks make the file grow and remap several times
+        trace = MmapTraceLog(path, chunk_size=64)
+        for i in range(20):
+            trace.car_injected(float(i), 2, car)
+        trace.car_hop(21.0, 2, 5, Direction.E)
+        trace.lane_snapshot(22.0, 2, {Direction.N: 1, Direction.S: 0, Direction.E: 3, Direction.W: 0})
+        trace.recommendation(23.0, 2, LightState.NS)
+        trace.transition(24.0, 2, LightState.NS)
+        trace.close()
+
+        records = list(read_trace(path))
+        assert len(records) == 24
+        assert [injection[2] for injection in read_injections(path)] == [car] * 20
+        assert records[20].data == (5, Direction.E)
+        assert records[21].data[Direction.E] == 3
+        assert records[22].type == TraceRecordType.RECOMMENDATION and records[22].data == LightState.NS
+        assert records[23].timestamp == 24.0
+
+    def test_replay_should_reproduce_recorded_run(self, tmp_path):
+        path = str(tmp_path / 'trace.bin')
+        trace = MmapTraceLog(path)
+        recorded = HeadlessSimulation(seed=7, trace=trace).run(600).summary()
+        trace.close()
+
+        assert HeadlessSimulation(replay=path).run(600).summary() == recorded
+        other_algorithm = HeadlessSimulation(replay=path, algorithm_factory=LargestFirst).run(600).summary()
+        assert other_algorithm['generated_cars'] == recorded['generated_cars']
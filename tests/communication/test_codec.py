@@ -0,0 +1,74 @@
+from src.communication.codec import BinaryCodec, CODEC_METADATA_KEY, JsonCodec
+from src.communication.crossroads_info_protocol import CrossroadsInfoMessage
+from src.communication.lane_credit_protocol import LaneCreditMessage, LaneCreditTemplate
+from src.communication.move_car_protocol import MoveCarMessage, MoveCarTemplate, MoveCarsBatchMessage, \
+    decode_moved_cars, moved_cars_template
+from src.communication.state_recommendation_protocol import StateRecommendationMessage
+from src.entity.LightState import LightState
+from src.entity.car import Car, Direction
+
+CAR = Car(id=42, starting_crossroad_id=3, starting_queue_direction=Direction.E, create_timestamp=1670000000.25,
+          path=[Direction.N, Direction.W, Direction.W, Direction.S, Direction.E])
+
+
+class TestCodecs:
+    def test_car_should_survive_both_codecs(self):
+        for codec in (JsonCodec(), BinaryCodec()):
+            assert codec.decode_car(codec.encode_car(CAR)) == CAR
+
+    def test_car_with_path_longer_than_255_hops_should_survive_binary_codec(self):
+        car = Car(id=1, starting_crossroad_id=0, starting_queue_direction=Direction.N, create_timestamp=0.0,
+                  path=[Direction.E] * 150 + [Direction.S] * 149)
+        codec = BinaryCodec()
+        assert codec.decode_car(codec.encode_car(car)) == car
+
+    def test_binary_body_should_be_smaller_and_ascii(self):
+        body = BinaryCodec().encode_car(CAR)
+        assert body.isascii()
+        assert len(body) < len(JsonCodec().encode_car(CAR))
+
+    def test_receiver_should_decode_by_message_metadata(self):
+        for codec in (JsonCodec(), BinaryCodec()):
+            msg = MoveCarMessage(to="crossroad1@localhost", car=CAR, codec=codec)
+            assert msg.get_metadata(CODEC_METADATA_KEY) == codec.name
+            assert MoveCarTemplate().match(msg)
+            assert MoveCarMessage.decode(msg) == CAR
+
+    def test_message_without_codec_metadata_should_be_json(self):
+        msg = StateRecommendationMessage(to="crossroad1@localhost", state=LightState.NS, codec=JsonCodec())
+        del msg.metadata[CODEC_METADATA_KEY]
+        assert StateRecommendationMessage.decode(msg) == LightState.NS
+
+    def test_lane_credits_should_survive_both_codecs(self):
+        for codec in (JsonCodec(), BinaryCodec()):
+            msg = LaneCreditMessage(to="crossroad1@localhost", count=3, codec=codec)
+            assert msg.get_metadata(CODEC_METADATA_KEY) == codec.name
+            assert LaneCreditTemplate().match(msg)
+            assert LaneCreditMessage.decode(msg) == 3
+
+    def test_crossroads_info_should_survive_binary_codec(self):
+        queues = {Direction.N: [CAR, CAR], Direction.S: [], Direction.E: [CAR], Direction.W: []}
+        for summary in (False, True):
+            msg = CrossroadsInfoMessage(to="a@localhost", line_queues=queues, current_state=LightState.EW,
+                                        summary=summary, codec=BinaryCodec())
+            lines, current_state = CrossroadsInfoMessage.decode(msg)
+            assert current_state == LightState.EW
+            if summary:
+                assert [lines[lane].count for lane in Direction.as_list()] == [2, 0, 1, 0]
+                assert lines[Direction.N].ts_min == CAR.create_timestamp
+            else:
+                assert lines == queues
+
+    def test_batch_of_cars_should_survive_both_codecs(self):
+        cars = [CAR, Car(id=7, starting_crossroad_id=0, starting_queue_direction=Direction.N,
+                         create_timestamp=1670000001.5, path=[Direction.S], dispatch_timestamp=1670000002.0)]
+        for codec in (JsonCodec(), BinaryCodec()):
+            msg = MoveCarsBatchMessage(to="crossroad1@localhost", cars=cars, codec=codec)
+            assert moved_cars_template().match(msg)
+            assert not MoveCarTemplate().match(msg)
+            assert decode_moved_cars(msg) == cars
+
+    def test_single_car_message_should_decode_as_batch(self):
+        msg = MoveCarMessage(to="crossroad1@localhost", car=CAR, codec=BinaryCodec())
+        assert moved_cars_template().match(msg)
+        assert decode_moved_cars(msg) == [CAR]
@@ -0,0 +1,34 @@
+from src.communication.crossroads_info_protocol import CrossroadsInfoMessage
+from src.entity.LightState import LightState
+from src.entity.algorithms import AverageWait, LargestFirst, WeightedSum
+from src.entity.car import Car, Direction
+from src.simulation.clock import VirtualClock
+
+
+def make_queues(cars_per_lane):
+    return {lane: [Car(id=i, starting_crossroad_id=1, starting_queue_direction=lane,
+                       create_timestamp=float(i * (lane_idx + 1)), path=[Direction.N])
+                   for i in range(cars_per_lane[lane_idx])]
+            for lane_idx, lane in enumerate(Direction.as_list())}
+
+
+class TestCrossroadsInfoMessage:
+    def test_summary_should_give_same_recommendation_as_full_queues(self):
+        queues = make_queues([3, 0, 5, 1])
+        clock = VirtualClock(100.0)
+        for algorithm in (LargestFirst, AverageWait, WeightedSum):
+            recommendations = []
+            for summary in (False, True):
+                lines, current_state = CrossroadsInfoMessage.decode(
+                    CrossroadsInfoMessage(to="crossroad1_aggr@localhost", line_queues=queues,
+                                          current_state=LightState.EW, summary=summary))
+                recommendations.append(algorithm(timeout=10, clock=clock, deadline_clock=clock)
+                                       .recommend_state(lines=lines, current_state=current_state))
+            assert recommendations[0] == recommendations[1]
+
+    def test_summary_size_should_not_depend_on_queue_length(self):
+        short = CrossroadsInfoMessage(to="a@localhost", line_queues=make_queues([1, 1, 1, 1]),
+                                      current_state=LightState.EW, summary=True)
+        long = CrossroadsInfoMessage(to="a@localhost", line_queues=make_queues([100, 100, 100, 100]),
+                                     current_state=LightState.EW, summary=True)
+        assert abs(len(short.body) - len(long.body)) < 40
@@ -0,0 +1,86 @@
+import asyncio
+import queue
+
+import aioxmpp
+
+from src.communication.crossroads_info_protocol import CrossroadsInfoTemplate
+from src.communication.move_car_protocol import MoveCarMessage, MoveCarTemplate
+from src.communication.transport import LocalTransport, ShardedLocalTransport
+from src.entity.car import Car, Direction
+
+
+class FakeBehaviour:
+    def __init__(self, template):
+        self.template = template
+        self.received = []
+        self.is_running = True
+
+    def match(self, msg):
+        return self.template.match(msg)
+
+    async def enqueue(self, msg):
+        self.received.append(msg)
+
+    def kill(self):
+        self.is_running = False
+
+
+class FakeAgent:
+    def __init__(self, jid, behaviours):
+        self.jid = aioxmpp.JID.fromstr(jid)
+        self.behaviours = behaviours
+        self._alive = asyncio.Event()
+
+    async def setup(self):
+        pass
+
+
+class TestLocalTransport:
+    def test_message_should_reach_only_matching_behaviour(self):
+        move_car = FakeBehaviour(MoveCarTemplate())
+        crossroads_info = FakeBehaviour(CrossroadsInfoTemplate())
+        agent = FakeAgent("crossroad1@localhost", [move_car, crossroads_info])
+        transport = LocalTransport()
+        car = Car(id=1, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+                  create_timestamp=0.0, path=[Direction.S])
+
+        async def scenario():
+            await transport.start_agent(agent, auto_register=False)
+            await transport.send(MoveCarMessage(to="crossroad1@localhost", car=car), None)
+            await transport.send(MoveCarMessage(to="nobody@localhost", car=car), None)
+            await asyncio.sleep(0)
+            await transport.stop_agent(agent)
+
+        asyncio.run(scenario())
+        assert [MoveCarMessage.decode(msg) for msg in move_car.received] == [car]
+        assert crossroads_info.received == []
+        assert transport.stats.sent['move_car'] == 1
+        assert transport.stats.dropped == 1
+
+
+class TestShardedLocalTransport:
+    def test_message_to_other_shard_should_go_through_its_inbox(self):
+        inboxes = [queue.Queue(), queue.Queue()]
+        routes = {"crossroad1@localhost": 0, "crossroad2@localhost": 1}
+        first, second = ShardedLocalTransport(0, routes, inboxes), ShardedLocalTransport(1, routes, inboxes)
+        move_car = FakeBehaviour(MoveCarTemplate())
+        agents = [(first, FakeAgent("crossroad1@localhost", [])),
+                  (second, FakeAgent("crossroad2@localhost", [move_car]))]
+        car = Car(id=1, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+                  create_timestamp=0.0, path=[Direction.S])
+
+        async def scenario():
+            for transport, agent in agents:
+                await transport.start_agent(agent, auto_register=False)
+            await first.send(MoveCarMessage(to="crossroad2@localhost", car=car), None)
+            for _ in range(100):
+                if move_car.received:
+                    break
+                await asyncio.sleep(0.01)
+            for transport, agent in agents:
+                await transport.stop_agent(agent)
+                transport.close()
+
+        asyncio.run(scenario())
+        assert [MoveCarMessage.decode(msg) for msg in move_car.received] == [car]
+        assert (first.forwarded, second.received) == (1, 1)
@@ -0,0 +1,41 @@
+import threading
+
+from src.entity.LightState import LightState
+from src.entity.algorithms import LargestFirst
+from src.entity.car import Direction
+from src.simulation.clock import VirtualClock
+
+BUSY_NS = {Direction.N: [{'create_timestamp': 0.0}], Direction.S: [], Direction.E: [], Direction.W: []}
+
+
+class TestAlgorithmStarvation:
+    def test_should_not_create_threads(self):
+        threads_before = threading.active_count()
+        algorithm = LargestFirst(timeout=10)
+        for _ in range(100):
+            algorithm.recommend_state(lines=BUSY_NS, current_state=LightState.NS)
+        assert threading.active_count() == threads_before
+
+    def test_starving_state_should_be_forced_after_timeout(self):
+        clock = VirtualClock()
+        algorithm = LargestFirst(timeout=10, clock=clock, deadline_clock=clock)
+        decisions = []
+        for second in range(0, 18, 3):
+            clock.advance_to(second)
+            decisions.append(algorithm.recommend_state(lines=BUSY_NS, current_state=LightState.NS))
+        assert decisions == [LightState.NS] * 4 + [LightState.EW, LightState.NS]
+
+    def test_starvation_timers_should_be_restored_on_another_clock(self):
+        clock = VirtualClock()
+        algorithm = LargestFirst(timeout=10, clock=clock, deadline_clock=clock)
+        algorithm.recommend_state(lines=BUSY_NS, current_state=LightState.NS)
+        clock.advance_to(6)
+        restored_clock = VirtualClock(1000.0)
+        restored = LargestFirst(timeout=10, clock=restored_clock, deadline_clock=restored_clock)
+        restored.restore_state(algorithm.checkpoint_state())
+        # EW was not chosen for 6 of 10 seconds, it starves 4 seconds after restore
+        restored_clock.advance_to(1003)
+        assert restored.recommend_state(lines=BUSY_NS, current_state=LightState.NS) == LightState.NS
+        restored_clock.advance_to(1004)
+        assert restored.recommend_state(lines=BUSY_NS, current_state=LightState.NS) == LightState.EW
+
@@ -0,0 +1,57 @@
+import random
+
+import numpy as np
+
+from src.entity.LightState import LightState
+from src.entity.algorithms import AverageWait, LargestFirst, WeightedSum
+from src.entity.batch_algorithms import BatchController, lane_stats
+from src.entity.car import Direction
+from src.simulation.clock import EventScheduler
+from src.simulation.headless import HeadlessSimulation
+
+
+def random_lines(rng: random.Random, now: float):
+    return {lane: [{'create_timestamp': now - rng.uniform(0, 120)} for _ in range(rng.randint(0, 8))]
+            for lane in Direction.as_list()}
+
+
+class TestBatchController:
+    def test_decisions_should_match_scalar_algorithms(self):
+        rng = random.Random(0)
+        for algorithm in (LargestFirst, AverageWait, WeightedSum):
+            scheduler = EventScheduler()
+            scheduler.run_until(1000.0)
+            controller = BatchController(200, algorithm=algorithm, timeout=1e6, clock=scheduler.clock)
+            expected = {}
+            for index in range(200):
+                lines = random_lines(rng, scheduler.clock.now)
+                state = rng.choice([LightState.NS, LightState.EW])
+                scalar = algorithm(timeout=1e6, clock=scheduler.clock, deadline_clock=scheduler.clock)
+                expected[index] = scalar.recommend_state(lines=lines, current_state=state)
+                controller.update(index, *lane_stats(lines), current_state=state)
+            assert controller.recommend_states() == expected
+
+    def test_starving_state_should_be_forced_after_timeout(self):
+        scheduler = EventScheduler()
+        controller = BatchController(1, algorithm=LargestFirst, timeout=10, clock=scheduler.clock)
+        busy_ns = {Direction.N: [{'create_timestamp': 0.0}], Direction.S: [], Direction.E: [], Direction.W: []}
+        decisions = []
+        for second in range(0, 15, 3):
+            scheduler.run_until(second)
+            controller.update(0, *lane_stats(busy_ns), current_state=LightState.NS)
+            decisions.append(controller.recommend_states()[0])
+        assert decisions == [LightState.NS] * 4 + [LightState.EW]
+
+    def test_recommend_should_only_decide_pending_crossroads(self):
+        controller = BatchController(3, algorithm=LargestFirst)
+        controller.update(1, [1, 0, 0, 0], [0.0, 0, 0, 0], LightState.EW)
+        indices, _ = controller.recommend()
+        assert indices.tolist() == [1]
+        assert not np.any(controller.pending)
+
+    def test_batch_controller_should_run_simulation_like_scalar_algorithms(self):
+        scalar = HeadlessSimulation(seed=3, controller='scalar').run(2 * 60 * 60).summary()
+        batch = HeadlessSimulation(seed=3, controller='batch').run(2 * 60 * 60).summary()
+        scalar.pop('processed_events')
+        batch.pop('processed_events')
+        assert scalar == batch
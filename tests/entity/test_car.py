@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from src.entity.car import Car, CarStore, Direction
+
+
+def make_car(path=(Direction.N, Direction.E, Direction.E)) -> Car:
+    return Car(id=7, starting_crossroad_id=2, starting_queue_direction=Direction.W,
+               create_timestamp=12.5, path=list(path))
+
+
+class TestCar:
+    def test_advance_should_consume_path(self):
+        car = make_car()
+        assert car.direction == Direction.N
+        assert car.advance() == Direction.N
+        assert car.path == [Direction.E, Direction.E]
+        assert car.remaining_hops == 2
+
+    def test_json_should_carry_only_remaining_path(self):
+        car = make_car()
+        car.advance()
+        car.dispatch_timestamp = 20.0
+        restored = Car.from_json(car.to_json())
+        assert restored == car
+        assert restored.path == [Direction.E, Direction.E]
+        assert restored.dispatch_timestamp == 20.0
+
+    def test_path_should_be_packed_like_in_car_store(self):
+        car = make_car(path=[Direction.W, Direction.S] * 20)
+        assert car.packed_path == sum(code << (2 * position) for position, code in enumerate([3, 1] * 20))
+        car.advance()
+        assert car.path_string() == 'SW' * 19 + 'S'
+        assert Car.from_packed_path(id=7, starting_crossroad_id=2, starting_queue_direction=Direction.W,
+                                    create_timestamp=12.5, packed_path=car.packed_path, hops=3) == \
+               make_car(path=[Direction.S, Direction.W, Direction.S])
+
+
+class TestCarStore:
+    def test_store_should_keep_cars_fields(self):
+        store = CarStore(capacity=1)
+        first = store.add(make_car())
+        second = store.add(make_car(path=[Direction.S]))
+        assert len(store) == 2
+        assert store.get(first) == make_car()
+        assert store.get(second).path == [Direction.S]
+
+    def test_advance_should_move_whole_batch(self):
+        store = CarStore()
+        codes = np.array([[0, 2, 3], [1, 1, 0]], dtype=np.uint8)
+        indices = store.add_many(ids=np.array([1, 2]), starting_crossroad_ids=np.array([1, 1]),
+                                 starting_queue_directions=np.array([0, 0]), create_timestamps=np.array([0.0, 1.0]),
+                                 path_codes=codes, path_lengths=np.array([3, 2]))
+        assert store.advance(indices).tolist() == [0, 1]
+        assert store.advance(indices).tolist() == [2, 1]
+        assert store.get(indices[0]).path == [Direction.W]
+        assert store.get(indices[1]).path == []
+
+    def test_paths_too_long_to_pack_should_be_rejected(self):
+        store = CarStore()
+        with pytest.raises(AssertionError):
+            store.add(make_car(path=[Direction.N] * (CarStore.MAX_PATH_LENGTH + 1)))
+        with pytest.raises(AssertionError):
+            store.add_many(ids=np.array([1]), starting_crossroad_ids=np.array([1]),
+                           starting_queue_directions=np.array([0]), create_timestamps=np.array([0.0]),
+                           path_codes=np.ones((1, CarStore.MAX_PATH_LENGTH + 1), dtype=np.uint8),
+                           path_lengths=np.array([CarStore.MAX_PATH_LENGTH + 1]))
+        assert len(store) == 0
@@ -0,0 +1,28 @@
+from src.entity.car import Direction
+from src.entity.discharge import DischargeModel
+from src.simulation.headless import HeadlessSimulation
+
+
+class TestDischargeModel:
+    def test_fraction_of_a_car_should_be_carried_while_lane_is_open(self):
+        model = DischargeModel(saturation_flow=0.75)
+        assert model.allowances([Direction.N, Direction.S], green_time=2.0) == {Direction.N: 1, Direction.S: 1}
+        assert model.allowances([Direction.N], green_time=2.0) == {Direction.N: 2}
+        # S was closed in the meantime and lost its half a car
+        assert model.allowances([Direction.N, Direction.S], green_time=2.0) == {Direction.N: 1, Direction.S: 1}
+
+    def test_only_lanes_of_neighbour_crossroads_should_be_bounded(self):
+        model = DischargeModel(lane_capacity=5)
+        assert model.initial_credits({Direction.N: 2, Direction.S: None}) == {Direction.N: 5, Direction.S: None}
+
+
+class TestSpillback:
+    def test_lanes_fed_by_neighbours_should_not_exceed_capacity(self):
+        simulation = HeadlessSimulation(seed=0, arrival_rate=2.0, lane_capacity=2)
+        for _ in range(60):
+            simulation.run(10)
+            for crossroad in simulation.crossroads.values():
+                for direction, neighbour in crossroad.connected_crossroads.items():
+                    if neighbour is not None:
+                        assert len(crossroad.line_queues[direction]) <= 2
+        assert simulation.summary()['blocked_moves'] > 0
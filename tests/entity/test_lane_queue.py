@@ -0,0 +1,45 @@
+import pickle
+import random
+
+from src.entity.car import Car, Direction
+from src.entity.lane_queue import LaneQueue
+from src.entity.lane_summary import LaneSummary
+
+
+def make_car(car_id: int, create_timestamp: float) -> Car:
+    return Car(id=car_id, starting_crossroad_id=1, starting_queue_direction=Direction.N,
+               create_timestamp=create_timestamp, path=[Direction.S])
+
+
+class TestLaneQueue:
+    def test_aggregates_should_follow_cars(self):
+        rng = random.Random(0)
+        lane = LaneQueue()
+        for car_id in range(2000):
+            if lane and rng.random() < 0.45:
+                lane.popleft()
+            elif rng.random() < 0.5:
+                lane.append(make_car(car_id, rng.uniform(0, 100)))
+            else:
+                lane.extend(make_car(car_id, rng.uniform(0, 100)) for _ in range(3))
+            expected = LaneSummary.from_cars(list(lane), 200.0)
+            snapshot = lane.snapshot(200.0)
+            assert snapshot.count == expected.count and snapshot.ts_min == expected.ts_min
+            assert abs(snapshot.ts_sum - expected.ts_sum) < 1e-6
+            assert abs(lane.average_wait(200.0) - expected.average_wait(200.0)) < 1e-6
+
+    def test_other_mutations_should_recount(self):
+        lane = LaneQueue(make_car(car_id, timestamp) for car_id, timestamp in enumerate([5.0, 3.0, 4.0]))
+        lane.appendleft(make_car(3, 1.0))
+        lane.pop()
+        assert (lane.ts_sum, lane.ts_min) == (9.0, 1.0)
+        lane.popleft()
+        assert (lane.ts_sum, lane.ts_min) == (8.0, 3.0)
+        lane.clear()
+        assert lane.snapshot(10.0) == LaneSummary()
+
+    def test_algorithms_should_take_lane_queues(self):
+        lane = LaneQueue([make_car(1, 2.0), make_car(2, 4.0)])
+        assert LaneSummary.from_cars(lane, 10.0) == LaneSummary(count=2, ts_sum=6.0, ts_min=2.0, oldest_age=8.0)
+        restored = pickle.loads(pickle.dumps(lane))
+        assert restored.snapshot(10.0) == lane.snapshot(10.0) and list(restored) == list(lane)
@@ -0,0 +1,29 @@
+from src.entity.status_reporting import StatusReporter
+
+
+class TestStatusReporter:
+    def test_unchanged_lanes_should_be_reported_on_heartbeat(self):
+        reporter = StatusReporter(min_interval=1.0, heartbeat=10.0)
+        counts, ages = [0, 0, 0, 0], [0.0] * 4
+        assert reporter.should_report(counts, ages, now=0.0)
+        reporter.reported(counts, ages, now=0.0)
+        assert not reporter.should_report(counts, ages, now=9.0)
+        assert reporter.next_check_ts(counts, ages, now=9.0) == 10.0
+        assert reporter.should_report(counts, ages, now=10.0)
+
+    def test_count_change_should_wait_for_min_interval(self):
+        reporter = StatusReporter(count_threshold=2, min_interval=1.0, heartbeat=10.0)
+        reporter.reported([1, 0, 0, 0], [0.0] * 4, now=0.0)
+        assert not reporter.should_report([2, 0, 0, 0], [0.5, 0, 0, 0], now=0.5)
+        assert reporter.change_ts(now=0.5) == 1.0
+        assert reporter.should_report([2, 0, 0, 0], [1.0, 0, 0, 0], now=1.0)
+        # the same car waiting, 1 car stays below count_threshold
+        assert not reporter.should_report([1, 0, 0, 0], [2.0, 0, 0, 0], now=2.0)
+
+    def test_waiting_car_should_be_reported_when_age_crosses_threshold(self):
+        reporter = StatusReporter(age_threshold=5.0, min_interval=1.0, heartbeat=60.0)
+        reporter.reported([1, 0, 0, 0], [2.0, 0, 0, 0], now=0.0)
+        check_ts = reporter.next_check_ts([1, 0, 0, 0], [2.0, 0, 0, 0], now=0.0)
+        assert check_ts == 3.0
+        assert not reporter.should_report([1, 0, 0, 0], [4.5, 0, 0, 0], now=2.5)
+        assert reporter.should_report([1, 0, 0, 0], [2.0 + check_ts, 0, 0, 0], now=check_ts)
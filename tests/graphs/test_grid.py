@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.graphs.grid import grid_edges, grid_layout, grid_neighbors, grid_regions
+
+
+class TestGridRegions:
+    def test_regions_should_be_balanced_and_cover_all_crossroads(self):
+        regions = grid_regions(width=4, height=3, crossroads_count=12, regions_count=3)
+        assert sorted(regions) == list(range(1, 13))
+        assert [list(regions.values()).count(region) for region in range(3)] == [4, 4, 4]
+
+    def test_region_should_be_contiguous_columns(self):
+        # ids go along y first, so 3x3 grid in 3 regions is split into its columns
+        regions = grid_regions(width=3, height=3, crossroads_count=9, regions_count=3)
+        assert regions == {1: 0, 2: 0, 3: 0, 4: 1, 5: 1, 6: 1, 7: 2, 8: 2, 9: 2}
+
+
+class TestGridLayout:
+    def test_neighbors_should_follow_grid_coordinates(self):
+        # 2x3 grid, ids go along y first: x=0 -> 1, 2, 3 and x=1 -> 4, 5, 6
+        neighbors = grid_neighbors(width=2, height=3, crossroads_count=5)
+        assert neighbors[2] == {'N': 3, 'S': 1, 'E': 5, 'W': None}
+        assert neighbors[3] == {'N': None, 'S': 2, 'E': None, 'W': None}
+        assert set(neighbors) == {1, 2, 3, 4, 5}
+
+    def test_mask_gaps_should_be_skipped_along_the_street(self):
+        mask = np.array([[True, False, True],
+                         [False, False, False],
+                         [True, True, False]])
+        ids, table = grid_layout(width=3, height=3, mask=mask)
+        assert ids.tolist() == [[1, 0, 2], [0, 0, 0], [3, 4, 0]]
+        # crossroad 1 at (0, 0): north is 2 at (0, 2) across the gap, east is 3 at (2, 0)
+        assert table[1].tolist() == [2, 0, 3, 0]
+        assert table[4].tolist() == [0, 3, 0, 0]
+        edges = {tuple(edge) for edge in grid_edges(table).tolist()}
+        assert edges == {(1, 2), (2, 1), (1, 3), (3, 1), (3, 4), (4, 3)}
@@ -0,0 +1,31 @@
+from src.graphs.intersections_graph import IntersectionsGraph
+from src.graphs.renderer import GraphRenderer
+
+
+class RecordingRenderer(GraphRenderer):
+    def __init__(self):
+        self.marked = 0
+
+    def mark_dirty(self, graph):
+        self.marked += 1
+
+
+def two_crossroads_graph() -> IntersectionsGraph:
+    graph = IntersectionsGraph()
+    graph.add_node(1, x_cord=0, y_cord=0, state="")
+    graph.add_node(2, x_cord=1, y_cord=0, state="")
+    graph.add_edge(1, 2, value=0)
+    graph.add_edge(2, 1, value=0)
+    return graph
+
+
+class TestIntersectionsGraph:
+    def test_updates_should_only_mark_graph_dirty(self):
+        graph = two_crossroads_graph()
+        renderer = RecordingRenderer()
+        graph.set_renderer(renderer)
+        graph.update_intersection(1, {"N": 0, "S": 0, "E": 3, "W": 0})
+        graph.update_intersection_state(1, "NS")
+        assert renderer.marked == 2
+        assert graph.edges[2, 1]["value"] == 3
+        assert graph.nodes[1]["state"] == "NS"
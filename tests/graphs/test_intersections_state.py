@@ -0,0 +1,37 @@
+from src.entity.LightState import LightState
+from src.graphs.grid import grid_layout
+from src.graphs.intersections_state import IntersectionsState
+from tests.graphs.test_intersections_graph import RecordingRenderer
+
+
+def two_crossroads_state() -> IntersectionsState:
+    # crossroad 1 at (0, 0), crossroad 2 east of it at (1, 0)
+    state = IntersectionsState()
+    state.load(*grid_layout(width=2, height=1))
+    return state
+
+
+class TestIntersectionsState:
+    def test_updates_should_write_arrays_and_mark_dirty(self):
+        state = two_crossroads_state()
+        renderer = RecordingRenderer()
+        state.set_renderer(renderer)
+        state.update_intersection(1, {"N": 0, "S": 0, "E": 3, "W": 0})
+        state.update_intersection_state(1, LightState.NS)
+        assert renderer.marked == 2
+        assert state.queue_lengths[1].tolist() == [0, 0, 3, 0]
+        assert state.get_node_neighbors(1) == {"N": None, "S": None, "E": 2, "W": None}
+
+    def test_graph_should_be_materialized_from_current_state(self):
+        state = two_crossroads_state()
+        state.update_intersection(1, {"E": 3})
+        graph = state.to_graph()
+        assert graph.edges[2, 1]["value"] == 3
+        assert graph.nodes[2] == {"x_cord": 1, "y_cord": 0, "state": ""}
+
+        state.update_intersection(1, {"E": 5})
+        state.update_intersection_state(1, LightState.EW)
+        assert state.to_graph() is graph
+        assert graph.edges[2, 1]["value"] == 5
+        assert graph.nodes[1]["state"] == LightState.EW
+        assert graph.get_node_neighbors(1) == state.get_node_neighbors(1)
@@ -0,0 +1,33 @@
+from src.agents.car_dispatcher import merged_stats
+from src.entity.car import Car, Direction
+from src.graphs.intersections_state import IntersectionsState
+from src.graphs.map_generator import MapGenerator
+
+
+def generate(**kwargs):
+    map_generator = MapGenerator(crossroads_count=4, width=2, height=2)
+    map_generator.graph = IntersectionsState()
+    return map_generator.generate(**kwargs)
+
+
+class TestMapGeneratorDispatchers:
+    def test_edge_dispatchers_should_get_cars_leaving_through_their_edge(self):
+        dispatchers, crossroads = generate(dispatcher_mode='edge')
+        assert [str(dispatcher.jid) for dispatcher in dispatchers] == [
+            'dispatcher_e@localhost', 'dispatcher_n@localhost', 'dispatcher_s@localhost', 'dispatcher_w@localhost']
+        # crossroad 1 is at (0, 0), so it has no neighbours in S and W
+        connected = crossroads[0].connected_crossroads
+        assert connected[Direction.S] == 'dispatcher_s@localhost'
+        assert connected[Direction.W] == 'dispatcher_w@localhost'
+        assert connected[Direction.N] == 'crossroad2@localhost'
+
+    def test_region_dispatchers_statistics_should_be_merged(self):
+        dispatchers, crossroads = generate(dispatcher_mode='region', dispatchers_count=2)
+        assert len(dispatchers) == 2
+        for index, dispatcher in enumerate(dispatchers):
+            car = Car(id=index, starting_crossroad_id=1, starting_queue_direction=Direction.S,
+                      create_timestamp=100.0, path=[], dispatch_timestamp=100.0 + 10 * (index + 1))
+            dispatcher.stats.record(car, exit_crossroad=crossroads[index].crossroad_id)
+        stats = merged_stats(dispatchers)
+        assert stats.count == 2
+        assert stats.travel_time.max == 20.0
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.entity.car import CarStore
+from src.graphs.grid import NEIGHBOR_DIRECTIONS, grid_layout, grid_neighbors
+from src.graphs.routing import OriginDestinationDemand, Router
+
+
+def follow(neighbors, origin, path):
+    """
+    Crossroads visited by car going along path, None once it leaves the map
+    """
+    visited = [origin]
+    for direction in path:
+        visited.append(neighbors[visited[-1]][direction])
+    return visited
+
+
+class TestRouter:
+    def test_routes_should_be_shortest_and_leave_the_map(self):
+        _, table = grid_layout(width=3, height=3)
+        router = Router(table)
+        neighbors = grid_neighbors(width=3, height=3, crossroads_count=9)
+        # ids go along y first, 1 is (0, 0) and 9 is (2, 2)
+        path = router.route(1, 9)
+        assert len(path) == 5
+        assert follow(neighbors, 1, path)[-2:] == [9, None]
+        for origin in router.boundary.tolist():
+            for destination in router.boundary.tolist():
+                visited = follow(neighbors, origin, router.route(origin, destination))
+                assert visited[-2:] == [destination, None]
+                assert None not in visited[:-1]
+
+    def test_route_batch_should_match_single_routes(self):
+        mask = np.array([[True, False, True, True],
+                         [True, True, True, False],
+                         [False, True, True, True]])
+        _, table = grid_layout(width=3, height=4, mask=mask)
+        router = Router(table, trees_cache_size=2)
+        origins, destinations = OriginDestinationDemand.uniform(router).sample(40, np.random.default_rng(0))
+        codes, lengths = router.route_batch(origins, destinations)
+        for origin, destination, route_codes, length in zip(origins, destinations, codes, lengths):
+            assert [NEIGHBOR_DIRECTIONS[code] for code in route_codes[:length]] == \
+                   router.route(int(origin), int(destination))
+            assert not route_codes[length:].any()
+
+    def test_routes_too_long_for_car_store_should_be_rejected(self):
+        router = Router(grid_layout(width=30, height=30)[1])
+        origins, destinations = OriginDestinationDemand.uniform(router).sample(100, np.random.default_rng(0))
+        codes, lengths = router.route_batch(origins, destinations)
+        assert lengths.max() > CarStore.MAX_PATH_LENGTH
+        count = len(origins)
+        with pytest.raises(AssertionError):
+            CarStore().add_many(ids=np.arange(count), starting_crossroad_ids=origins,
+                                starting_queue_directions=np.zeros(count), create_timestamps=np.zeros(count),
+                                path_codes=codes, path_lengths=lengths)
+
+
+class TestOriginDestinationDemand:
+    def test_cars_should_enter_on_given_boundary_crossroads(self):
+        _, table = grid_layout(width=3, height=3)
+        router = Router(table)
+        # 5 is the center crossroad, it has no side to enter from
+        demand = OriginDestinationDemand.uniform(router, origins=[1, 5, 6])
+        assert demand.origins.tolist() == [1, 6]
+        rng = random.Random(0)
+        for _ in range(100):
+            origin, destination = demand.sample_one(rng)
+            assert origin in (1, 6) and destination != 5
+            # leaving where it entered would be a U-turn
+            assert (origin, destination) != (6, 6)
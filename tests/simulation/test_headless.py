@@ -0,0 +1,64 @@
+from src.entity.LightState import LightState
+from src.simulation.clock import EventScheduler
+from src.entity.algorithms import LargestFirst
+from src.simulation.headless import HeadlessSimulation
+
+
+class TestEventScheduler:
+    def test_events_should_run_in_timestamp_order(self):
+        scheduler = EventScheduler()
+        calls = []
+        scheduler.call_later(2.0, calls.append, 'second')
+        scheduler.call_later(1.0, calls.append, 'first')
+        scheduler.call_later(3.0, calls.append, 'cancelled').cancel()
+        scheduler.run_until(5.0)
+        assert calls == ['first', 'second']
+        assert scheduler.clock.now == 5.0
+
+
+class TestHeadlessSimulation:
+    def test_should_dispatch_cars_in_virtual_time(self):
+        simulation = HeadlessSimulation(width=3, height=3, seed=0).run(60 * 60)
+        summary = simulation.summary()
+        assert summary['simulated_time'] == 60 * 60
+        assert summary['dispatched_cars'] > 0
+        in_flight = summary['generated_cars'] - summary['dispatched_cars'] \
+            - summary['lost_cars'] - summary['waiting_cars']
+        assert in_flight >= 0
+        assert simulation.dispatcher.stats.travel_time.min >= 0
+        assert summary['p95_travel_time'] >= simulation.dispatcher.stats.travel_time.quantile(0.5)
+
+    def test_same_seed_should_give_same_statistics(self):
+        first = HeadlessSimulation(seed=42).run(600).summary()
+        second = HeadlessSimulation(seed=42).run(600).summary()
+        assert first == second
+
+    def test_lights_should_switch_to_default_state_without_recommendations(self):
+        simulation = HeadlessSimulation(width=1, height=1, seed=0)
+        crossroad = simulation.crossroads[1]
+        crossroad.send_waiting_info = lambda: None
+        simulation.run(31)
+        assert crossroad.lights_state == LightState.NS
+
+    def test_poisson_arrivals_should_reach_the_dispatcher(self):
+        summary = HeadlessSimulation(seed=0, arrival_rate=0.5).run(600).summary()
+        assert 200 < summary['generated_cars'] < 400
+        assert summary['lost_cars'] == 0
+        assert summary['dispatched_cars'] + summary['waiting_cars'] <= summary['generated_cars']
+
+    def test_restored_simulation_should_continue_like_uninterrupted_one(self, tmp_path):
+        path = str(tmp_path / 'run.ckpt')
+        HeadlessSimulation(seed=5, arrival_rate=0.5, lane_capacity=4).run(900).checkpoint(path)
+        restored = HeadlessSimulation.restore(path).run(900).summary()
+        uninterrupted = HeadlessSimulation(seed=5, arrival_rate=0.5, lane_capacity=4).run(1800).summary()
+        restored.pop('processed_events')
+        uninterrupted.pop('processed_events')
+        assert restored == uninterrupted
+
+    def test_forked_simulation_should_switch_algorithm(self, tmp_path):
+        path = str(tmp_path / 'run.ckpt')
+        HeadlessSimulation(seed=5).run(600).checkpoint(path)
+        fork = HeadlessSimulation.restore(path)
+        fork.use_algorithm(LargestFirst)
+        assert isinstance(fork.crossroads[1].aggregator.algorithm, LargestFirst)
+        assert fork.run(600).summary()['simulated_time'] == 1200
@@ -0,0 +1,29 @@
+import queue
+import threading
+
+import pytest
+
+from src.launcher import collect_reports, run_shard
+
+
+class DeadWorker:
+    exitcode = 1
+
+
+class TestLauncher:
+    def test_failed_shard_should_break_barrier_and_report_error(self):
+        barrier = threading.Barrier(2)
+        results = queue.Queue()
+        with pytest.raises(KeyError):
+            run_shard(0, 2, 2, 2, 1.0, 0, 'unknown codec', False, None, 'single', [], barrier, results)
+        assert barrier.broken
+        report = results.get_nowait()
+        assert report['shard'] == 0 and 'KeyError' in report['error']
+
+    def test_shard_exited_without_report_should_not_be_waited_for(self):
+        results = queue.Queue()
+        results.put({'shard': 1, 'stats': None})
+        reports = collect_reports(results, [DeadWorker(), DeadWorker()], timeout=60)
+        assert [report['shard'] for report in reports] == [0, 1]
+        assert reports[0]['error'] == 'no report, exit code 1'
+        assert 'error' not in reports[1]